@@ -0,0 +1,153 @@
+"""
+Token authentication with an in-process cache.
+
+TokenAuthentication costs a token JOIN user query on every authenticated
+request. CachedTokenAuthentication keeps a bounded LRU of token -> user
+snapshots per worker, so a repeat caller is authenticated without touching
+the database.
+- Snapshots are plain field values; each request gets a fresh user instance
+- Entries expire after TOKEN_AUTH_CACHE['TTL'] seconds
+- Deleting a token or saving/deleting its user drops the entries in this
+  process (accounts.signals); other workers pick the change up within the TTL.
+  Writes that skip signals (QuerySet.update) are also only bounded by the TTL.
+"""
+import threading
+import time
+from collections import OrderedDict, defaultdict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+
+class TokenCache:
+    """
+    Thread-safe LRU + TTL map of token key -> (user id, snapshot).
+    """
+
+    def __init__(self, max_entries=10000, ttl=60, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.clock = clock
+        self._entries = OrderedDict()  # key -> (expires_at, user_id, snapshot)
+        self._keys_by_user = defaultdict(set)
+        self._lock = threading.Lock()
+        # Bumped by every invalidation: a load that raced one is not stored
+        self.generation = 0
+        self.hits = self.misses = self.evictions = self.invalidations = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= self.clock():
+                self._remove(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[2]
+
+    def set(self, key, user_id, snapshot, generation):
+        with self._lock:
+            if generation != self.generation or self.max_entries <= 0:
+                return
+            self._remove(key)
+            self._entries[key] = (self.clock() + self.ttl, user_id, snapshot)
+            self._keys_by_user[user_id].add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def discard(self, key):
+        with self._lock:
+            self.generation += 1
+            if self._remove(key):
+                self.invalidations += 1
+
+    def discard_user(self, user_id):
+        with self._lock:
+            self.generation += 1
+            for key in list(self._keys_by_user.get(user_id, ())):
+                self._remove(key)
+                self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+            self._keys_by_user.clear()
+            self.hits = self.misses = self.evictions = self.invalidations = 0
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+        keys = self._keys_by_user.get(entry[1])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_user[entry[1]]
+        return True
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else None,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+                'size': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl': self.ttl,
+            }
+
+
+def _build_cache():
+    options = getattr(settings, 'TOKEN_AUTH_CACHE', {})
+    return TokenCache(max_entries=options.get('MAX_ENTRIES', 10000), ttl=options.get('TTL', 60))
+
+
+token_cache = _build_cache()
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    Drop-in replacement for TokenAuthentication backed by `token_cache`.
+    """
+    cache = token_cache
+
+    def snapshot(self, token):
+        user = token.user
+        # The password hash is left out; it loads on demand if ever needed
+        fields = {f.attname: getattr(user, f.attname) for f in user._meta.concrete_fields if f.attname != 'password'}
+        return {'user': fields, 'created': token.created}
+
+    def restore(self, key, snapshot):
+        User = get_user_model()
+        fields = snapshot['user']
+        user = User.from_db(User.objects.db, list(fields), list(fields.values()))
+        token = Token(key=key, user=user, created=snapshot['created'])
+        token._state.adding = False
+        return user, token
+
+    def authenticate_credentials(self, key):
+        snapshot = self.cache.get(key)
+        if snapshot is None:
+            generation = self.cache.generation
+            try:
+                token = Token.objects.select_related('user').get(key=key)
+            except Token.DoesNotExist:
+                raise exceptions.AuthenticationFailed('Invalid token.')
+            snapshot = self.snapshot(token)
+            self.cache.set(key, token.user_id, snapshot, generation)
+
+        user, token = self.restore(key, snapshot)
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed('User inactive or deleted.')
+        return user, token
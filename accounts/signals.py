@@ -1,9 +1,26 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 from django.conf import settings
+from rest_framework.authtoken.models import Token
+from .authentication import token_cache
 from .models import Profile
 
 @receiver(post_save, sender=settings.AUTH_USER_MODEL)
 def create_user_profile(sender, instance, created, **kwargs):
     if created:
         Profile.objects.create(user=instance)
+
+
+# --- Token auth cache invalidation (this process; other workers expire by TTL)
+
+@receiver(post_delete, sender=Token)
+def forget_deleted_token(sender, instance, **kwargs):
+    token_cache.discard(instance.key)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def forget_user_tokens(sender, instance, created=False, **kwargs):
+    # Any saved change (role, is_active, ...) must not be served from a stale snapshot
+    if not created:
+        token_cache.discard_user(instance.pk)
@@ -0,0 +1,94 @@
+from django.db import connection
+from django.test import SimpleTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+
+from ..authentication import TokenCache, token_cache
+from ..models import CustomUser
+
+
+class CachedTokenAuthenticationTests(APITestCase):
+    def setUp(self):
+        token_cache.clear()
+        self.user = CustomUser.objects.create_user(username="farmer1", password="password123", role="farmer")
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+        self.url = reverse('profile')
+
+    def queries_for_profile(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(self.client.get(self.url).status_code, status.HTTP_200_OK)
+        return len(ctx.captured_queries)
+
+    def test_repeat_requests_skip_token_query(self):
+        first = self.queries_for_profile()
+        self.assertEqual(self.queries_for_profile(), first - 1)
+        self.assertEqual(token_cache.stats()['hits'], 1)
+        self.assertEqual(token_cache.stats()['misses'], 1)
+
+    def test_deleted_token_is_rejected(self):
+        self.queries_for_profile()
+        self.token.delete()
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivated_user_is_rejected(self):
+        self.queries_for_profile()
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_role_change_is_seen(self):
+        my_products = reverse('product-my-products')
+        self.assertEqual(self.client.get(my_products).status_code, status.HTTP_200_OK)
+        self.user.role = 'retailer'
+        self.user.save()
+        self.assertEqual(self.client.get(my_products).status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_stats_endpoint_is_admin_only(self):
+        url = reverse('auth-cache-stats')
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_403_FORBIDDEN)
+        self.user.is_staff = True
+        self.user.save()
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('hit_ratio', response.data)
+
+
+class TokenCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.now = 0
+        self.cache = TokenCache(max_entries=2, ttl=10, clock=lambda: self.now)
+
+    def put(self, key, user_id=1):
+        self.cache.set(key, user_id, {'key': key}, self.cache.generation)
+
+    def test_lru_eviction(self):
+        self.put('a')
+        self.put('b')
+        self.cache.get('a')  # 'b' is now least recently used
+        self.put('c')
+        self.assertIsNone(self.cache.get('b'))
+        self.assertIsNotNone(self.cache.get('a'))
+        self.assertEqual(self.cache.stats()['evictions'], 1)
+
+    def test_ttl_expiry(self):
+        self.put('a')
+        self.now = 11
+        self.assertIsNone(self.cache.get('a'))
+        self.assertEqual(self.cache.stats()['size'], 0)
+
+    def test_discard_user(self):
+        self.put('a', user_id=1)
+        self.put('b', user_id=2)
+        self.cache.discard_user(1)
+        self.assertIsNone(self.cache.get('a'))
+        self.assertIsNotNone(self.cache.get('b'))
+
+    def test_load_racing_an_invalidation_is_not_stored(self):
+        generation = self.cache.generation
+        self.cache.discard_user(1)  # e.g. deactivated while the token query ran
+        self.cache.set('a', 1, {'key': 'a'}, generation)
+        self.assertIsNone(self.cache.get('a'))
@@ -1,8 +1,9 @@
 from django.urls import path
-from .views import RegisterView, LoginView, ProfileRetrieveUpdateView
+from .views import RegisterView, LoginView, ProfileRetrieveUpdateView, TokenCacheStatsView
 
 urlpatterns = [
     path('register/', RegisterView.as_view(), name='register'),
     path('login/', LoginView.as_view(), name='login'),
     path('profile/', ProfileRetrieveUpdateView.as_view(), name='profile'),
+    path('auth-cache/', TokenCacheStatsView.as_view(), name='auth-cache-stats'),
 ]
\ No newline at end of file
@@ -8,6 +8,8 @@ from rest_framework.authtoken.views import ObtainAuthToken
 from rest_framework.authtoken.models import Token
 from rest_framework.response import Response
 from rest_framework import status
+from rest_framework.views import APIView
+from .authentication import token_cache
 
 class RegisterView(generics.CreateAPIView):
     queryset = CustomUser.objects.all()
@@ -41,4 +43,13 @@ class ProfileRetrieveUpdateView(generics.RetrieveUpdateAPIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get_object(self):
-        return self.request.user.profile
\ No newline at end of file
+        return self.request.user.profile
+
+class TokenCacheStatsView(APIView):
+    """
+    GET: hit/miss counters of this worker's token authentication cache (admins only).
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return Response(token_cache.stats())
@@ -0,0 +1,17 @@
+"""
+Endpoint regression benchmarks (not part of the regular test run).
+
+    python manage.py test benchmarks --pattern="bench_*.py"
+
+Seeds a production-sized marketplace (benchmarks.seed) into the test
+database, requests every API route (benchmarks.cases) and compares SQL
+query count, wall time and peak allocation per endpoint with
+benchmarks/baseline.json.
+
+Environment:
+- BENCH_SCALE=0.05            smaller data set, with its own budgets in baseline.json
+- BENCH_REPEAT=5              timed runs per endpoint (median is kept)
+- BENCH_UPDATE_BASELINE=1     rewrite baseline.json from this run instead of comparing
+- BENCH_REPORT=path.json      also write this run's numbers to a file (e.g. a CI artifact)
+- BENCH_TIME_TOLERANCE / BENCH_MEMORY_TOLERANCE   allowed slowdown / growth (1.0 = +100%)
+"""
@@ -0,0 +1,87 @@
+import os
+import sys
+from pathlib import Path
+
+from django.core.cache import cache
+from django.db import transaction
+from django.test import override_settings
+from rest_framework.test import APITestCase
+
+from .cases import CASES, METRICS_TOKEN, route_methods
+from .measure import Probe, load_baseline, repeat, write_results
+from .seed import scale, seed
+
+
+# Slow-query logging off: at these volumes it would drown the report
+@override_settings(METRICS={'ENABLED': True, 'SERVER_TIMING': False, 'SLOW_QUERY_MS': 0, 'TOKEN': METRICS_TOKEN})
+class EndpointBenchmark(APITestCase):
+    """
+    One request per benchmark case against the seeded data set, each in a
+    rolled-back transaction with the response cache cleared (cold path).
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        # Only the actors are kept: test data attributes are deep-copied per test
+        cls.actors = seed()
+
+    def test_every_route_has_a_case(self):
+        covered = {(case.route, case.method) for case in CASES}
+        self.assertEqual(route_methods() - covered, set(), "Routes without a benchmark case (add them to benchmarks/cases.py)")
+        self.assertEqual(covered - route_methods(), set(), "Benchmark cases for routes that no longer exist")
+
+    def test_endpoints_within_budget(self):
+        budgets = load_baseline(scale()) or {}
+        updating = os.environ.get('BENCH_UPDATE_BASELINE') == '1'
+        results = {}
+        for case in CASES:
+            with self.subTest(case.name):
+                results[case.name] = measurement = Probe(lambda measure: self.execute(case, measure)).measure(repeat())
+                if updating:
+                    continue
+                if case.name not in budgets:
+                    self.fail(f"No baseline at scale {scale()}; run with BENCH_UPDATE_BASELINE=1 and commit benchmarks/baseline.json")
+                problems = measurement.over_budget(budgets[case.name])
+                if problems:
+                    self.fail("Over budget: " + ', '.join(problems))
+
+        self.report(results, budgets)
+        if updating:
+            write_results(results, scale())
+        if os.environ.get('BENCH_REPORT'):
+            write_results(results, scale(), Path(os.environ['BENCH_REPORT']))
+
+    def execute(self, case, measure):
+        with transaction.atomic():
+            cache.clear()
+            setup_kwargs = case.setup(self.actors) if case.setup else None
+            user = None
+            if case.user:
+                # A fresh instance: nothing (e.g. user.profile) cached from the previous run
+                actor = getattr(self.actors, case.user)
+                user = type(actor).objects.get(pk=actor.pk)
+            self.client.force_authenticate(user=user)
+            url = case.url(self.actors, setup_kwargs)
+            body = case.body(self.actors)
+            if case.content_type:
+                extra = {'data': body, 'content_type': case.content_type}
+            elif case.method == 'get':
+                extra = {'data': case.params}
+            else:
+                extra = {'data': body, 'format': 'json'}
+
+            with measure:
+                response = getattr(self.client, case.method)(url, headers=case.headers, **extra)
+                if response.streaming:
+                    b''.join(response.streaming_content)
+            transaction.set_rollback(True)
+        self.assertEqual(response.status_code, case.status, getattr(response, 'data', None))
+
+    def report(self, results, budgets):
+        lines = [f"\n{'endpoint':<52} {'queries':>8} {'ms':>9} {'peak KiB':>9}   budget q/ms/KiB"]
+        for name, result in results.items():
+            budget = budgets.get(name)
+            budget = f"{budget['queries']}/{budget['time_ms']}/{budget['peak_kib']}" if budget else 'none'
+            lines.append(f'{name:<52} {result.queries:>8} {result.time_ms:>9.1f} {result.peak_kib:>9.1f}   {budget}')
+        lines.append(f"scale {scale()}")
+        sys.stderr.write('\n'.join(lines) + '\n')
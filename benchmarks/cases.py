@@ -0,0 +1,181 @@
+"""
+One benchmark case per (route, HTTP method) in harvestplace/urls.py.
+
+Cases are measured inside a transaction that is rolled back afterwards, so
+writes (order placement, cancellation, deletes) see the same data on every
+run. `setup` runs inside that transaction but outside the measurement.
+"""
+from dataclasses import dataclass, field
+from typing import Callable
+
+from django.urls import URLPattern, URLResolver, get_resolver, reverse
+from django.utils import timezone
+from django.utils.text import slugify
+
+from market.models import Category
+from wallet.models import Wallet
+from .seed import PASSWORD
+
+METRICS_TOKEN = 'bench-scrape'
+
+# Django admin pages are server-rendered HTML for staff, not API routes
+EXCLUDED_NAMESPACES = {'admin'}
+SKIPPED_METHODS = {'head', 'options', 'trace'}
+
+
+@dataclass(frozen=True)
+class Case:
+    route: str
+    method: str = 'get'
+    user: str | None = None                 # seed actor: 'retailer', 'farmer' or 'admin'; None is anonymous
+    kwargs: Callable | None = None          # actors -> URL kwargs
+    params: dict = field(default_factory=dict)
+    data: Callable | dict | None = None     # request body, or actors -> body
+    content_type: str | None = None         # raw body instead of JSON
+    headers: dict = field(default_factory=dict)
+    setup: Callable | None = None           # actors -> URL kwargs, run before the measured request
+    status: int = 200
+    label: str = ''
+
+    @property
+    def name(self):
+        name = f'{self.method.upper()} {self.route}'
+        return f'{name} ({self.label})' if self.label else name
+
+    def url(self, actors, setup_kwargs=None):
+        kwargs = setup_kwargs or (self.kwargs(actors) if self.kwargs else {})
+        return reverse(self.route, kwargs=kwargs)
+
+    def body(self, actors):
+        return self.data(actors) if callable(self.data) else self.data
+
+
+def credit_buyer(actors):
+    # Order placement must not fail on the ledger's current balance
+    Wallet.objects.get(user=actors.retailer).credit(actors.other_product.price * 10, description='Benchmark top-up')
+    return {}
+
+
+def leaf_category(actors):
+    return {'pk': Category.objects.create(name='Bench Leaf').pk}
+
+
+def import_rows(actors, rows=50):
+    lines = ['name,category,price,stock,location,tags']
+    lines += [f'Bench Yam {i},{actors.category.slug},{100 + i},20,Oyo,"bulk, organic"' for i in range(rows)]
+    return '\n'.join(lines).encode()
+
+
+def product_body(actors):
+    return {
+        'name': 'Bench Tomato', 'price': '250.00', 'stock': '40', 'category': actors.category.slug,
+        'harvest_date': '2025-06-01', 'description': 'Benchmark product', 'tags': 'organic, bulk',
+    }
+
+
+def product(actors):
+    return {'pk': actors.product.pk}
+
+
+def category(actors):
+    return {'pk': actors.category.pk}
+
+
+CASES = [
+    # --- accounts
+    Case('register', 'post', data={'username': 'bench_new', 'email': 'new@example.com', 'password': 'Secret123!', 'role': 'retailer'}, status=201),
+    Case('login', 'post', data=lambda actors: {'username': actors.retailer.username, 'password': PASSWORD}),
+    Case('profile', user='retailer'),
+    Case('profile', 'put', user='retailer', data={'phone_number': '08012345678', 'bio': 'Bulk buyer', 'location': 'Lagos'}),
+    Case('profile', 'patch', user='retailer', data={'bio': 'Bulk buyer'}),
+    Case('auth-cache-stats', user='admin'),
+
+    # --- market: categories
+    Case('category-list'),
+    Case('category-list', 'post', user='admin', data={'name': 'Bench Category'}, status=201),
+    Case('category-tree'),
+    Case('category-detail', kwargs=category),
+    Case('category-detail', 'put', user='admin', kwargs=category, data={'name': 'Renamed Category'}),
+    Case('category-detail', 'patch', user='admin', kwargs=category, data={'name': 'Renamed Category'}),
+    Case('category-detail', 'delete', user='admin', setup=leaf_category, status=204),
+
+    # --- market: products
+    Case('api-root'),
+    Case('product-list'),
+    Case('product-list', label='cursor', params={'pagination': 'cursor'}),
+    Case('product-list', label='search', params={'search': 'fresh tomato'}),
+    Case('product-list', label='category subtree', params={'category_tree': 'vegetables'}),
+    Case('product-list', label='tags all', params={'tags': 'organic,bulk', 'tags_match': 'all'}),
+    Case('product-list', label='ordering price', params={'ordering': '-price'}),
+    Case('product-list', 'post', user='farmer', data=product_body, status=201),
+    Case('product-detail', kwargs=product),
+    Case('product-detail', 'put', user='farmer', kwargs=product, data=product_body),
+    Case('product-detail', 'patch', user='farmer', kwargs=product, data={'stock': '35'}),
+    Case('product-detail', 'delete', user='farmer', kwargs=product, status=204),
+    Case('product-bulk-import', 'post', user='farmer', data=import_rows, content_type='text/csv', status=201),
+    Case('product-by-slug', kwargs=lambda actors: {'slug': slugify(actors.product.name)}),
+    Case('product-facets'),
+    Case('product-facets', label='search', params={'search': 'yam'}),
+    Case('product-my-products', user='farmer'),
+    Case('my-products', user='farmer'),
+
+    # --- orders
+    Case('order-list', user='retailer'),
+    Case('order-list', label='cursor', user='retailer', params={'pagination': 'cursor'}),
+    Case('order-list', 'post', user='retailer', setup=credit_buyer, status=201,
+         data=lambda actors: {'items': [{'product': actors.other_product.pk, 'quantity': 2}]}),
+    Case('order-detail', user='retailer', kwargs=lambda actors: {'pk': actors.pending_order.pk}),
+    # OrderSerializer has no nested update: a PUT only ever gets as far as validation
+    Case('order-detail', 'put', user='retailer', kwargs=lambda actors: {'pk': actors.pending_order.pk}, data={'items': []}, status=400),
+    # DELETE cancels (state machine + compensation); the order row stays
+    Case('order-detail', 'delete', user='retailer', kwargs=lambda actors: {'pk': actors.pending_order.pk}, status=204),
+    Case('my-orders', user='retailer'),
+    Case('order-inbox', user='farmer'),
+    Case('order-export', user='retailer', params={'output': 'csv'}),
+    Case('order-export', label='farmer', user='farmer', params={'output': 'ndjson', 'role': 'farmer'}),
+    Case('order-cancel', 'post', user='retailer', kwargs=lambda actors: {'pk': actors.pending_order.pk}),
+    Case('order-status-update', 'patch', user='farmer', kwargs=lambda actors: {'pk': actors.processing_order.pk},
+         data={'status': 'shipped'}),
+    Case('order-status-bulk', 'post', user='farmer', data=lambda actors: {'orders': [actors.processing_order.pk], 'status': 'shipped'}),
+
+    # --- wallet
+    Case('wallet-detail', user='retailer'),
+    Case('wallet-deposit', 'post', user='retailer', data={'amount': '100.00'}),
+    Case('wallet-transactions', user='retailer'),
+    Case('wallet-transactions', label='month', user='retailer', params={'month': timezone.now().strftime('%Y-%m')}),
+    Case('wallet-transactions-export', user='retailer', params={'output': 'csv'}),
+
+    # --- operations
+    Case('metrics', headers={'Authorization': f'Bearer {METRICS_TOKEN}'}),
+]
+
+
+def route_methods():
+    """
+    Every (route name, method) the URLconf serves, admin excluded.
+    """
+    found = set()
+
+    def walk(patterns, namespace=None):
+        for pattern in patterns:
+            if isinstance(pattern, URLResolver):
+                if (pattern.namespace or namespace) not in EXCLUDED_NAMESPACES:
+                    walk(pattern.url_patterns, pattern.namespace or namespace)
+                continue
+            if not pattern.name:
+                continue
+            found.update((pattern.name, method) for method in view_methods(pattern))
+
+    walk(get_resolver().url_patterns)
+    return found
+
+
+def view_methods(pattern: URLPattern):
+    callback = pattern.callback
+    actions = getattr(callback, 'actions', None)
+    if actions:
+        return set(actions) - SKIPPED_METHODS
+    view_class = getattr(callback, 'cls', None) or getattr(callback, 'view_class', None)
+    if view_class is None:
+        return {'get'}  # plain function view
+    return {method for method in view_class.http_method_names if method not in SKIPPED_METHODS and hasattr(view_class, method)}
@@ -0,0 +1,134 @@
+"""
+Measurements and the stored baseline (benchmarks/baseline.json).
+
+Per endpoint: SQL queries, median wall time and peak Python allocation of
+one request (tracemalloc, taken on a separate run so it does not slow the
+timed ones). Budgets are kept per BENCH_SCALE, since chunked exports and
+unpaginated lists legitimately grow with the data.
+- Query counts are exact: one query more than the budget fails
+- Time and memory fail only past a tolerance; they are machine dependent,
+  so loosen BENCH_TIME_TOLERANCE on slower CI boxes
+"""
+import json
+import os
+import statistics
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+BASELINE_PATH = Path(__file__).with_name('baseline.json')
+
+TIME_TOLERANCE = float(os.environ.get('BENCH_TIME_TOLERANCE', '1.0'))      # +100%: wall time is noisy
+TIME_FLOOR_MS = 10.0         # differences below this are noise
+MEMORY_TOLERANCE = float(os.environ.get('BENCH_MEMORY_TOLERANCE', '0.25'))  # +25%
+MEMORY_FLOOR_KIB = 64.0
+
+
+def repeat():
+    return int(os.environ.get('BENCH_REPEAT', '5'))
+
+
+@dataclass
+class Measurement:
+    queries: int
+    time_ms: float
+    peak_kib: float
+
+    def over_budget(self, budget):
+        """
+        Human-readable reasons this measurement breaks `budget` (a dict from
+        the baseline); empty when within budget.
+        """
+        problems = []
+        if self.queries > budget['queries']:
+            problems.append(f"{self.queries} queries (budget {budget['queries']})")
+        time_limit = max(budget['time_ms'] * (1 + TIME_TOLERANCE), budget['time_ms'] + TIME_FLOOR_MS)
+        if self.time_ms > time_limit:
+            problems.append(f"{self.time_ms:.1f} ms (budget {budget['time_ms']:.1f} ms)")
+        memory_limit = max(budget['peak_kib'] * (1 + MEMORY_TOLERANCE), budget['peak_kib'] + MEMORY_FLOOR_KIB)
+        if self.peak_kib > memory_limit:
+            problems.append(f"{self.peak_kib:.0f} KiB peak (budget {budget['peak_kib']:.0f} KiB)")
+        return problems
+
+
+class Probe:
+    """
+    Runs one request through `execute(measure)`, where `measure` is a
+    context manager wrapped around exactly the part to be measured.
+    """
+
+    def __init__(self, execute):
+        self.execute = execute
+
+    def queries(self):
+        context = CaptureQueriesContext(connection)
+        self.execute(context)
+        return len(context.captured_queries)
+
+    def time_ms(self, runs):
+        timings = []
+        for _ in range(runs):
+            timer = Timer()
+            self.execute(timer)
+            timings.append(timer.elapsed * 1000)
+        return statistics.median(timings)
+
+    def peak_kib(self):
+        tracer = AllocationTracer()
+        self.execute(tracer)
+        return tracer.peak / 1024
+
+    def measure(self, runs):
+        self.execute(Timer())  # warm-up: imports, URL resolver and serializer caches
+        return Measurement(self.queries(), round(self.time_ms(runs), 2), round(self.peak_kib(), 1))
+
+
+class Timer:
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.elapsed = time.perf_counter() - self.start
+
+
+class AllocationTracer:
+    def __enter__(self):
+        tracemalloc.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+
+def scale_key(scale):
+    return str(float(scale))
+
+
+def load_baseline(scale, path=BASELINE_PATH):
+    """
+    Budgets recorded at `scale`, {endpoint name: measurement dict}, or None.
+    """
+    if not path.exists():
+        return None
+    with open(path) as stream:
+        return json.load(stream).get(scale_key(scale))
+
+
+def write_results(results, scale, path=BASELINE_PATH):
+    """
+    Store `results` as the budgets for `scale`, keeping other scales' entries.
+    """
+    data = {}
+    if path.exists():
+        with open(path) as stream:
+            data = json.load(stream)
+    data[scale_key(scale)] = {name: asdict(results[name]) for name in sorted(results)}
+    with open(path, 'w') as stream:
+        json.dump(dict(sorted(data.items())), stream, indent=2)
+        stream.write('\n')
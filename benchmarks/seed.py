@@ -0,0 +1,43 @@
+"""
+Benchmark data set: harvestplace.datagen at BENCH_SCALE (environment,
+default 1.0, i.e. 100k products and 1M wallet transactions), plus the few
+rows the write cases act on. baseline.json keeps one set of budgets per
+scale.
+"""
+import os
+from types import SimpleNamespace
+
+from django.contrib.auth import get_user_model
+
+from harvestplace.datagen import PASSWORD, MarketplaceGenerator
+from market.models import Product
+from orders.services import place_order, transition_orders
+from wallet.models import Wallet
+
+
+def scale():
+    return float(os.environ.get('BENCH_SCALE', '1.0'))
+
+
+def seed():
+    """
+    Generate the data set and return the actors the cases use. The farmer
+    and retailer are the busiest of their kind.
+    """
+    generator = MarketplaceGenerator(scale=scale(), prefix='bench')
+    generator.run()
+    farmer, retailer = generator.farmers[0], generator.retailers[0]
+    admin = get_user_model().objects.create_user(username='bench_admin', password=PASSWORD, role='retailer', is_staff=True)
+
+    product = Product.objects.filter(farmer=farmer).order_by('pk').first()
+    other_product = Product.objects.exclude(farmer=farmer).filter(stock__gt=10).order_by('pk').first()
+    # One order to cancel and one the farmer can advance, placed through the real checkout
+    Wallet.objects.get(user=retailer).credit((product.price + other_product.price) * 10, description='Benchmark top-up')
+    pending_order = place_order(retailer, [{'product': other_product, 'quantity': 1}])
+    processing_order = place_order(retailer, [{'product': product, 'quantity': 1}])
+    transition_orders(farmer, [processing_order.pk], 'processing')
+
+    return SimpleNamespace(
+        admin=admin, farmer=farmer, retailer=retailer, product=product, other_product=other_product,
+        category=generator.categories[0], pending_order=pending_order, processing_order=processing_order,
+    )
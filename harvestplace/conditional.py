@@ -0,0 +1,135 @@
+"""
+Conditional GET support (ETag / Last-Modified) for API views.
+
+Validators are derived from one aggregate query — MAX(updated_at) and COUNT(*)
+over the queryset the action would render — so a client polling an unchanged
+resource gets a 304 before any serializer runs. The action reuses the filtered
+queryset, and PageOrCursorPagination the COUNT(*); views with a response cache
+(market.cache.CachedReadMixin) keep the aggregates next to the cached payload.
+"""
+import hashlib
+
+from django.db.models import Count, Max
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.response import Response
+
+
+class NotModified(APIException):
+    status_code = status.HTTP_304_NOT_MODIFIED
+    default_detail = 'Not modified.'
+
+
+class ConditionalGetMixin:
+    """
+    Add ETag/Last-Modified to safe `conditional_actions` and answer
+    If-None-Match / If-Modified-Since with 304.
+
+    Views narrow what the validators cover via `get_conditional_queryset()`
+    and add extra aggregates (e.g. of embedded related rows) via
+    `get_conditional_aggregates()`; every aggregate named `last_modified*`
+    feeds into Last-Modified. Every caller of `filter_queryset()` in one
+    request must pass `get_queryset()`, as DRF's generic actions do.
+    """
+    conditional_actions = ('list', 'retrieve')
+    last_modified_field = 'updated_at'
+
+    def filter_queryset(self, queryset):
+        # The validators and the action both filter this request's
+        # get_queryset(): run the filter backends once and share the result
+        if getattr(self, 'filtered_queryset', None) is None:
+            self.filtered_queryset = super().filter_queryset(queryset)
+        return self.filtered_queryset
+
+    def get_conditional_queryset(self):
+        queryset = self.filter_queryset(self.get_queryset())
+        if self.action == 'retrieve':
+            lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+            queryset = queryset.filter(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+        return queryset
+
+    def get_conditional_aggregates(self):
+        return {
+            'last_modified': Max(self.last_modified_field),
+            'count': Count('pk'),
+        }
+
+    def get_conditional_values(self):
+        """
+        The aggregate values the validators are built from.
+        """
+        queryset = self.get_conditional_queryset()
+        values = queryset.order_by().aggregate(**self.get_conditional_aggregates())
+        if queryset is getattr(self, 'filtered_queryset', None):
+            self.known_count = values['count']
+        return values
+
+    def get_known_count(self, queryset):
+        """
+        Row count of `queryset` when the validators already counted it, so
+        the paginator can skip its COUNT(*); None otherwise.
+        """
+        if queryset is getattr(self, 'filtered_queryset', None):
+            return getattr(self, 'known_count', None)
+        return None
+
+    def get_validators(self, request):
+        """
+        Return (etag, last_modified) or None when there is nothing to validate
+        (e.g. a retrieve of a missing object, which must still 404).
+        """
+        values = self.conditional_values = self.get_conditional_values()
+        if self.action == 'retrieve' and not values['count']:
+            return None
+
+        stamps = [v for k, v in values.items() if k.startswith('last_modified') and v is not None]
+        last_modified = max(stamps) if stamps else None
+        user_id = request.user.pk if request.user and request.user.is_authenticated else ''
+        raw = '|'.join([
+            request.get_full_path(),
+            request.META.get('HTTP_ACCEPT', ''),
+            str(user_id),
+            *[f'{key}={value}' for key, value in sorted(values.items())],
+        ])
+        etag = quote_etag(hashlib.md5(raw.encode()).hexdigest())
+        return etag, last_modified
+
+    def is_not_modified(self, request, etag, last_modified):
+        if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+        if if_none_match:
+            # Weak comparison: W/"x" matches "x"
+            candidates = {tag.strip().removeprefix('W/') for tag in if_none_match.split(',')}
+            return '*' in candidates or etag in candidates
+
+        if_modified_since = parse_http_date_safe(request.META.get('HTTP_IF_MODIFIED_SINCE', ''))
+        if if_modified_since is not None and last_modified is not None:
+            return int(last_modified.timestamp()) <= if_modified_since
+        return False
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self.validators = None
+        if request.method in ('GET', 'HEAD') and self.action in self.conditional_actions:
+            self.validators = self.get_validators(request)
+            if self.validators and self.is_not_modified(request, *self.validators):
+                raise NotModified()
+
+    def set_validator_headers(self, response):
+        etag, last_modified = self.validators
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified.timestamp())
+
+    def handle_exception(self, exc):
+        if isinstance(exc, NotModified):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+            self.set_validator_headers(response)
+            return response
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if getattr(self, 'validators', None) and response.status_code == status.HTTP_200_OK:
+            self.set_validator_headers(response)
+        return response
@@ -0,0 +1,417 @@
+"""
+Synthetic marketplace data (manage.py generate_marketplace, benchmarks).
+
+Writes users, a category tree, products, orders with their lines and status
+history, and wallet ledgers that agree with those orders, all through
+batched bulk_create. One seeded Random drives every choice, so the same
+arguments (including --end) produce the same rows.
+- Skew: a few farmers own most products, a few products take most order
+  lines and a few buyers place most orders (rank-based Zipf weights)
+- Money adds up: every purchase is a ledger debit (preceded by a deposit
+  when the balance would not cover it), cancellations are refunded, and sale
+  proceeds are settled once a day per farmer (PendingSettlement rows linked
+  to that credit); the last day's proceeds are left open. wallet.balance and
+  a checkpoint match the last ledger entry.
+- bulk_create sends no signals: profiles, wallets, tag links and the search
+  index are written here instead
+- Needs a backend that returns ids from bulk inserts (SQLite >= 3.35,
+  PostgreSQL)
+"""
+import random
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from decimal import Decimal
+from itertools import accumulate, islice
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils import timezone
+from django.utils.text import slugify
+
+from accounts.models import Profile
+from market import cache as market_cache
+from market import search
+from market.models import Category, Product, ProductTag, Tag
+from orders.models import Order, OrderItem, OrderStatusTransition
+from wallet.models import BalanceCheckpoint, PendingSettlement, Transaction, Wallet
+
+BASE_VOLUMES = {
+    'farmers': 1_000,
+    'retailers': 4_000,
+    'products': 100_000,
+    'orders': 20_000,
+    'transactions': 1_000_000,  # ledger entries, order-driven ones included
+}
+BATCH_SIZE = 5_000
+PASSWORD = 'harvest-pass'
+SEED = 2025
+
+PRODUCE = [
+    'Tomato', 'Yam', 'Cassava', 'Maize', 'Rice', 'Beans', 'Pepper', 'Onion', 'Plantain', 'Cocoyam',
+    'Okra', 'Garden Egg', 'Cucumber', 'Carrot', 'Cabbage', 'Watermelon', 'Pineapple', 'Orange',
+    'Mango', 'Pawpaw', 'Groundnut', 'Sorghum', 'Millet', 'Soybean', 'Ginger',
+]
+VARIETIES = ['Fresh', 'Organic', 'Dried', 'Premium', 'Local', 'Hybrid']
+LOCATIONS = ['Lagos', 'Oyo', 'Kano', 'Kaduna', 'Benue', 'Plateau', 'Ogun', 'Enugu', 'Rivers', 'Niger']
+TAGS = ['organic', 'bulk', 'export', 'seasonal', 'irrigated', 'smallholder', 'certified', 'grade-a']
+CATEGORY_TREE = {
+    'Vegetables': ['Leafy', 'Fruit Vegetables', 'Bulbs', 'Roots', 'Pods'],
+    'Fruits': ['Citrus', 'Tropical', 'Melons', 'Berries', 'Stone Fruits'],
+    'Grains': ['Cereals', 'Rice', 'Maize', 'Millet', 'Sorghum'],
+    'Tubers': ['Yam', 'Cassava', 'Cocoyam', 'Potato', 'Sweet Potato'],
+    'Legumes': ['Beans', 'Groundnut', 'Soybean', 'Cowpea', 'Bambara'],
+    'Spices': ['Pepper', 'Ginger', 'Garlic', 'Turmeric', 'Curry Leaf'],
+}
+
+# Final status an order is headed for, and the states it passes through on the way
+STATUS_WEIGHTS = {'delivered': 55, 'shipped': 12, 'processing': 8, 'pending': 10, 'canceled': 15}
+STATUS_PATHS = {
+    'pending': [],
+    'processing': ['processing'],
+    'shipped': ['processing', 'shipped'],
+    'delivered': ['processing', 'shipped', 'delivered'],
+    'canceled': ['canceled'],
+}
+# Hours from the previous state, (min, max)
+STAGE_DELAYS = {'processing': (1, 24), 'shipped': (24, 72), 'delivered': (24, 96), 'canceled': (1, 12)}
+LINES_PER_ORDER = ([1, 2, 3, 4, 5], [35, 30, 18, 10, 7])
+
+
+def volumes(scale=1.0, **overrides):
+    counts = {name: max(int(count * scale), 10) for name, count in BASE_VOLUMES.items()}
+    counts.update({name: value for name, value in overrides.items() if value is not None})
+    return counts
+
+
+def zipf_weights(n, s=0.8):
+    """
+    Cumulative weights for rank-skewed picks with Random.choices(cum_weights=...).
+    """
+    return list(accumulate(1 / (rank + 1) ** s for rank in range(n)))
+
+
+def batched(iterable, size=BATCH_SIZE):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+@contextmanager
+def explicit_timestamps(*models):
+    """
+    Let bulk_create keep the created_at/updated_at values we set instead of
+    stamping auto_now / auto_now_add fields with the current time.
+    """
+    fields = [
+        field for model in models for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)
+    ]
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+class MarketplaceGenerator:
+    """
+    MarketplaceGenerator(scale=0.1, prefix='demo').run() -> Counter of rows per model.
+    Usernames are `<prefix>_farmer<n>` / `<prefix>_retailer<n>`, rank 0 being
+    the busiest of each.
+    """
+
+    def __init__(self, scale=1.0, seed=SEED, end=None, days=365, prefix='gen', batch_size=BATCH_SIZE, log=None, **counts):
+        self.volumes = volumes(scale, **counts)
+        self.rng = random.Random(seed)
+        self.end = end or timezone.now()
+        self.start = self.end - timedelta(days=days)
+        self.prefix = prefix
+        self.batch_size = batch_size
+        self.log = log or (lambda message: None)
+        self.created = Counter()
+
+    def run(self):
+        User = get_user_model()
+        with transaction.atomic(), explicit_timestamps(User, Wallet, Product, Order):
+            for label, step in [
+                ('users', self.create_users),
+                ('categories', self.create_categories),
+                ('products', self.create_products),
+                ('orders', self.create_orders),
+                ('ledger', self.create_ledger),
+                ('search index', self.index),
+            ]:
+                started = time.monotonic()
+                step()
+                self.log(f"{label}: {time.monotonic() - started:.1f}s")
+        return self.created
+
+    def bulk_create(self, model, objects):
+        for batch in batched(objects, self.batch_size):
+            model.objects.bulk_create(batch)
+            self.created[model._meta.label] += len(batch)
+
+    def between(self, start, end):
+        return start + (end - start) * self.rng.random()
+
+    # ------------------------------------------------------------ users
+
+    def create_users(self):
+        User = get_user_model()
+        password = make_password(PASSWORD)  # hashing is the slow part; do it once
+        joined_from, joined_to = self.start - timedelta(days=365), self.start - timedelta(days=180)
+
+        def user(role, n):
+            return User(
+                username=f'{self.prefix}_{role}{n}', email=f'{self.prefix}_{role}{n}@example.com', role=role,
+                location=self.rng.choice(LOCATIONS), password=password, date_joined=self.between(joined_from, joined_to),
+            )
+
+        self.farmers = [user(User.FARMER, n) for n in range(self.volumes['farmers'])]
+        self.retailers = [user(User.RETAILER, n) for n in range(self.volumes['retailers'])]
+        users = self.farmers + self.retailers
+        self.bulk_create(User, users)
+        self.bulk_create(Profile, (Profile(user=user, location=user.location) for user in users))
+        self.bulk_create(Wallet, (Wallet(user=user, created_at=user.date_joined, updated_at=user.date_joined) for user in users))
+        self.users = users
+
+    # ------------------------------------------------------------ catalog
+
+    def create_categories(self):
+        self.categories = []
+        for root_name, children in CATEGORY_TREE.items():
+            root, created = Category.objects.get_or_create(name=root_name)
+            self.created['market.Category'] += created
+            for name in children:
+                leaf, created = Category.objects.get_or_create(name=f'{root_name} / {name}', defaults={'parent': root})
+                self.created['market.Category'] += created
+                self.categories.append(leaf)
+
+    def create_products(self):
+        Tag.objects.bulk_create([Tag(slug=slug, name=slug.replace('-', ' ')) for slug in TAGS], ignore_conflicts=True)
+        tag_ids = dict(Tag.objects.filter(slug__in=TAGS).values_list('slug', 'pk'))
+        count = self.volumes['products']
+        owners = self.rng.choices(self.farmers, cum_weights=zipf_weights(len(self.farmers)), k=count)
+        slug_counts = Counter()
+        # Only what orders need later: (id, farmer id, price)
+        self.products = []
+
+        for batch in batched(owners, self.batch_size):
+            products, links = [], []
+            for owner in batch:
+                name = f'{self.rng.choice(VARIETIES)} {self.rng.choice(PRODUCE)}'
+                base = slugify(name)
+                slug_counts[(owner.pk, base)] += 1
+                n = slug_counts[(owner.pk, base)]
+                created = self.between(self.start - timedelta(days=180), self.start)
+                tags = self.rng.sample(TAGS, self.rng.randint(0, 3))
+                products.append(Product(
+                    farmer=owner, name=name, slug=base if n == 1 else f'{base}-{n}',  # Product.save() slugs
+                    description=f'{name} from {owner.location}, graded and bagged on the farm.',
+                    harvest_date=(created - timedelta(days=self.rng.randint(0, 30))).date(),
+                    price=Decimal(self.rng.randint(50, 5000)), stock=Decimal(self.rng.randint(0, 500)),
+                    location=owner.location, category=self.rng.choice(self.categories), tags=', '.join(tags),
+                    created_at=created, updated_at=created,
+                ))
+                links.append(tags)
+            self.bulk_create(Product, products)
+            self.bulk_create(ProductTag, (
+                ProductTag(product=product, tag_id=tag_ids[slug]) for product, tags in zip(products, links) for slug in tags
+            ))
+            self.products += [(product.pk, product.farmer_id, product.price) for product in products]
+
+    # ------------------------------------------------------------ orders
+
+    def create_orders(self):
+        """
+        Orders in time order across [start, end]. Status history follows
+        Order.TRANSITIONS and stops at `end`, so recent orders are the ones
+        still pending or in progress.
+        """
+        count = self.volumes['orders']
+        buyers = self.rng.choices(self.retailers, cum_weights=zipf_weights(len(self.retailers)), k=count)
+        times = sorted(self.between(self.start, self.end) for _ in range(count))
+        # Popularity is independent of creation order
+        ranked = list(range(len(self.products)))
+        self.rng.shuffle(ranked)
+        popularity = zipf_weights(len(ranked), s=1.0)
+        statuses, status_weights = list(STATUS_WEIGHTS), list(STATUS_WEIGHTS.values())
+
+        # Money movements, replayed per wallet by create_ledger
+        self.purchases = defaultdict(list)   # buyer id -> [(time, order id, total)]
+        self.refunds = defaultdict(list)     # buyer id -> [(time, order id, total)]
+        self.sales = defaultdict(list)       # farmer id -> [(time, order id, amount)]
+
+        for batch in batched(zip(buyers, times), self.batch_size):
+            orders, lines = [], []
+            for buyer, created in batch:
+                picks = self.rng.choices(ranked, cum_weights=popularity, k=self.rng.choices(*LINES_PER_ORDER)[0])
+                items = [
+                    OrderItem(product_id=self.products[i][0], farmer_id=self.products[i][1],
+                              quantity=self.rng.choices(range(1, 11), weights=[10, 6, 4, 3, 2, 2, 1, 1, 1, 1])[0],
+                              price=self.products[i][2])
+                    for i in dict.fromkeys(picks)
+                ]
+                order = Order(buyer=buyer, created_at=created, total_amount=sum(item.price * item.quantity for item in items))
+                order.history = self.history(order, self.rng.choices(statuses, weights=status_weights)[0])
+                orders.append(order)
+                lines.append(items)
+            self.bulk_create(Order, orders)
+
+            transitions = []
+            for order, items in zip(orders, lines):
+                for item in items:
+                    item.order_id = order.pk
+                previous = 'pending'
+                for status, at in order.history:
+                    actor = order.buyer_id if status == 'canceled' else items[0].farmer_id
+                    transitions.append(OrderStatusTransition(order_id=order.pk, from_status=previous, to_status=status,
+                                                             actor_id=actor, created_at=at))
+                    previous = status
+                self.record_money(order, items)
+            self.bulk_create(OrderItem, (item for items in lines for item in items))
+            self.bulk_create(OrderStatusTransition, transitions)
+
+    def history(self, order, target):
+        """
+        Walk toward `target`, setting status and *_at fields; returns the
+        [(status, time)] steps taken before `end`.
+        """
+        steps, at = [], order.created_at
+        for status in STATUS_PATHS[target]:
+            at += timedelta(hours=self.rng.uniform(*STAGE_DELAYS[status]))
+            if at > self.end:
+                break
+            setattr(order, Order.timestamp_field(status), at)
+            steps.append((status, at))
+        order.status = steps[-1][0] if steps else 'pending'
+        order.updated_at = steps[-1][1] if steps else order.created_at
+        return steps
+
+    def record_money(self, order, items):
+        self.purchases[order.buyer_id].append((order.created_at, order.pk, order.total_amount))
+        if order.status == 'canceled':
+            # Cancelled before any settlement ran: the open proceeds were voided
+            self.refunds[order.buyer_id].append((order.canceled_at, order.pk, order.total_amount))
+            return
+        proceeds = defaultdict(Decimal)
+        for item in items:
+            proceeds[item.farmer_id] += item.price * item.quantity
+        for farmer_id, amount in proceeds.items():
+            self.sales[farmer_id].append((order.created_at, order.pk, amount))
+
+    # ------------------------------------------------------------ wallets
+
+    def settlement_time(self, at):
+        """
+        Settlement runs at midnight after the sale; None if that is past `end`.
+        """
+        midnight = datetime.combine(at.date() + timedelta(days=1), datetime.min.time(), tzinfo=at.tzinfo)
+        return midnight if midnight <= self.end else None
+
+    def settlements(self, farmer_id):
+        """
+        ({settlement time: [(time, order id, amount)]}, [still open sales]).
+        """
+        settled, still_open = defaultdict(list), []
+        for sale in self.sales.get(farmer_id, ()):
+            settle_at = self.settlement_time(sale[0])
+            if settle_at is None:
+                still_open.append(sale)
+            else:
+                settled[settle_at].append(sale)
+        return settled, still_open
+
+    def create_ledger(self):
+        users = sorted(self.users, key=lambda user: user.pk)
+        plans = {user.pk: self.settlements(user.pk) for user in self.farmers}
+        driven = sum(map(len, self.purchases.values())) + sum(map(len, self.refunds.values()))
+        driven += sum(len(settled) for settled, _ in plans.values())
+        # Remaining volume is deposits, spread like the rest of the activity
+        activity = [len(self.purchases.get(user.pk, ())) + len(self.sales.get(user.pk, ())) + 1 for user in users]
+        deposits = Counter(user.pk for user in self.rng.choices(users, weights=activity, k=max(self.volumes['transactions'] - driven, 0)))
+
+        self.last_entries = {}
+        settlements = []
+        for batch in batched(self.entries(users, plans, deposits), self.batch_size):
+            self.bulk_create(Transaction, (entry for entry, _ in batch))
+            for entry, sales in batch:
+                self.last_entries[entry.wallet_id] = entry
+                settlements += [
+                    PendingSettlement(farmer_id=entry.user_id, order_id=order_id, amount=amount, description=f"Sale Order #{order_id}",
+                                      created_at=at, settled_at=entry.created_at, transaction_id=entry.pk)
+                    for at, order_id, amount in sales
+                ]
+            self.bulk_create(PendingSettlement, settlements)
+            settlements = []
+        self.bulk_create(PendingSettlement, (
+            PendingSettlement(farmer_id=farmer_id, order_id=order_id, amount=amount, description=f"Sale Order #{order_id}", created_at=at)
+            for farmer_id, (_, still_open) in plans.items() for at, order_id, amount in still_open
+        ))
+
+        wallets = list(Wallet.objects.filter(user__in=[user.pk for user in users]))
+        for wallet in wallets:
+            last = self.last_entries.get(wallet.pk)
+            if last is not None:
+                wallet.balance, wallet.updated_at = last.balance_after, last.created_at
+        for batch in batched(wallets, self.batch_size):
+            Wallet.objects.bulk_update(batch, ['balance', 'updated_at'])
+        # What checkpoint_wallets would have written on its last run
+        self.bulk_create(BalanceCheckpoint, (
+            BalanceCheckpoint(wallet_id=wallet_id, balance=entry.balance_after, last_transaction_id=entry.pk, as_of=entry.created_at)
+            for wallet_id, entry in self.last_entries.items()
+        ))
+
+    def entries(self, users, plans, deposits):
+        """
+        Yield (Transaction, settled sales) per wallet, oldest first, keeping
+        the running balance at or above zero.
+        """
+        wallet_ids = dict(Wallet.objects.filter(user__in=[user.pk for user in users]).values_list('user_id', 'pk'))
+        for user in users:
+            events = [(self.between(self.start, self.end), 'deposit', None, None) for _ in range(deposits[user.pk])]
+            events += [(at, 'purchase', order_id, total) for at, order_id, total in self.purchases.get(user.pk, ())]
+            events += [(at, 'refund', order_id, total) for at, order_id, total in self.refunds.get(user.pk, ())]
+            settled = plans[user.pk][0] if user.pk in plans else {}
+            events += [(at, 'settlement', sales, sum(sale[2] for sale in sales)) for at, sales in settled.items()]
+            events.sort(key=lambda event: (event[0], event[1] != 'deposit'))
+
+            balance = Decimal('0.00')
+            for at, kind, ref, amount in events:
+                if kind == 'purchase' and balance < amount:
+                    top_up = amount - balance + self.rng.randint(0, 20) * 1000
+                    balance += top_up
+                    yield self.entry(user, wallet_ids, at - timedelta(minutes=5), Transaction.CREDIT, top_up, balance, 'Manual deposit via API'), ()
+                if kind == 'deposit':
+                    amount = Decimal(self.rng.randint(10, 500) * 100)
+                    balance += amount
+                    yield self.entry(user, wallet_ids, at, Transaction.CREDIT, amount, balance, 'Manual deposit via API'), ()
+                elif kind == 'purchase':
+                    balance -= amount
+                    yield self.entry(user, wallet_ids, at, Transaction.DEBIT, amount, balance, f"Purchase Order #{ref}"), ()
+                elif kind == 'refund':
+                    balance += amount
+                    yield self.entry(user, wallet_ids, at, Transaction.CREDIT, amount, balance, f"Refund for Order #{ref}"), ()
+                else:
+                    balance += amount
+                    yield self.entry(user, wallet_ids, at, Transaction.CREDIT, amount, balance, f"Settlement of {len(ref)} sales"), ref
+
+    @staticmethod
+    def entry(user, wallet_ids, at, kind, amount, balance, description):
+        entry = Transaction(wallet_id=wallet_ids[user.pk], amount=amount, transaction_type=kind,
+                            description=description, balance_after=balance, created_at=at)
+        entry.user_id = user.pk  # for linking settlements; not a model field
+        return entry
+
+    # ------------------------------------------------------------ derived data
+
+    def index(self):
+        search.rebuild_index()
+        # Cached product lists predate the new rows
+        market_cache.invalidate_categories(*[category.pk for category in self.categories])
@@ -0,0 +1,6 @@
+"""
+Database plumbing for single-box deployments:
+- base.py: tuned SQLite backend (ENGINE 'harvestplace.db')
+- router.py: primary/replica read routing (DATABASE_ROUTERS)
+- benchmark.py: stock vs tuned SQLite throughput (manage.py benchmark_sqlite)
+"""
@@ -0,0 +1,177 @@
+"""
+Concurrent read/write throughput of SQLite, stock vs tuned backend
+(`manage.py benchmark_sqlite`).
+
+Worker processes, like gunicorn workers, share one scratch database file per
+configuration:
+- writers run a checkout-shaped transaction: read stock and balance,
+  decrement both, append a ledger row
+- readers look a product up and aggregate one wallet's ledger
+Every operation is one "request": the connection is released afterwards
+the way Django does at request end, so CONN_MAX_AGE=0 reconnects each time.
+"""
+import multiprocessing
+import queue
+import random
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.db import OperationalError, connections
+from django.db.utils import load_backend
+
+from harvestplace.metrics import percentile  # no model imports: workers load this before setup()
+
+CONFIGS = {
+    'stock': {'ENGINE': 'django.db.backends.sqlite3', 'CONN_MAX_AGE': 0, 'OPTIONS': {}},
+    'tuned': {'ENGINE': 'harvestplace.db', 'CONN_MAX_AGE': 600, 'OPTIONS': {}},
+}
+ALIAS = 'sqlite_benchmark'
+PRODUCTS = 10_000
+WALLETS = 1_000
+LEDGER_ROWS = 50_000
+STARTUP_TIMEOUT = 120  # seconds for spawned workers to import Django and report
+
+SCHEMA = [
+    'CREATE TABLE bench_product (id INTEGER PRIMARY KEY, name TEXT NOT NULL, price INTEGER NOT NULL, stock INTEGER NOT NULL)',
+    'CREATE TABLE bench_wallet (id INTEGER PRIMARY KEY, balance INTEGER NOT NULL)',
+    'CREATE TABLE bench_ledger (id INTEGER PRIMARY KEY, wallet_id INTEGER NOT NULL, amount INTEGER NOT NULL, '
+    'balance_after INTEGER NOT NULL)',
+    'CREATE INDEX bench_ledger_wallet ON bench_ledger (wallet_id)',
+]
+
+
+def open_database(name, path):
+    """
+    A connection with `name`'s configuration on `path`, kept out of
+    django.db.connections so the project's own databases are untouched.
+    """
+    settings = connections.configure_settings(
+        {'default': connections.settings['default'], ALIAS: {**CONFIGS[name], 'NAME': str(path)}}
+    )[ALIAS]
+    return load_backend(settings['ENGINE']).DatabaseWrapper(settings, ALIAS)
+
+
+@contextmanager
+def atomic(connection):
+    """
+    transaction.atomic() for a connection outside django.db.connections.
+    """
+    connection.set_autocommit(False, force_begin_transaction_with_broken_autocommit=True)
+    try:
+        yield
+        connection.commit()
+    except BaseException:
+        connection.rollback()
+        raise
+    finally:
+        connection.set_autocommit(True)
+
+
+def create_database(name, path, seed):
+    rng = random.Random(seed)
+    connection = open_database(name, path)
+    with atomic(connection), connection.cursor() as cursor:
+        for statement in SCHEMA:
+            cursor.execute(statement)
+        cursor.executemany(
+            'INSERT INTO bench_product (id, name, price, stock) VALUES (%s, %s, %s, %s)',
+            [(pk, f'product {pk}', rng.randint(100, 5_000), 10 ** 9) for pk in range(1, PRODUCTS + 1)],
+        )
+        cursor.executemany(
+            'INSERT INTO bench_wallet (id, balance) VALUES (%s, %s)', [(pk, 10 ** 12) for pk in range(1, WALLETS + 1)]
+        )
+        cursor.executemany(
+            'INSERT INTO bench_ledger (wallet_id, amount, balance_after) VALUES (%s, %s, %s)',
+            [(rng.randint(1, WALLETS), rng.randint(100, 5_000), 0) for _ in range(LEDGER_ROWS)],
+        )
+    connection.close()
+
+
+def write(cursor, rng):
+    product, wallet = rng.randint(1, PRODUCTS), rng.randint(1, WALLETS)
+    cursor.execute('SELECT price, stock FROM bench_product WHERE id = %s', [product])
+    price, _ = cursor.fetchone()
+    cursor.execute('SELECT balance FROM bench_wallet WHERE id = %s', [wallet])
+    balance = cursor.fetchone()[0] - price
+    cursor.execute('UPDATE bench_product SET stock = stock - 1 WHERE id = %s', [product])
+    cursor.execute('UPDATE bench_wallet SET balance = %s WHERE id = %s', [balance, wallet])
+    cursor.execute(
+        'INSERT INTO bench_ledger (wallet_id, amount, balance_after) VALUES (%s, %s, %s)', [wallet, -price, balance]
+    )
+
+
+def read(cursor, rng):
+    cursor.execute('SELECT id, name, price, stock FROM bench_product WHERE id = %s', [rng.randint(1, PRODUCTS)])
+    cursor.fetchone()
+    cursor.execute('SELECT COUNT(*), SUM(amount) FROM bench_ledger WHERE wallet_id = %s', [rng.randint(1, WALLETS)])
+    cursor.fetchone()
+
+
+def worker(name, path, role, duration, seed, barrier, results):
+    import django
+    django.setup()  # spawned process
+
+    connection = open_database(name, path)
+    rng = random.Random(seed)
+    timings, errors = [], 0
+    barrier.wait()
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline:
+        started = time.perf_counter()
+        try:
+            if role == 'write':
+                with atomic(connection), connection.cursor() as cursor:
+                    write(cursor, rng)
+            else:
+                with connection.cursor() as cursor:
+                    read(cursor, rng)
+            timings.append((time.perf_counter() - started) * 1000)
+        except OperationalError:
+            errors += 1
+        finally:
+            connection.close_if_unusable_or_obsolete()  # request_finished
+    connection.close()
+    results.put((role, timings, errors))
+
+
+def summarize(timings, errors, duration):
+    ordered = sorted(timings)
+    return {
+        'ops': len(ordered),
+        'ops_per_s': round(len(ordered) / duration, 1),
+        'p50_ms': round(percentile(ordered, 50), 2),
+        'p95_ms': round(percentile(ordered, 95), 2),
+        'p99_ms': round(percentile(ordered, 99), 2),
+        'errors': errors,
+    }
+
+
+def run(name, writers=4, readers=4, duration=10.0, seed=0):
+    """
+    Benchmark one configuration; {'write': summary, 'read': summary}.
+    """
+    context = multiprocessing.get_context('spawn')
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / f'{name}.sqlite3'
+        create_database(name, path, seed)
+        barrier, results = context.Barrier(writers + readers), context.Queue()
+        processes = [
+            context.Process(target=worker, args=(name, path, role, duration, seed + n, barrier, results))
+            for n, role in enumerate(['write'] * writers + ['read'] * readers)
+        ]
+        for process in processes:
+            process.start()
+        collected = {'write': ([], 0), 'read': ([], 0)}
+        for _ in processes:
+            try:
+                role, timings, errors = results.get(timeout=duration + STARTUP_TIMEOUT)
+            except queue.Empty:
+                for process in processes:
+                    process.terminate()
+                raise RuntimeError("A benchmark worker did not report back; see its traceback above.")
+            collected[role] = (collected[role][0] + timings, collected[role][1] + errors)
+        for process in processes:
+            process.join()
+    return {role: summarize(timings, errors, duration) for role, (timings, errors) in collected.items()}
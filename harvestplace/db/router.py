@@ -0,0 +1,155 @@
+"""
+Primary/replica routing (DATABASE_ROUTERS) with read-your-writes stickiness.
+
+Writes always go to `default`, the primary. Reads go to a replica only when
+ReplicaRoutingMiddleware has picked one for the current request, which it
+does for safe (GET/HEAD/OPTIONS) requests from clients that have not written
+recently. Everything else reads from the primary:
+- unsafe requests, and the STICKY_SECONDS after a successful one from the
+  same client (same Authorization header, or the pin cookie)
+- queries inside transaction.atomic (order create/cancel, wallet
+  credit/debit all lock and re-read there)
+- models of PRIMARY_APPS: tokens, users and idempotency keys must never be
+  stale
+- anything outside a request: management commands, workers, the shell
+One replica is chosen per request, so a COUNT and its page agree.
+
+Configured by settings.DATABASE_ROUTING ({'REPLICAS': [aliases], ...}); with
+no replicas every read goes to the primary. Stickiness markers live in the
+default cache, so share it between workers (CACHE_BACKEND=file) or rely on
+the cookie. STICKY_SECONDS must cover the replicas' lag.
+"""
+import hashlib
+import random
+import sqlite3
+from contextlib import closing, contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+PIN_COOKIE = 'db_pin'
+
+_read_alias = ContextVar('read_alias', default=None)  # replica for this request, None = primary
+
+
+def routing_setting(name):
+    defaults = {
+        'REPLICAS': [],
+        'STICKY_SECONDS': 5,
+        'PRIMARY_APPS': ['accounts', 'authtoken', 'sessions', 'idempotency'],
+    }
+    return getattr(settings, 'DATABASE_ROUTING', {}).get(name, defaults[name])
+
+
+def replica_alias():
+    """
+    The replica the current request reads from, or None for the primary.
+    """
+    alias = _read_alias.get()
+    if alias is None or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+        return None
+    return alias
+
+
+@contextmanager
+def use_primary():
+    """
+    Read from the primary inside this block, whatever the request was given.
+    """
+    token = _read_alias.set(None)
+    try:
+        yield
+    finally:
+        _read_alias.reset(token)
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label in routing_setting('PRIMARY_APPS'):
+            return DEFAULT_DB_ALIAS
+        return replica_alias() or DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        databases = {DEFAULT_DB_ALIAS, *routing_setting('REPLICAS')}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, **hints):
+        # Replicas are copies of the primary (see sync_replicas), never migrated
+        if db in routing_setting('REPLICAS'):
+            return False
+        return None
+
+
+def copy_database(path, using=DEFAULT_DB_ALIAS):
+    """
+    Online backup of an SQLite database onto the file at `path` (a replica).
+    Readers of the replica see either the old or the new copy, never a mix.
+    """
+    source = connections[using]
+    source.ensure_connection()
+    with closing(sqlite3.connect(path)) as target:
+        source.connection.backup(target)
+
+
+def read_from(alias, iterable):
+    iterator = iter(iterable)
+    while True:
+        token = _read_alias.set(alias)
+        try:
+            chunk = next(iterator)
+        except StopIteration:
+            return
+        finally:
+            _read_alias.reset(token)
+        yield chunk
+
+
+def pin_key(request):
+    authorization = request.headers.get('Authorization')
+    if not authorization:
+        return None
+    return 'db-pin:' + hashlib.sha256(authorization.encode()).hexdigest()
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Picks the request's read database and pins clients to the primary for
+    STICKY_SECONDS after they write.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        replicas = routing_setting('REPLICAS')
+        if not replicas:
+            return self.get_response(request)
+
+        key = pin_key(request)
+        safe = request.method in SAFE_METHODS
+        pinned = not safe or PIN_COOKIE in request.COOKIES or (key is not None and cache.get(key))
+        alias = None if pinned else random.choice(replicas)
+        token = _read_alias.set(alias)
+        try:
+            response = self.get_response(request)
+        finally:
+            _read_alias.reset(token)
+        if alias is not None and response.streaming:
+            # Streamed exports run their queries after this method has returned
+            response.streaming_content = read_from(alias, response.streaming_content)
+
+        if not safe and response.status_code < 400:
+            sticky = routing_setting('STICKY_SECONDS')
+            if key is not None:
+                cache.set(key, True, timeout=sticky)
+            response.set_cookie(PIN_COOKIE, '1', max_age=sticky, httponly=True, samesite='Lax')
+        return response
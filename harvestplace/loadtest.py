@@ -0,0 +1,475 @@
+"""
+Scenario-driven load test for the API (see `manage.py loadtest`).
+
+Concurrent workers (threads) each loop over weighted user journeys, timing
+every request as a named step:
+- browse:   product list, search, product detail
+- checkout: one multi-line order (POST /api/orders/, i.e. OrderSerializer)
+- cancel:   checkout, then cancel that order
+- deposit:  wallet top-up
+- wallet:   wallet summary and transaction history
+Journeys act as generated retailers (harvestplace.datagen, `<prefix>_retailerN`)
+on a Zipf-skewed catalog, so a few hot products see most of the contention.
+
+Two transports:
+- WSGITransport: calls Django's WSGI application in-process; no server,
+  nothing between the client and the app
+- HTTPTransport: a running server, e.g. a local gunicorn; the database
+  must be the one this process is configured with (tokens, catalog and
+  invariant checks read it directly)
+
+After the run, `check_invariants` looks for what concurrency breaks first:
+negative stock, negative balances, wallets that no longer match their
+ledger, stock that does not add up to the orders placed, order totals that
+do not match their lines. Stock accounting assumes nothing else writes to
+the catalog during the run.
+"""
+import http.client
+import io
+import json
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import defaultdict
+from dataclasses import dataclass, field
+from decimal import Decimal
+from urllib.parse import urlencode, urlsplit
+
+from django.contrib.auth import get_user_model
+from django.core.signals import got_request_exception
+from django.db import connections
+from django.db.models import DecimalField, ExpressionWrapper, F, Max, Sum
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+
+from harvestplace.datagen import LINES_PER_ORDER, PRODUCE, zipf_weights
+from harvestplace.metrics import percentile
+from market.models import Product
+from orders.models import Order, OrderItem
+from wallet.models import Transaction, Wallet
+
+DEFAULT_MIX = {'browse': 55, 'checkout': 20, 'cancel': 5, 'deposit': 8, 'wallet': 12}
+HOST = 'localhost'  # allowed by Django when DEBUG is on; add it to ALLOWED_HOSTS otherwise
+
+
+def parse_mix(value):
+    """
+    'browse=60,checkout=25' -> {'browse': 60, 'checkout': 25}
+    """
+    mix = {}
+    for part in filter(None, (part.strip() for part in value.split(','))):
+        name, _, weight = part.partition('=')
+        if name not in JOURNEYS:
+            raise ValueError(f"Unknown journey '{name}' (choose from {', '.join(JOURNEYS)}).")
+        try:
+            mix[name] = float(weight)
+        except ValueError:
+            raise ValueError(f"Journey weights are numbers: '{part}'.")
+        if mix[name] < 0:
+            raise ValueError(f"Journey weights cannot be negative: '{part}'.")
+    if not any(mix.values()):
+        raise ValueError("At least one journey needs a positive weight.")
+    return mix
+
+
+# --- Transports -----------------------------------------------------------
+
+def decode(body):
+    try:
+        return json.loads(body) if body else None
+    except ValueError:
+        return None
+
+
+class WSGITransport:
+    def __init__(self, application=None):
+        if application is None:
+            from django.core.wsgi import get_wsgi_application
+            application = get_wsgi_application()
+        self.application = application
+        self.local = threading.local()
+        got_request_exception.connect(self.capture)
+
+    def capture(self, sender, **kwargs):
+        # Sent from inside Django's exception handler; keep what a 500 hides
+        self.local.exception = sys.exc_info()[1]
+
+    def request(self, method, path, data=None, headers=None):
+        self.local.exception = None
+        path, _, query = path.partition('?')
+        payload = json.dumps(data).encode() if data is not None else b''
+        environ = {
+            'REQUEST_METHOD': method, 'PATH_INFO': path, 'QUERY_STRING': query,
+            'SERVER_NAME': HOST, 'SERVER_PORT': '80', 'HTTP_HOST': HOST, 'REMOTE_ADDR': '127.0.0.1',
+            'SERVER_PROTOCOL': 'HTTP/1.1', 'CONTENT_TYPE': 'application/json', 'CONTENT_LENGTH': str(len(payload)),
+            'wsgi.version': (1, 0), 'wsgi.url_scheme': 'http', 'wsgi.input': io.BytesIO(payload),
+            'wsgi.errors': sys.stderr, 'wsgi.multithread': True, 'wsgi.multiprocess': False, 'wsgi.run_once': False,
+        }
+        for name, value in (headers or {}).items():
+            environ['HTTP_' + name.upper().replace('-', '_')] = value
+
+        started = []
+
+        def start_response(status, response_headers, exc_info=None):
+            started.append(int(status.split()[0]))
+
+        result = self.application(environ, start_response)
+        try:
+            body = b''.join(result)  # also drains streaming responses
+        finally:
+            if hasattr(result, 'close'):
+                result.close()
+        if self.local.exception is not None:
+            return started[0], {'detail': repr(self.local.exception)}
+        return started[0], decode(body)
+
+    def close(self):
+        # Workers run in their own threads, each with its own DB connection
+        connections.close_all()
+
+
+class HTTPTransport:
+    """
+    Keep-alive HTTP/1.1 connection per worker thread.
+    """
+
+    def __init__(self, base_url, timeout=30):
+        parts = urlsplit(base_url)
+        if parts.scheme not in ('http', 'https') or not parts.hostname:
+            raise ValueError(f"Not an http(s) URL: '{base_url}'.")
+        self.parts = parts
+        self.timeout = timeout
+        self.local = threading.local()
+
+    def connection(self):
+        if getattr(self.local, 'connection', None) is None:
+            cls = http.client.HTTPSConnection if self.parts.scheme == 'https' else http.client.HTTPConnection
+            self.local.connection = cls(self.parts.hostname, self.parts.port, timeout=self.timeout)
+        return self.local.connection
+
+    def request(self, method, path, data=None, headers=None):
+        payload = json.dumps(data).encode() if data is not None else None
+        headers = {'Content-Type': 'application/json', **(headers or {})}
+        connection = self.connection()
+        try:
+            connection.request(method, self.parts.path.rstrip('/') + path, body=payload, headers=headers)
+            response = connection.getresponse()
+            return response.status, decode(response.read())
+        except (OSError, http.client.HTTPException):
+            self.close()  # reconnect on the next request
+            raise
+
+    def close(self):
+        connection = getattr(self.local, 'connection', None)
+        if connection is not None:
+            connection.close()
+            self.local.connection = None
+
+
+# --- Statistics -----------------------------------------------------------
+
+@dataclass
+class StepStats:
+    timings: list = field(default_factory=list)  # ms, every request
+    rejected: int = 0  # 4xx: the API refused (no stock, no funds, ...)
+    errors: int = 0    # 5xx or no response at all
+
+    def merge(self, other):
+        self.timings.extend(other.timings)
+        self.rejected += other.rejected
+        self.errors += other.errors
+
+    def summary(self, elapsed):
+        ordered = sorted(self.timings)
+        return {
+            'requests': len(ordered),
+            'rps': round(len(ordered) / elapsed, 1) if elapsed else 0.0,
+            'p50_ms': round(percentile(ordered, 50), 1),
+            'p95_ms': round(percentile(ordered, 95), 1),
+            'p99_ms': round(percentile(ordered, 99), 1),
+            'max_ms': round(ordered[-1], 1) if ordered else 0.0,
+            'rejected': self.rejected,
+            'errors': self.errors,
+        }
+
+
+@dataclass
+class Report:
+    elapsed: float
+    workers: int
+    journeys: dict
+    steps: dict
+    error_samples: list
+    violations: list = field(default_factory=list)
+
+    @property
+    def requests(self):
+        return sum(len(stats.timings) for stats in self.steps.values())
+
+    @property
+    def errors(self):
+        return sum(stats.errors for stats in self.steps.values())
+
+    def as_dict(self):
+        return {
+            'elapsed_s': round(self.elapsed, 2),
+            'workers': self.workers,
+            'requests': self.requests,
+            'rps': round(self.requests / self.elapsed, 1) if self.elapsed else 0.0,
+            'journeys': dict(sorted(self.journeys.items())),
+            'steps': {name: stats.summary(self.elapsed) for name, stats in sorted(self.steps.items())},
+            'error_samples': self.error_samples,
+            'violations': self.violations,
+        }
+
+    def table(self):
+        data = self.as_dict()
+        lines = [
+            f"{data['requests']} requests in {data['elapsed_s']}s with {self.workers} workers: {data['rps']} req/s",
+            f"{'step':<22}{'requests':>9}{'req/s':>8}{'p50':>8}{'p95':>8}{'p99':>8}{'max':>9}{'4xx':>6}{'errors':>7}",
+        ]
+        for name, step in data['steps'].items():
+            lines.append(
+                f"{name:<22}{step['requests']:>9}{step['rps']:>8}{step['p50_ms']:>8}{step['p95_ms']:>8}"
+                f"{step['p99_ms']:>8}{step['max_ms']:>9}{step['rejected']:>6}{step['errors']:>7}"
+            )
+        return lines
+
+
+# --- Journeys -------------------------------------------------------------
+
+class Session:
+    """
+    One worker's view of the run: its transport, random stream and stats.
+    """
+    MAX_ERROR_SAMPLES = 5
+
+    def __init__(self, transport, tokens, catalog, rng):
+        self.transport = transport
+        self.tokens = tokens
+        self.catalog = catalog
+        self.rng = rng
+        self.token = None
+        self.steps = defaultdict(StepStats)
+        self.journeys = defaultdict(int)
+        self.error_samples = []
+
+    def call(self, step, method, path, data=None, idempotent=False):
+        """
+        Time one request as `step`; returns (status, body), status 0 when
+        no response came back.
+        """
+        headers = {'Authorization': f'Token {self.token}'}
+        if idempotent:
+            headers['Idempotency-Key'] = str(uuid.UUID(int=self.rng.getrandbits(128)))
+        stats = self.steps[step]
+        started = time.perf_counter()
+        try:
+            status, body = self.transport.request(method, path, data, headers)
+        except Exception as exc:
+            status, body = 0, None
+            self.sample(step, repr(exc))
+        stats.timings.append((time.perf_counter() - started) * 1000)
+        if status == 0 or status >= 500:
+            stats.errors += 1
+            if status:
+                self.sample(step, f"HTTP {status}: {str(body)[:200]}")
+        elif status >= 400:
+            stats.rejected += 1
+        return status, body
+
+    def sample(self, step, message):
+        message = f"{step}: {message}"
+        if len(self.error_samples) < self.MAX_ERROR_SAMPLES and message not in self.error_samples:
+            self.error_samples.append(message)
+
+    def run_journey(self, name):
+        self.token = self.rng.choice(self.tokens)
+        self.journeys[name] += 1
+        JOURNEYS[name](self)
+
+    def pick_products(self, count):
+        ids, weights = self.catalog
+        return set(self.rng.choices(ids, cum_weights=weights, k=count))
+
+
+def browse(session):
+    rng = session.rng
+    page = rng.choices([1, 2, 3], [70, 20, 10])[0]
+    status, body = session.call('products.list', 'GET', reverse('product-list') + f'?page={page}')
+    term = rng.choice(PRODUCE)
+    session.call('products.search', 'GET', reverse('product-list') + '?' + urlencode({'search': term}))
+    results = body.get('results') if status == 200 and isinstance(body, dict) else None
+    product_id = rng.choice(results)['id'] if results else next(iter(session.pick_products(1)))
+    session.call('products.detail', 'GET', reverse('product-detail', args=[product_id]))
+
+
+def checkout(session):
+    """
+    Returns the new order's id, or None when it was refused.
+    """
+    lines = session.rng.choices(*LINES_PER_ORDER)[0]
+    items = [
+        {'product': product_id, 'quantity': session.rng.randint(1, 3)}
+        for product_id in sorted(session.pick_products(lines))
+    ]
+    status, body = session.call('orders.create', 'POST', reverse('order-list'), {'items': items}, idempotent=True)
+    return body['id'] if status == 201 else None
+
+
+def cancel(session):
+    order_id = checkout(session)
+    if order_id is not None:
+        session.call('orders.cancel', 'POST', reverse('order-cancel', args=[order_id]))
+
+
+def deposit(session):
+    amount = session.rng.randrange(500, 20_000, 500)
+    session.call('wallet.deposit', 'POST', reverse('wallet-deposit'), {'amount': f'{amount}.00'}, idempotent=True)
+
+
+def view_wallet(session):
+    session.call('wallet.view', 'GET', reverse('wallet-detail') + '?recent=10')
+    session.call('wallet.transactions', 'GET', reverse('wallet-transactions'))
+
+
+JOURNEYS = {'browse': browse, 'checkout': checkout, 'cancel': cancel, 'deposit': deposit, 'wallet': view_wallet}
+
+
+# --- Runner ---------------------------------------------------------------
+
+class LoadTest:
+    """
+    Runs `workers` threads until `duration` seconds have passed or each has
+    done `iterations` journeys, whichever comes first. Deterministic journey
+    choice for a given seed (timings and interleaving are not).
+    """
+
+    def __init__(self, transport, prefix='gen', users=50, catalog_size=500, mix=None,
+                 workers=8, duration=30.0, iterations=None, seed=0, think_ms=0):
+        self.transport = transport
+        self.mix = mix or DEFAULT_MIX
+        self.workers = workers
+        self.duration = duration
+        self.iterations = iterations
+        self.seed = seed
+        self.think_ms = think_ms
+        self.tokens = self.load_tokens(prefix, users)
+        self.catalog, self.stock_before = self.load_catalog(catalog_size)
+
+    @staticmethod
+    def load_tokens(prefix, users):
+        retailers = list(
+            get_user_model().objects.filter(username__startswith=f'{prefix}_retailer', role='retailer')
+            .order_by('pk')[:users]
+        )
+        if not retailers:
+            raise ValueError(f"No '{prefix}_retailer*' users; run generate_marketplace first.")
+        return [Token.objects.get_or_create(user=user)[0].key for user in retailers]
+
+    def load_catalog(self, size):
+        products = list(
+            Product.objects.filter(is_active=True, stock__gt=0).order_by('pk').values_list('pk', 'stock')[:size]
+        )
+        if not products:
+            raise ValueError("No products in stock to order.")
+        random.Random(self.seed).shuffle(products)  # hot products spread over farmers
+        ids = [pk for pk, _ in products]
+        return (ids, zipf_weights(len(ids))), dict(products)
+
+    def worker(self, n, barrier, deadline, sessions):
+        session = Session(self.transport, self.tokens, self.catalog, random.Random(f'{self.seed}:{n}'))
+        sessions[n] = session
+        names, weights = zip(*self.mix.items())
+        try:
+            barrier.wait()
+            done = 0
+            while time.monotonic() < deadline[0] and (self.iterations is None or done < self.iterations):
+                session.run_journey(session.rng.choices(names, weights)[0])
+                done += 1
+                if self.think_ms:
+                    time.sleep(session.rng.expovariate(1000 / self.think_ms))
+        finally:
+            self.transport.close()
+
+    def run(self):
+        marks = self.marks()
+        sessions = [None] * self.workers
+        deadline = [float('inf')]
+        barrier = threading.Barrier(self.workers + 1)
+        threads = [
+            threading.Thread(target=self.worker, args=(n, barrier, deadline, sessions), name=f'loadtest-{n}')
+            for n in range(self.workers)
+        ]
+        for thread in threads:
+            thread.start()
+        deadline[0] = time.monotonic() + (self.duration or float('inf'))
+        started = time.perf_counter()
+        barrier.wait()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        steps, journeys, samples = defaultdict(StepStats), defaultdict(int), []
+        for session in filter(None, sessions):
+            for name, stats in session.steps.items():
+                steps[name].merge(stats)
+            for name, count in session.journeys.items():
+                journeys[name] += count
+            samples.extend(sample for sample in session.error_samples if sample not in samples)
+        report = Report(elapsed, self.workers, dict(journeys), dict(steps), samples[:10])
+        report.violations = check_invariants(marks, self.stock_before)
+        return report
+
+    @staticmethod
+    def marks():
+        """
+        Highest ids before the run; everything above was written by it.
+        """
+        return {
+            'order': Order.objects.aggregate(id=Max('pk'))['id'] or 0,
+            'transaction': Transaction.objects.aggregate(id=Max('pk'))['id'] or 0,
+        }
+
+
+def check_invariants(marks, stock_before):
+    """
+    Human-readable violations; empty when the data survived the run intact.
+    """
+    violations = []
+
+    negative = list(Product.objects.filter(stock__lt=0).values_list('pk', 'stock')[:10])
+    if negative:
+        violations.append(f"Negative stock: {', '.join(f'product {pk} = {stock}' for pk, stock in negative)}")
+
+    overdrawn = list(Wallet.objects.filter(balance__lt=0).values_list('user__username', 'balance')[:10])
+    if overdrawn:
+        violations.append(f"Negative balance: {', '.join(f'{name} = {balance}' for name, balance in overdrawn)}")
+    if Transaction.objects.filter(pk__gt=marks['transaction'], balance_after__lt=0).exists():
+        violations.append("Ledger entries with a negative running balance.")
+
+    touched = Transaction.objects.filter(pk__gt=marks['transaction']).values('wallet')
+    for wallet in Wallet.objects.filter(pk__in=touched).select_related('user'):
+        ok, stored, ledger = wallet.reconcile()
+        if not ok:
+            violations.append(f"Ledger mismatch: {wallet.user} has balance {stored}, ledger {ledger}")
+
+    # Stock taken must equal what the run's live (not canceled) orders hold
+    sold = dict(
+        OrderItem.objects.filter(order__pk__gt=marks['order'], product__in=stock_before)
+        .exclude(order__status='canceled').values_list('product').annotate(total=Sum('quantity'))
+    )
+    stock_after = dict(Product.objects.filter(pk__in=stock_before).values_list('pk', 'stock'))
+    for pk, before in stock_before.items():
+        if before - stock_after.get(pk, before) != sold.get(pk, 0):
+            violations.append(
+                f"Stock drift: product {pk} went {before} -> {stock_after.get(pk)} with {sold.get(pk, 0)} sold"
+            )
+
+    line_total = ExpressionWrapper(F('items__price') * F('items__quantity'), output_field=DecimalField())
+    for order in Order.objects.filter(pk__gt=marks['order']).annotate(lines=Sum(line_total)):
+        if order.total_amount != (order.lines or Decimal('0')):
+            violations.append(f"Order {order.pk} total {order.total_amount} != lines {order.lines}")
+    return violations
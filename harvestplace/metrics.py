@@ -0,0 +1,218 @@
+"""
+In-process request metrics.
+
+MetricsMiddleware times every request and, through a database execute
+wrapper (QueryRecorder), counts its SQL queries and SQL time. Results are
+aggregated per view/action into histograms held by `registry` and served in
+Prometheus text format by `metrics_view`.
+- Each worker process keeps its own registry; scrape every worker (or sum)
+- Streaming responses are timed until their headers are ready, not until
+  the body has been sent
+- Label cardinality is bounded: views are named `ViewSet.action` from the URL
+  resolver, never from the raw path
+- Queries slower than METRICS['SLOW_QUERY_MS'] are logged (sampled) with
+  the application frame that issued them
+"""
+import logging
+import random
+import threading
+import time
+import traceback
+from bisect import bisect_left
+from collections import defaultdict
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+
+logger = logging.getLogger('harvestplace.metrics')
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+UNMATCHED = 'unmatched'
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def metrics_setting(name):
+    defaults = {
+        'ENABLED': True,
+        'SERVER_TIMING': False,
+        'SLOW_QUERY_MS': 100,
+        'SLOW_QUERY_SAMPLE_RATE': 1.0,
+        'TOKEN': '',
+    }
+    return getattr(settings, 'METRICS', {}).get(name, defaults[name])
+
+
+def percentile(ordered, q):
+    """
+    Nearest-rank percentile of an already sorted list.
+    """
+    if not ordered:
+        return 0.0
+    rank = max(int(-(-q * len(ordered) // 100)), 1)  # ceil(q% of n)
+    return ordered[rank - 1]
+
+
+class Histogram:
+    """
+    Cumulative-bucket histogram (Prometheus semantics). Not locked itself;
+    the registry serializes updates.
+    """
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        running = 0
+        for bound, count in zip((*self.buckets, '+Inf'), self.counts):
+            running += count
+            yield bound, running
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.requests = defaultdict(int)  # (view, method, status) -> count
+            self.durations = defaultdict(lambda: Histogram(DURATION_BUCKETS))  # (view, method)
+            self.sql_counts = defaultdict(lambda: Histogram(QUERY_COUNT_BUCKETS))
+            self.sql_durations = defaultdict(lambda: Histogram(DURATION_BUCKETS))
+            self.slow_queries = defaultdict(int)  # view -> count
+
+    def record_request(self, view, method, status, duration, query_count, sql_time):
+        labels = (view, method)
+        with self._lock:
+            self.requests[(view, method, str(status))] += 1
+            self.durations[labels].observe(duration)
+            self.sql_counts[labels].observe(query_count)
+            self.sql_durations[labels].observe(sql_time)
+
+    def record_slow_query(self, view):
+        with self._lock:
+            self.slow_queries[view] += 1
+
+    # ------------------------------------------------------------ exposition
+
+    @staticmethod
+    def _labels(**labels):
+        def escape(value):
+            return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        return '{' + ','.join(f'{key}="{escape(value)}"' for key, value in labels.items()) + '}'
+
+    def _histogram_lines(self, name, help_text, histograms):
+        lines = [f'# HELP {name} {help_text}', f'# TYPE {name} histogram']
+        for (view, method), histogram in sorted(histograms.items()):
+            for bound, count in histogram.cumulative():
+                lines.append(f'{name}_bucket{self._labels(view=view, method=method, le=bound)} {count}')
+            lines.append(f'{name}_sum{self._labels(view=view, method=method)} {histogram.sum:.6f}')
+            lines.append(f'{name}_count{self._labels(view=view, method=method)} {histogram.count}')
+        return lines
+
+    def render(self):
+        with self._lock:
+            lines = ['# HELP harvestplace_requests_total Requests handled, by view, method and status.',
+                     '# TYPE harvestplace_requests_total counter']
+            for (view, method, status), count in sorted(self.requests.items()):
+                lines.append(f'harvestplace_requests_total{self._labels(view=view, method=method, status=status)} {count}')
+            lines += self._histogram_lines(
+                'harvestplace_request_duration_seconds', 'Wall time per request.', self.durations)
+            lines += self._histogram_lines(
+                'harvestplace_request_sql_queries', 'SQL queries per request.', self.sql_counts)
+            lines += self._histogram_lines(
+                'harvestplace_request_sql_duration_seconds', 'SQL time per request.', self.sql_durations)
+            lines += ['# HELP harvestplace_slow_queries_total Queries slower than METRICS SLOW_QUERY_MS.',
+                      '# TYPE harvestplace_slow_queries_total counter']
+            for view, count in sorted(self.slow_queries.items()):
+                lines.append(f'harvestplace_slow_queries_total{self._labels(view=view)} {count}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+
+def resolve_view_name(request):
+    """
+    `OrderViewSet.create`, `LoginView.post`, ... or UNMATCHED (404s).
+    """
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return UNMATCHED
+    cls = getattr(match.func, 'cls', None) or getattr(match.func, 'view_class', None)
+    if cls is None:
+        return match.view_name or match._func_path
+    actions = getattr(match.func, 'actions', None) or {}
+    action = actions.get(request.method.lower()) or request.method.lower()
+    return f'{cls.__name__}.{action}'
+
+
+def call_site():
+    """
+    The innermost stack frame from this project (not Django, DRF or this
+    module), as 'path:line in function'.
+    """
+    base = str(settings.BASE_DIR)
+    for frame in reversed(traceback.extract_stack()[:-2]):
+        filename = frame.filename
+        if filename.startswith(base) and 'site-packages' not in filename and not filename.endswith('metrics.py'):
+            return f'{filename[len(base) + 1:]}:{frame.lineno} in {frame.name}'
+    return 'unknown'
+
+
+class QueryRecorder:
+    """
+    connection.execute_wrapper() hook counting queries and SQL time for
+    one request.
+    """
+
+    def __init__(self, request):
+        self.request = request
+        self.count = 0
+        self.duration = 0.0
+        self.slow_threshold = metrics_setting('SLOW_QUERY_MS') / 1000
+        self.sample_rate = metrics_setting('SLOW_QUERY_SAMPLE_RATE')
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.count += 1
+            self.duration += elapsed
+            if self.slow_threshold and elapsed >= self.slow_threshold:
+                self.slow_query(sql, elapsed, context)
+
+    def slow_query(self, sql, elapsed, context):
+        view = resolve_view_name(self.request)
+        registry.record_slow_query(view)
+        if random.random() < self.sample_rate:
+            logger.warning(
+                'Slow query (%.1f ms, %s) at %s: %s',
+                elapsed * 1000, context['connection'].alias, call_site(), sql[:2000],
+                extra={'view': view, 'duration_ms': round(elapsed * 1000, 1)},
+            )
+
+
+def metrics_view(request):
+    """
+    Prometheus scrape endpoint. With METRICS['TOKEN'] set, requires
+    `Authorization: Bearer <token>`; otherwise only served when DEBUG is on.
+    """
+    token = metrics_setting('TOKEN')
+    if token:
+        if request.headers.get('Authorization') != f'Bearer {token}':
+            return HttpResponseForbidden()
+    elif not settings.DEBUG:
+        return HttpResponseForbidden()
+    return HttpResponse(registry.render(), content_type=PROMETHEUS_CONTENT_TYPE)
@@ -0,0 +1,41 @@
+import time
+from contextlib import ExitStack
+
+from django.db import connections
+
+from .metrics import QueryRecorder, metrics_setting, registry, resolve_view_name
+
+
+class MetricsMiddleware:
+    """
+    Record wall time, SQL query count and SQL time for every request (see
+    harvestplace.metrics); optionally report them in a `Server-Timing`
+    header. Place it first in MIDDLEWARE so it covers the whole stack.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not metrics_setting('ENABLED'):
+            return self.get_response(request)
+
+        recorder = QueryRecorder(request)
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            response = self.get_response(request)
+        duration = time.perf_counter() - start
+
+        registry.record_request(
+            resolve_view_name(request), request.method, response.status_code,
+            duration, recorder.count, recorder.duration,
+        )
+        if metrics_setting('SERVER_TIMING'):
+            # Streaming bodies are produced after this point and are not included
+            response['Server-Timing'] = (
+                f'app;dur={duration * 1000:.1f}, '
+                f'db;dur={recorder.duration * 1000:.1f};desc="{recorder.count} queries"'
+            )
+        return response
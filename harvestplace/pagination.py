@@ -0,0 +1,205 @@
+"""
+Pagination shared by the list endpoints.
+
+PageNumberPagination costs a COUNT(*) plus an OFFSET scan per page, which gets
+slower the deeper a client scrolls. KeysetPagination instead seeks straight to
+the last row seen using a composite `(ordering field, id)` key, so page 1000
+costs the same as page 1 — provided a matching index exists (see the Meta
+indexes on Product and Order).
+"""
+import base64
+import json
+from collections import OrderedDict
+from functools import partial
+
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.exceptions import ValidationError as InvalidParams
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination keyed on `(ordering field, id)`.
+    - The ordering field comes from `?ordering=` when it is listed in the
+      view's `ordering_fields`, otherwise `default_ordering`
+    - Cursors are opaque; `next`/`previous` links carry them
+    - No COUNT(*) is issued
+    - A `?search=` ranked by relevance has no column to seek on, so it needs
+      an explicit `?ordering=` (otherwise 400) or page-number pagination
+    """
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    default_ordering = '-created_at'
+    invalid_cursor_message = 'Invalid cursor'
+    ranked_search_message = (
+        'Search results are ranked by relevance and cannot be cursor-paginated; '
+        'add ?ordering= or use page-number pagination.'
+    )
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def get_ordering(self, request, view):
+        """
+        Return the ordering field, e.g. '-price'. Only the first `?ordering=`
+        term is used; the id tiebreaker is always added.
+        """
+        allowed = getattr(view, 'ordering_fields', None) or [self.default_ordering.lstrip('-')]
+        param = request.query_params.get(api_settings.ORDERING_PARAM)
+        if param:
+            field = param.split(',')[0].strip()
+            if field.lstrip('-') in allowed:
+                return field
+        ordering = getattr(view, 'ordering', None) or self.default_ordering
+        if isinstance(ordering, (list, tuple)):
+            ordering = ordering[0]
+        return ordering
+
+    # ------------------------------------------------------------ cursors
+
+    def encode_cursor(self, value, pk, reverse=False):
+        payload = json.dumps({'v': str(value), 'id': pk, 'r': int(reverse)})
+        cursor = base64.urlsafe_b64encode(payload.encode()).decode()
+        return replace_query_param(self.base_url, self.cursor_query_param, cursor)
+
+    def decode_cursor(self, request, field):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode()).decode())
+            value = field.to_python(payload['v'])
+            return value, int(payload['id']), bool(payload['r'])
+        except (TypeError, ValueError, KeyError, AttributeError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    # ------------------------------------------------------------ paging
+
+    def check_ranked_search(self, request, view):
+        params = request.query_params
+        searchable = getattr(view, 'search_fields', None)
+        if searchable and params.get(api_settings.SEARCH_PARAM) and not params.get(api_settings.ORDERING_PARAM):
+            raise InvalidParams({'pagination': [self.ranked_search_message]})
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.check_ranked_search(request, view)
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+
+        ordering = self.get_ordering(request, view)
+        self.field_name = ordering.lstrip('-')
+        descending = ordering.startswith('-')
+        field = queryset.model._meta.get_field(self.field_name)
+
+        cursor = self.decode_cursor(request, field)
+        reverse = bool(cursor and cursor[2])
+        # Walking backwards means flipping the direction of the seek
+        seek_descending = descending != reverse
+
+        if cursor:
+            value, pk = cursor[0], cursor[1]
+            op = 'lt' if seek_descending else 'gt'
+            queryset = queryset.filter(
+                Q(**{f'{self.field_name}__{op}': value})
+                | Q(**{self.field_name: value, f'pk__{op}': pk})
+            )
+
+        prefix = '-' if seek_descending else ''
+        queryset = queryset.order_by(f'{prefix}{self.field_name}', f'{prefix}pk')
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+
+        if reverse:
+            rows.reverse()
+            self.has_next = True
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = cursor is not None
+
+        self.page = rows
+        return rows
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        last = self.page[-1]
+        return self.encode_cursor(getattr(last, self.field_name), last.pk)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        first = self.page[0]
+        return self.encode_cursor(getattr(first, self.field_name), first.pk, reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+class CountedPaginator(Paginator):
+    """
+    Django's Paginator with the row count passed in rather than queried.
+    """
+
+    def __init__(self, object_list, per_page, count, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.__dict__['count'] = count  # primes the cached_property
+
+
+class PageOrCursorPagination(PageNumberPagination):
+    """
+    Page-number pagination by default (unchanged for existing clients); keyset
+    mode when the request asks for it with `?pagination=cursor` or carries a
+    `cursor` from a previous keyset page. Infinite-scroll clients should use
+    keyset mode.
+    """
+    mode_query_param = 'pagination'
+    keyset_class = KeysetPagination
+
+    def use_keyset(self, request):
+        params = request.query_params
+        return params.get(self.mode_query_param) == 'cursor' or self.keyset_class.cursor_query_param in params
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = self.keyset_class() if self.use_keyset(request) else None
+        if self.keyset:
+            return self.keyset.paginate_queryset(queryset, request, view)
+        # ConditionalGetMixin views have counted these rows for their ETag
+        count = view.get_known_count(queryset) if hasattr(view, 'get_known_count') else None
+        if count is not None:
+            self.django_paginator_class = partial(CountedPaginator, count=count)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
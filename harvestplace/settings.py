@@ -10,8 +10,11 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+from datetime import timedelta
 from pathlib import Path
 
+from decouple import Csv, config
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -45,9 +48,12 @@ INSTALLED_APPS = [
     'inventory',
     'orders',
     'wallet',
+    'idempotency',
 ]
 
 MIDDLEWARE = [
+    'harvestplace.middleware.MetricsMiddleware',  # ---------- per-view latency / SQL metrics (first: covers the whole stack)
+    'harvestplace.db.router.ReplicaRoutingMiddleware',  # ---------- picks the request's read database (replicas / primary)
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -91,13 +97,95 @@ WSGI_APPLICATION = 'harvestplace.wsgi.application'
 #     }
 # }
 
+# SQLITE_TUNED (default on): WAL, pragmas and BEGIN IMMEDIATE with retries,
+# see harvestplace/db/base.py. Connections are kept for DB_CONN_MAX_AGE seconds.
 DATABASES = {
     "default": {
-        "ENGINE": "django.db.backends.sqlite3",
+        "ENGINE": (
+            "harvestplace.db" if config('SQLITE_TUNED', default=True, cast=bool)
+            else "django.db.backends.sqlite3"
+        ),
         "NAME": BASE_DIR / "db.sqlite3",
+        "CONN_MAX_AGE": config('DB_CONN_MAX_AGE', default=600, cast=int),
+        "CONN_HEALTH_CHECKS": True,
+        "OPTIONS": {
+            "timeout": config('SQLITE_TIMEOUT', default=5, cast=float),  # seconds to wait for a lock
+        },
+    }
+}
+
+# Read replicas: DB_REPLICAS=/srv/replica1.sqlite3,/srv/replica2.sqlite3 adds aliases replica1..N
+# (same engine/options as default). Safe requests read from one of them, writes, transactions
+# and clients that wrote in the last DB_STICKY_SECONDS use the primary; see harvestplace/db/router.py.
+# SQLite replicas are refreshed from the primary by `python manage.py sync_replicas --loop`.
+for n, name in enumerate(config('DB_REPLICAS', default='', cast=Csv()), 1):
+    DATABASES[f"replica{n}"] = {
+        **DATABASES["default"],
+        "NAME": name,
+        "OPTIONS": dict(DATABASES["default"]["OPTIONS"]),
+        "TEST": {"MIRROR": "default"},  # tests read replicas through the primary's connection
+    }
+
+DATABASE_ROUTERS = ['harvestplace.db.router.PrimaryReplicaRouter']
+
+DATABASE_ROUTING = {
+    "REPLICAS": [alias for alias in DATABASES if alias != "default"],
+    "STICKY_SECONDS": config('DB_STICKY_SECONDS', default=5, cast=float),  # read-your-writes window
+    "PRIMARY_APPS": ['accounts', 'authtoken', 'sessions', 'idempotency'],  # never read from a replica
+}
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# locmem evicts least-recently-used entries once MAX_ENTRIES is reached; set
+# CACHE_BACKEND=file to share one cache between the workers of a single box.
+
+CACHE_BACKEND = config('CACHE_BACKEND', default='locmem')
+
+CACHES = {
+    "default": {
+        "BACKEND": (
+            "django.core.cache.backends.filebased.FileBasedCache"
+            if CACHE_BACKEND == "file"
+            else "django.core.cache.backends.locmem.LocMemCache"
+        ),
+        "LOCATION": str(BASE_DIR / ".cache") if CACHE_BACKEND == "file" else "harvestplace",
+        "TIMEOUT": 300,
+        "OPTIONS": {
+            "MAX_ENTRIES": config('CACHE_MAX_ENTRIES', default=10000, cast=int),
+            "CULL_FREQUENCY": 4,  # evict 1/4 of entries when full
+        },
     }
 }
 
+MARKET_CACHE_TIMEOUT = 300  # seconds a cached product list/detail response lives
+MARKET_PRICE_BUCKETS = [0, 500, 1000, 5000, 10000]  # lower bounds of /products/facets/ price buckets
+
+# Idempotency-Key replays (orders, wallet deposits) are kept this long;
+# `python manage.py purge_idempotency_keys` deletes expired ones.
+IDEMPOTENCY_KEY_TTL = timedelta(hours=24)
+# A key whose first request has not finished after this long (worker killed or
+# timed out) is taken over by the next retry; keep it above the request timeout.
+IDEMPOTENCY_KEY_LEASE = timedelta(seconds=60)
+
+EXPORT_CHUNK_SIZE = 500  # rows per query in streaming CSV / NDJSON exports
+
+WALLET_RECENT_TRANSACTIONS = 10  # entries embedded in the wallet summary; full history is paginated
+
+# Per-worker token -> user cache used by accounts.authentication.CachedTokenAuthentication
+TOKEN_AUTH_CACHE = {
+    "MAX_ENTRIES": config('TOKEN_AUTH_CACHE_MAX_ENTRIES', default=10000, cast=int),
+    "TTL": config('TOKEN_AUTH_CACHE_TTL', default=60, cast=int),  # seconds; bounds staleness across workers
+}
+
+# Request metrics (harvestplace.metrics): Prometheus text at /metrics
+METRICS = {
+    "ENABLED": config('METRICS_ENABLED', default=True, cast=bool),
+    "SERVER_TIMING": config('METRICS_SERVER_TIMING', default=DEBUG, cast=bool),  # add a Server-Timing header
+    "SLOW_QUERY_MS": config('SLOW_QUERY_MS', default=100, cast=int),  # log queries at least this slow (0 = off)
+    "SLOW_QUERY_SAMPLE_RATE": config('SLOW_QUERY_SAMPLE_RATE', default=1.0, cast=float),
+    "TOKEN": config('METRICS_TOKEN', default=''),  # scrape with `Authorization: Bearer <token>`; unset = DEBUG only
+}
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -144,7 +232,7 @@ AUTH_USER_MODEL = 'accounts.CustomUser' # --------To define custom user model
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication', # ---------- Token authentication
+        'accounts.authentication.CachedTokenAuthentication', # ---------- Token authentication (cached per worker)
     ],
      "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
     "PAGE_SIZE": 10,  # default items per page
@@ -20,6 +20,7 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 
+from harvestplace.metrics import metrics_view
 from harvestplace.views import WelcomeAPIView
 
 urlpatterns = [
@@ -29,6 +30,7 @@ urlpatterns = [
     path('api/market/', include('market.urls')),
     path('api/orders/', include('orders.urls')),
     path('api/wallet/', include('wallet.urls')),  # Include wallet app URLs
+    path('metrics', metrics_view, name='metrics'),  # Prometheus scrape endpoint
 ]
 
 if settings.DEBUG:
@@ -0,0 +1,9 @@
+from django.contrib import admin
+from .models import IdempotencyKey
+
+@admin.register(IdempotencyKey)
+class IdempotencyKeyAdmin(admin.ModelAdmin):
+    list_display = ('key', 'user', 'method', 'path', 'status_code', 'created_at', 'expires_at')
+    search_fields = ('key', 'user__username')
+    list_filter = ('method', 'status_code')
+    readonly_fields = ('created_at',)
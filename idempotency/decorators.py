@@ -0,0 +1,128 @@
+import hashlib
+import json
+from functools import wraps
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+
+HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+
+
+def fingerprint(request):
+    """
+    Hash of what the request asks for, so a key reused for a different
+    request can be told apart from a retry.
+    """
+    body = json.dumps(request.data, sort_keys=True, default=str)
+    raw = '|'.join([request.method, request.path, body])
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def replay(record):
+    response = Response(record.response_body, status=record.status_code)
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def in_progress():
+    return Response({"detail": "A request with this key is still being processed."}, status=status.HTTP_409_CONFLICT)
+
+
+def idempotent(view_method):
+    """
+    Make a POST view method safe to retry with an `Idempotency-Key` header.
+    - First request: runs the view and stores its response in the same
+      transaction as the view's own writes
+    - Replay (same key, same request): returns the stored response after one
+      indexed lookup, without running the view
+    - Same key, different request → 422; first request still running → 409
+    - First request abandoned (no response after LEASE, e.g. its worker was
+      killed) → a retry takes the key over and runs the view
+    Requests without the header run as before.
+    """
+    @wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if not key:
+            return view_method(self, request, *args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return Response({"detail": f"{HEADER} must be at most {MAX_KEY_LENGTH} characters."}, status=status.HTTP_400_BAD_REQUEST)
+
+        digest = fingerprint(request)
+        record = IdempotencyKey.objects.filter(user=request.user, key=key).first()
+        if record and record.is_expired:
+            record.delete()
+            record = None
+
+        if record:
+            if record.fingerprint != digest:
+                return Response(
+                    {"detail": f"This {HEADER} was already used for a different request."},
+                    status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                )
+            if record.is_abandoned:
+                record = take_over(record)
+                if record is None:
+                    return in_progress()
+            elif not record.is_complete:
+                return in_progress()
+            else:
+                return replay(record)
+        else:
+            try:
+                # Claimed (and committed) before the view runs, so a concurrent
+                # retry sees it and backs off instead of running the view twice
+                record = IdempotencyKey.objects.create(
+                    user=request.user, key=key, method=request.method, path=request.path[:255], fingerprint=digest
+                )
+            except IntegrityError:
+                return in_progress()
+
+        # Only the holder of the current claim may store or release it
+        claim = IdempotencyKey.objects.filter(pk=record.pk, created_at=record.created_at)
+        try:
+            with transaction.atomic():
+                response = view_method(self, request, *args, **kwargs)
+                if response.status_code >= 500:
+                    raise _DiscardResponse(response)
+                # Store exactly what the client will have received
+                body = json.loads(JSONRenderer().render(response.data) or 'null')
+                if not claim.update(status_code=response.status_code, response_body=body):
+                    # Outlived the lease and a retry took over: undo our writes
+                    raise _DiscardResponse(in_progress())
+        except _DiscardResponse as discarded:
+            claim.delete()
+            return discarded.response
+        except BaseException:
+            # Nothing was done (SystemExit included: worker timeouts); free the
+            # key so the client can retry
+            claim.delete()
+            raise
+        return response
+
+    return wrapper
+
+
+def take_over(record):
+    """
+    Claim an abandoned key for this request; None if another retry got it first.
+    """
+    now = timezone.now()
+    claimed = IdempotencyKey.objects.filter(
+        pk=record.pk, status_code__isnull=True, created_at=record.created_at
+    ).update(created_at=now)
+    if not claimed:
+        return None
+    record.created_at = now
+    return record
+
+
+class _DiscardResponse(Exception):
+    def __init__(self, response):
+        self.response = response
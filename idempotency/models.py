@@ -0,0 +1,51 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+from django.utils import timezone
+
+TTL = getattr(settings, 'IDEMPOTENCY_KEY_TTL', timedelta(hours=24))
+LEASE = getattr(settings, 'IDEMPOTENCY_KEY_LEASE', timedelta(seconds=60))
+
+
+def default_expiry():
+    return timezone.now() + TTL
+
+
+class IdempotencyKey(models.Model):
+    """
+    One client-supplied `Idempotency-Key` per user, with the fingerprint of
+    the request that first used it and the response that request produced.
+    `status_code` stays null while that first request is still running.
+    `created_at` is when the running request claimed the key: a claim older
+    than LEASE is abandoned (worker killed or timed out) and a retry takes
+    it over, resetting `created_at`.
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='idempotency_keys')
+    key = models.CharField(max_length=255)
+    method = models.CharField(max_length=10)
+    path = models.CharField(max_length=255)
+    fingerprint = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    response_body = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(default=default_expiry, db_index=True)
+
+    class Meta:
+        unique_together = ('user', 'key')  # the replay lookup
+
+    @property
+    def is_complete(self):
+        return self.status_code is not None
+
+    @property
+    def is_abandoned(self):
+        return not self.is_complete and self.created_at <= timezone.now() - LEASE
+
+    @property
+    def is_expired(self):
+        return self.expires_at <= timezone.now()
+
+    def __str__(self):
+        return f"{self.key} ({self.method} {self.path})"
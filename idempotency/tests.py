@@ -0,0 +1,103 @@
+from datetime import timedelta
+from io import StringIO
+from types import SimpleNamespace
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.response import Response
+from rest_framework.test import APITestCase
+
+from market.models import Category, Product
+from orders.models import Order
+from wallet.models import Transaction
+from .decorators import HEADER, fingerprint, idempotent
+from .models import LEASE, IdempotencyKey
+
+User = get_user_model()
+
+
+class IdempotencyKeyTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='retailer1', password='pass1234', role='retailer')
+        self.client.force_authenticate(user=self.user)
+        self.deposit_url = reverse('wallet-deposit')
+
+    def deposit(self, amount, key='abc-123'):
+        return self.client.post(self.deposit_url, {'amount': amount}, format='json', HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_replayed_deposit_credits_once(self):
+        first = self.deposit('100.00')
+        self.assertEqual(first.status_code, 200)
+
+        with self.assertNumQueries(1):
+            replay = self.deposit('100.00')
+        self.assertEqual(replay.status_code, 200)
+        self.assertEqual(replay['Idempotent-Replayed'], 'true')
+        self.assertEqual(replay.content, first.content)
+        self.assertEqual(Transaction.objects.filter(wallet__user=self.user).count(), 1)
+
+    def test_key_reused_for_different_request(self):
+        self.deposit('100.00')
+        self.assertEqual(self.deposit('50.00').status_code, 422)
+
+    def test_keys_are_per_user(self):
+        self.deposit('100.00')
+        other = User.objects.create_user(username='retailer2', password='pass1234', role='retailer')
+        self.client.force_authenticate(user=other)
+        self.assertNotIn('Idempotent-Replayed', self.deposit('100.00'))
+
+    def test_failed_request_frees_the_key(self):
+        self.assertEqual(self.deposit('-1').status_code, 400)
+        self.assertFalse(IdempotencyKey.objects.exists())
+        self.assertEqual(self.deposit('-1').status_code, 400)
+
+    def claim(self, amount):
+        request = SimpleNamespace(method='POST', path=self.deposit_url, data={'amount': amount})
+        return IdempotencyKey.objects.create(
+            user=self.user, key='abc-123', method='POST', path=self.deposit_url, fingerprint=fingerprint(request)
+        )
+
+    def test_in_flight_key_conflicts(self):
+        self.claim('100.00')
+        self.assertEqual(self.deposit('100.00').status_code, 409)
+
+    def test_abandoned_key_is_taken_over(self):
+        self.claim('100.00')
+        IdempotencyKey.objects.update(created_at=timezone.now() - LEASE - timedelta(seconds=1))
+        response = self.deposit('100.00')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.deposit('100.00')['Idempotent-Replayed'], 'true')
+        self.assertEqual(Transaction.objects.filter(wallet__user=self.user).count(), 1)
+
+    def test_request_that_outlived_its_lease_is_rolled_back(self):
+        def view(_, request):
+            Category.objects.create(name='Written')
+            # meanwhile a retry took the abandoned key over
+            IdempotencyKey.objects.update(created_at=timezone.now() + timedelta(seconds=1))
+            return Response({'ok': True}, status=201)
+
+        request = SimpleNamespace(method='POST', path='/x/', data={}, user=self.user, headers={HEADER: 'slow'})
+        self.assertEqual(idempotent(view)(None, request).status_code, 409)
+        self.assertFalse(Category.objects.filter(name='Written').exists())
+
+    def test_order_replay_does_not_touch_stock(self):
+        farmer = User.objects.create_user(username='farmer1', password='pass1234', role='farmer')
+        product = Product.objects.create(
+            farmer=farmer, name='Mango', price=10, stock=5, location='Oyo', category=Category.objects.create(name='Fruits')
+        )
+        self.user.wallet.credit(100)
+        payload = {'items': [{'product': product.id, 'quantity': 2}]}
+        for _ in range(3):
+            response = self.client.post(reverse('order-list'), payload, format='json', HTTP_IDEMPOTENCY_KEY='order-1')
+            self.assertEqual(response.status_code, 201)
+        product.refresh_from_db()
+        self.assertEqual(product.stock, 3)
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_purge_expired_keys(self):
+        self.deposit('100.00')
+        IdempotencyKey.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        call_command('purge_idempotency_keys', stdout=StringIO())
+        self.assertFalse(IdempotencyKey.objects.exists())
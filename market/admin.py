@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Category, Product
+from .models import Category, Product, Tag
 
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
@@ -14,4 +14,10 @@ class ProductAdmin(admin.ModelAdmin):
     list_filter = ('category', 'created_at')
     ordering = ('-created_at',)
     readonly_fields = ('created_at', 'updated_at')
-    prepopulated_fields = {'slug': ('name',)}
\ No newline at end of file
+    prepopulated_fields = {'slug': ('name',)}
+
+@admin.register(Tag)
+class TagAdmin(admin.ModelAdmin):
+    list_display = ('id', 'name', 'slug')
+    search_fields = ('name', 'slug')
+    ordering = ('slug',)
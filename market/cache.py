@@ -0,0 +1,193 @@
+"""
+Versioned read-through cache for anonymous ProductViewSet reads.
+
+Cache keys embed version counters instead of being deleted on writes:
+- `all`            → any product change (unscoped lists)
+- `category:<id>`  → products in that category (`?category=` lists)
+- `farmer:<id>`    → that farmer's products (`?owner=` lists)
+- `product:<id>`   → product detail
+- `categories`     → any category change (part of every key: products embed their category)
+
+A write bumps the counters it affects; stale entries simply stop being
+addressed and age out through the backend's LRU culling (see CACHES).
+With read replicas, misses shortly after a write are filled from the
+primary, so a lagging replica is never cached under the new version.
+"""
+import hashlib
+import time
+from contextlib import nullcontext
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+from rest_framework.response import Response
+
+from harvestplace.db.router import replica_alias, routing_setting, use_primary
+
+KEY_PREFIX = 'market'
+WRITTEN_KEY = f'{KEY_PREFIX}:written'
+RESPONSE_TIMEOUT = getattr(settings, 'MARKET_CACHE_TIMEOUT', 300)
+
+
+def _version_key(scope):
+    return f'{KEY_PREFIX}:v:{scope}'
+
+
+def _fresh_version():
+    # Seeded from the clock rather than 1 so a counter that gets evicted can
+    # never come back at a value an old entry was stored under
+    return time.time_ns()
+
+
+def get_versions(*scopes):
+    keys = {scope: _version_key(scope) for scope in scopes}
+    found = cache.get_many(list(keys.values()))
+    versions = []
+    for scope, key in keys.items():
+        if key not in found:
+            cache.add(key, _fresh_version(), timeout=None)
+            found[key] = cache.get(key)
+        versions.append(f'{scope}={found[key]}')
+    return versions
+
+
+def bump(*scopes):
+    for scope in set(scopes):
+        key = _version_key(scope)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, _fresh_version(), timeout=None)
+    cache.set(WRITTEN_KEY, time.time(), timeout=routing_setting('STICKY_SECONDS'))
+
+
+def fill_source():
+    """
+    Where a cache miss should read from: the primary right after a catalog
+    write (replicas may not have it yet), the request's replica otherwise.
+    """
+    if replica_alias() is not None and cache.get(WRITTEN_KEY) is not None:
+        return use_primary()
+    return nullcontext()
+
+
+def invalidate_products(rows):
+    """
+    Bump versions for products given as (product_id, category_id, farmer_id)
+    tuples. For write paths that bypass Product.save (bulk_create, update()).
+    """
+    scopes = ['all']
+    for product_id, category_id, farmer_id in rows:
+        scopes += [f'product:{product_id}', f'category:{category_id}', f'farmer:{farmer_id}']
+    bump(*scopes)
+
+
+def invalidate_categories(*category_ids):
+    bump('all', 'categories', *[f'category:{pk}' for pk in category_ids])
+
+
+def resolve_category(ref):
+    """
+    Map a `?category=` value (id, slug or name) to a category id, memoised
+    under the `categories` version.
+    """
+    from .models import Category
+
+    key = f'{KEY_PREFIX}:category-ref:{get_versions("categories")[0]}:{ref.lower()}'
+    category_id = cache.get(key)
+    if category_id is None:
+        lookup = Q(slug=ref) | Q(name__iexact=ref)
+        if ref.isdigit():
+            lookup |= Q(pk=int(ref))
+        with fill_source():  # a replica behind a new category would memoise "not found"
+            category_id = Category.objects.filter(lookup).values_list('pk', flat=True).first() or 0
+        cache.set(key, category_id, timeout=None)
+    return category_id or None
+
+
+def normalize_params(query_params):
+    """
+    Stable representation of the query string: sorted keys, sorted repeated
+    values, blanks dropped — so `?a=1&b=2` and `?b=2&a=1` share an entry.
+    """
+    items = []
+    for key in sorted(query_params.keys()):
+        values = sorted(v for v in query_params.getlist(key) if v != '')
+        items += [f'{key}={value}' for value in values]
+    return '&'.join(items)
+
+
+class CachedReadMixin:
+    """
+    Serve anonymous `list`/`retrieve` from the versioned cache. Responses carry
+    an `X-Cache: HIT|MISS` header. Goes before ConditionalGetMixin in the
+    bases: entries keep the ETag aggregates, so a hit runs no query at all.
+    """
+    response_cache_timeout = RESPONSE_TIMEOUT
+
+    def get_cache_scopes(self, request, **kwargs):
+        if self.action == 'retrieve':
+            return [f'product:{kwargs.get(self.lookup_url_kwarg or self.lookup_field)}', 'categories']
+
+        scopes = []
+        owner = request.query_params.get('owner', '')
+        if owner.isdigit():
+            scopes.append(f'farmer:{owner}')
+        category = request.query_params.get('category')
+        if category:
+            category_id = resolve_category(category)
+            if category_id:
+                scopes.append(f'category:{category_id}')
+        # Every product representation embeds its category
+        return (scopes or ['all']) + ['categories']
+
+    def get_response_cache_key(self, request, **kwargs):
+        versions = get_versions(*self.get_cache_scopes(request, **kwargs))
+        raw = '|'.join([self.action, str(sorted(kwargs.items())), normalize_params(request.query_params), *versions])
+        digest = hashlib.md5(raw.encode()).hexdigest()
+        return f'{KEY_PREFIX}:entry:{self.basename}:{digest}'
+
+    def get_cached_entry(self, request):
+        """
+        (key, (data, validator values) or None) for an anonymous read,
+        looked up once per request; None when the response is not cacheable.
+        """
+        if not hasattr(self, 'cached_entry'):
+            self.cached_entry = None
+            if not (request.user and request.user.is_authenticated):
+                key = self.get_response_cache_key(request, **self.kwargs)
+                self.cached_entry = (key, cache.get(key))
+        return self.cached_entry
+
+    def get_conditional_values(self):
+        # ConditionalGetMixin: a hit answers from the values stored with it
+        cached = self.get_cached_entry(self.request) if self.action in ('list', 'retrieve') else None
+        if cached and cached[1] is not None and cached[1][1] is not None:
+            return cached[1][1]
+        with fill_source():
+            return super().get_conditional_values()
+
+    def cached_read(self, handler, request, *args, **kwargs):
+        cached = self.get_cached_entry(request)
+        if cached is None:
+            return handler(request, *args, **kwargs)
+
+        key, entry = cached
+        if entry is not None:
+            response = Response(entry[0])
+            response['X-Cache'] = 'HIT'
+            return response
+
+        with fill_source():
+            response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            entry = (response.data, getattr(self, 'conditional_values', None))
+            cache.set(key, entry, timeout=self.response_cache_timeout)
+        response['X-Cache'] = 'MISS'
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_read(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_read(super().retrieve, request, *args, **kwargs)
@@ -0,0 +1,62 @@
+"""
+Facet counts for the product catalog.
+
+All facets come from a single GROUP BY (category, location, price bucket) over
+the filtered queryset; the per-facet totals are rolled up from those rows in
+Python. The grouped result is bounded by #categories x #locations x #buckets,
+not by catalog size.
+"""
+from collections import Counter
+
+from django.conf import settings
+from django.db.models import Case, Count, IntegerField, Value, When
+
+# Lower bounds of the price buckets; the last bucket is open-ended
+PRICE_BUCKETS = getattr(settings, 'MARKET_PRICE_BUCKETS', [0, 500, 1000, 5000, 10000])
+
+
+def price_bucket_expression(bounds=PRICE_BUCKETS):
+    whens = [
+        When(price__gte=low, price__lt=high, then=Value(index))
+        for index, (low, high) in enumerate(zip(bounds, bounds[1:]))
+    ]
+    return Case(*whens, default=Value(len(bounds) - 1), output_field=IntegerField())
+
+
+def facet_counts(queryset, bounds=PRICE_BUCKETS):
+    rows = (
+        queryset.order_by()
+        .annotate(price_bucket=price_bucket_expression(bounds))
+        .values('category__slug', 'category__name', 'location', 'price_bucket')
+        .annotate(count=Count('pk'))
+    )
+
+    categories, category_names, locations, buckets = Counter(), {}, Counter(), Counter()
+    total = 0
+    for row in rows:
+        slug = row['category__slug']
+        categories[slug] += row['count']
+        category_names[slug] = row['category__name']
+        locations[row['location']] += row['count']
+        buckets[row['price_bucket']] += row['count']
+        total += row['count']
+
+    return {
+        'total': total,
+        'categories': [
+            {'slug': slug, 'name': category_names[slug], 'count': count}
+            for slug, count in categories.most_common()
+        ],
+        'locations': [
+            {'location': location, 'count': count}
+            for location, count in locations.most_common()
+        ],
+        'price': [
+            {
+                'min': str(low),
+                'max': str(bounds[index + 1]) if index + 1 < len(bounds) else None,
+                'count': buckets[index],
+            }
+            for index, low in enumerate(bounds)
+        ],
+    }
@@ -0,0 +1,71 @@
+import django_filters
+from django.db.models import Count, Subquery
+from rest_framework import filters
+from rest_framework.settings import api_settings
+from . import search
+from .models import Category, Product, ProductTag, parse_tags
+
+
+class ProductSearchFilter(filters.SearchFilter):
+    """
+    `?search=` backed by the full-text index in market.search.
+    - Results are ranked best match first unless `?ordering=` is given
+    - Falls back to SearchFilter's LIKE matching on `search_fields` when the
+      database has no full-text support
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        terms = self.get_search_terms(request)
+        if not terms:
+            return queryset
+
+        query = ' '.join(terms)
+        matches = search.matching(query, using=queryset.db)
+        if matches is None:
+            return super().filter_queryset(request, queryset, view)
+        if matches == []:
+            return queryset  # nothing searchable (e.g. only punctuation): ignored, as SearchFilter does
+
+        # Matched in SQL rather than through an id list: every hit counts, on every page
+        if not request.query_params.get(api_settings.ORDERING_PARAM):
+            return search.ranked(queryset, query)
+        return queryset.filter(pk__in=matches)
+
+
+class ProductFilter(django_filters.FilterSet):
+    """
+    Exact filters for ProductViewSet.
+    - `?location=Lagos`
+    - `?tags=organic,fresh` — products with any of the tags;
+      add `&tags_match=all` to require every tag
+    - `?category_tree=vegetables` — products in a category or any of its subcategories
+    """
+    tags = django_filters.CharFilter(method='filter_tags')
+    category_tree = django_filters.CharFilter(method='filter_category_tree')
+
+    class Meta:
+        model = Product
+        fields = ['location', 'tags', 'category_tree']
+
+    def filter_tags(self, queryset, name, value):
+        slugs = [slug for slug, _ in parse_tags(value)]
+        if not slugs:
+            return queryset
+
+        # Resolved on the (tag, product) index as an id subquery, so no
+        # DISTINCT/GROUP BY over the product rows themselves
+        matches = ProductTag.objects.filter(tag__slug__in=slugs)
+        if self.data.get('tags_match') == 'all' and len(slugs) > 1:
+            matches = (
+                matches.values('product_id')
+                .annotate(matched=Count('tag_id'))
+                .filter(matched=len(slugs))
+            )
+        return queryset.filter(pk__in=matches.values('product_id'))
+
+    def filter_category_tree(self, queryset, name, value):
+        # One statement: root path → subtree ids (materialized path prefix)
+        # → products via the category_id index
+        root_path = Category.objects.filter(slug=value).values('path')[:1]
+        subtree = Category.objects.filter(path__startswith=Subquery(root_path))
+        return queryset.filter(category_id__in=subtree.values('pk'))
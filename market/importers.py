@@ -0,0 +1,229 @@
+"""
+Streaming bulk product import (CSV or NDJSON).
+
+Rows are read lazily from the upload and processed in batches:
+- one category query per batch (slug or name, as CategoryField accepts)
+- one slug-prefix query per batch to allocate unique per-farmer slugs
+- one bulk_create per batch
+Rows that fail validation are reported and skipped; the rest of the batch
+is still imported.
+"""
+import csv
+import json
+from functools import reduce
+from operator import or_
+
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.db.models.functions import Lower
+from django.utils.text import slugify
+from rest_framework import serializers
+
+from . import cache, search
+from .models import Category, Product, ProductTag, Tag, parse_tags
+from .serializers import ProductSerializer
+
+FORMATS = ('csv', 'ndjson')
+BATCH_SIZE = 500
+NOT_UTF8 = "not valid UTF-8; save the file as UTF-8."
+
+
+def detect_format(content_type='', filename=''):
+    content_type, filename = (content_type or '').lower(), (filename or '').lower()
+    if 'csv' in content_type or filename.endswith('.csv'):
+        return 'csv'
+    if 'ndjson' in content_type or 'jsonl' in content_type or filename.endswith(('.ndjson', '.jsonl')):
+        return 'ndjson'
+    return None
+
+
+def decode_lines(lines, undecodable):
+    """
+    Lines as text. Lines that are not UTF-8 are decoded lossily and their
+    1-based line numbers added to `undecodable`, so the rows they belong to
+    are reported instead of imported as mojibake.
+    """
+    for number, line in enumerate(lines, start=1):
+        if isinstance(line, bytes):
+            try:
+                line = line.decode('utf-8-sig')
+            except UnicodeDecodeError:
+                undecodable.add(number)
+                line = line.decode('utf-8', errors='replace')
+        yield line
+
+
+def iter_rows(lines, fmt):
+    """
+    Yield (row_number, data, error) from an iterable of byte/str lines.
+    Row numbers are 1-based data rows (a CSV header is not counted).
+    """
+    undecodable = set()
+    text = decode_lines(lines, undecodable)
+    if fmt == 'csv':
+        reader = csv.DictReader(text)
+        reader.fieldnames  # reads the header
+        if undecodable:
+            yield 1, None, {'non_field_errors': [f"The header is {NOT_UTF8}"]}
+            return
+        end = reader.line_num
+        for number, row in enumerate(reader, start=1):
+            start, end = end + 1, reader.line_num  # a quoted field may span lines
+            if undecodable.intersection(range(start, end + 1)):
+                yield number, None, {'non_field_errors': [f"This row is {NOT_UTF8}"]}
+                continue
+            yield number, {k.strip(): v for k, v in row.items() if k}, None
+        return
+
+    number = 0
+    for line_number, line in enumerate(text, start=1):
+        if not line.strip():
+            continue
+        number += 1
+        if line_number in undecodable:
+            yield number, None, {'non_field_errors': [f"This line is {NOT_UTF8}"]}
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as exc:
+            yield number, None, {'non_field_errors': [f"Invalid JSON: {exc}"]}
+            continue
+        if not isinstance(row, dict):
+            yield number, None, {'non_field_errors': ["Each line must be a JSON object."]}
+            continue
+        yield number, row, None
+
+
+class ProductImportSerializer(ProductSerializer):
+    """
+    Row validation for imports. Category is resolved per batch by the
+    importer rather than with one query per row.
+    """
+    category = serializers.CharField()
+
+    class Meta(ProductSerializer.Meta):
+        fields = ['name', 'harvest_date', 'price', 'description', 'category', 'stock', 'unit', 'location', 'tags']
+
+    def validate_category(self, value):
+        categories = self.context['categories']
+        category = categories.get(value) or categories.get(value.lower())
+        if category is None:
+            raise serializers.ValidationError(f"Category '{value}' does not exist.")
+        return category
+
+
+class ProductImporter:
+    def __init__(self, farmer, batch_size=BATCH_SIZE):
+        self.farmer = farmer
+        self.batch_size = batch_size
+        self.created = 0
+        self.errors = []
+
+    def run(self, rows):
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= self.batch_size:
+                self.import_batch(batch)
+                batch = []
+        if batch:
+            self.import_batch(batch)
+        return self.report()
+
+    def report(self):
+        return {'created': self.created, 'failed': len(self.errors), 'errors': self.errors}
+
+    # ------------------------------------------------------------ batch steps
+
+    def load_categories(self, batch):
+        refs = {str(data.get('category', '')).strip() for _, data, _ in batch if data}
+        refs.discard('')
+        if not refs:
+            return {}
+        found = list(Category.objects.annotate(lower_name=Lower('name')).filter(
+            Q(slug__in=refs) | Q(lower_name__in={ref.lower() for ref in refs})
+        ))
+        categories = {}
+        for category in found:
+            categories[category.lower_name] = category
+        for category in found:  # slugs win over names
+            categories[category.slug] = category
+        return categories
+
+    def allocate_slugs(self, names):
+        """
+        Same scheme as Product.save (`base`, `base-2`, ...) but with a single
+        prefix query for the whole batch.
+        """
+        bases = {slugify(name) for name in names}
+        lookup = reduce(or_, [Q(slug=base) | Q(slug__startswith=f'{base}-') for base in bases])
+        taken = set(Product.objects.filter(lookup, farmer=self.farmer).values_list('slug', flat=True))
+
+        slugs = []
+        for name in names:
+            base = slugify(name)
+            slug, counter = base, 1
+            while slug in taken:
+                counter += 1
+                slug = f"{base}-{counter}"
+            taken.add(slug)
+            slugs.append(slug)
+        return slugs
+
+    def import_batch(self, batch):
+        context = {'categories': self.load_categories(batch)}
+        valid = []
+        for number, data, error in batch:
+            if error:
+                self.errors.append({'row': number, 'errors': error})
+                continue
+            serializer = ProductImportSerializer(data=data, context=context)
+            if serializer.is_valid():
+                valid.append((number, serializer.validated_data))
+            else:
+                self.errors.append({'row': number, 'errors': serializer.errors})
+        if not valid:
+            return
+
+        slugs = self.allocate_slugs([data['name'] for _, data in valid])
+        products = [
+            Product(farmer=self.farmer, slug=slug, **data)
+            for slug, (_, data) in zip(slugs, valid)
+        ]
+        try:
+            with transaction.atomic():
+                Product.objects.bulk_create(products)
+                self.after_bulk_create(products)
+            self.created += len(products)
+        except IntegrityError:
+            # e.g. a concurrent import took a slug: fall back to per-row saves
+            for (number, _), product in zip(valid, products):
+                product.pk = None
+                product.slug = ''
+                product._state.adding = True
+                try:
+                    with transaction.atomic():
+                        product.save()
+                    self.created += 1
+                except IntegrityError as exc:
+                    self.errors.append({'row': number, 'errors': {'non_field_errors': [str(exc)]}})
+
+    def after_bulk_create(self, products):
+        """
+        bulk_create skips Product.save and its signals: sync tags, the search
+        index and cache versions for the batch here.
+        """
+        parsed = {product.pk: parse_tags(product.tags) for product in products}
+        tag_names = {slug: name for pairs in parsed.values() for slug, name in pairs}
+        if tag_names:
+            Tag.objects.bulk_create(
+                [Tag(slug=slug, name=name) for slug, name in tag_names.items()], ignore_conflicts=True
+            )
+            tag_ids = dict(Tag.objects.filter(slug__in=tag_names).values_list('slug', 'pk'))
+            ProductTag.objects.bulk_create([
+                ProductTag(product_id=product_id, tag_id=tag_ids[slug])
+                for product_id, pairs in parsed.items() for slug, _ in pairs
+            ])
+        search.index_products(list(parsed))
+        rows = [(p.pk, p.category_id, p.farmer_id) for p in products]
+        transaction.on_commit(lambda: cache.invalidate_products(rows))
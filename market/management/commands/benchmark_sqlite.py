@@ -0,0 +1,56 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from harvestplace.db import benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure concurrent read/write throughput of SQLite with the stock backend and the tuned one "
+        "(harvestplace.db: WAL, pragmas, BEGIN IMMEDIATE, persistent connections), using worker processes "
+        "on a scratch database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', type=int, default=4, help="Processes running checkout-like transactions.")
+        parser.add_argument('--readers', type=int, default=4, help="Processes running lookups.")
+        parser.add_argument('--duration', type=float, default=10.0, help="Seconds per configuration.")
+        parser.add_argument('--configs', default=','.join(benchmark.CONFIGS), help="Which configurations to run.")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--json', dest='json_path', help="Also write the results to this file.")
+
+    def handle(self, *args, **options):
+        names = [name.strip() for name in options['configs'].split(',') if name.strip()]
+        unknown = set(names) - set(benchmark.CONFIGS)
+        if unknown or not names:
+            raise CommandError(f"--configs takes {', '.join(benchmark.CONFIGS)}.")
+        if options['writers'] < 0 or options['readers'] < 0 or options['writers'] + options['readers'] == 0:
+            raise CommandError("Run at least one writer or reader.")
+
+        results = {}
+        for name in names:
+            self.stdout.write(f"Running '{name}' for {options['duration']}s...")
+            results[name] = benchmark.run(
+                name, writers=options['writers'], readers=options['readers'],
+                duration=options['duration'], seed=options['seed'],
+            )
+
+        self.stdout.write(
+            f"{'config':<8}{'role':<7}{'ops/s':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'errors':>8}"
+        )
+        for name, roles in results.items():
+            for role, row in roles.items():
+                self.stdout.write(
+                    f"{name:<8}{role:<7}{row['ops_per_s']:>9}{row['p50_ms']:>9}{row['p95_ms']:>9}"
+                    f"{row['p99_ms']:>9}{row['errors']:>8}"
+                )
+        if {'stock', 'tuned'} <= results.keys():
+            for role in ('write', 'read'):
+                before, after = results['stock'][role]['ops_per_s'], results['tuned'][role]['ops_per_s']
+                if before:
+                    self.stdout.write(self.style.SUCCESS(f"{role}s: {after / before:.1f}x the stock throughput"))
+        if options['json_path']:
+            with open(options['json_path'], 'w') as stream:
+                json.dump(results, stream, indent=2)
+                stream.write('\n')
@@ -0,0 +1,53 @@
+from datetime import datetime
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from harvestplace.datagen import BASE_VOLUMES, BATCH_SIZE, PASSWORD, SEED, MarketplaceGenerator
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate a synthetic marketplace (users, categories, products, orders, wallet ledgers) "
+        "with skewed activity and consistent balances. Deterministic for a given --seed and --end."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', type=float, default=1.0,
+                            help="Multiplier for the default volumes (%s)." % ', '.join(f'{k}={v}' for k, v in BASE_VOLUMES.items()))
+        for name in BASE_VOLUMES:
+            parser.add_argument(f'--{name}', type=int, help=f"Exact number of {name} (overrides --scale).")
+        parser.add_argument('--days', type=int, default=365, help="Length of the order and ledger history.")
+        parser.add_argument('--end', help="Last day of the history, YYYY-MM-DD (default: now).")
+        parser.add_argument('--seed', type=int, default=SEED)
+        parser.add_argument('--prefix', default='gen', help="Username prefix, e.g. gen_farmer0.")
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        if not connection.features.can_return_rows_from_bulk_insert:
+            raise CommandError("This database does not return ids from bulk inserts (needs SQLite >= 3.35 or PostgreSQL).")
+        prefix = options['prefix']
+        if get_user_model().objects.filter(username__startswith=f'{prefix}_').exists():
+            raise CommandError(f"Users named '{prefix}_*' already exist; pass another --prefix.")
+
+        end = None
+        if options['end']:
+            try:
+                end = timezone.make_aware(datetime.strptime(options['end'], '%Y-%m-%d').replace(hour=23, minute=59, second=59))
+            except ValueError:
+                raise CommandError("--end must be a date, YYYY-MM-DD.")
+
+        generator = MarketplaceGenerator(
+            scale=options['scale'], seed=options['seed'], end=end, days=options['days'], prefix=prefix,
+            batch_size=options['batch_size'], log=self.stdout.write, **{name: options[name] for name in BASE_VOLUMES},
+        )
+        self.stdout.write(f"Generating: {', '.join(f'{k}={v}' for k, v in generator.volumes.items())}")
+        created = generator.run()
+
+        for label, count in sorted(created.items()):
+            self.stdout.write(f"  {label}: {count}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {sum(created.values())} rows. Every generated user's password is '{PASSWORD}'."
+        ))
@@ -0,0 +1,38 @@
+import sys
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from market.importers import BATCH_SIZE, FORMATS, ProductImporter, detect_format, iter_rows
+
+
+class Command(BaseCommand):
+    help = "Bulk-import products for a farmer from a CSV or NDJSON file ('-' reads stdin)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--farmer', required=True, help="Username of the farmer who owns the products.")
+        parser.add_argument('--input-format', choices=FORMATS, help="Defaults to the file extension.")
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        try:
+            farmer = User.objects.get(username=options['farmer'], role='farmer')
+        except User.DoesNotExist:
+            raise CommandError(f"No farmer named '{options['farmer']}'.")
+
+        path = options['path']
+        fmt = options['input_format'] or detect_format(filename=path)
+        if fmt is None:
+            raise CommandError("Cannot tell the format from the file name; pass --input-format.")
+
+        importer = ProductImporter(farmer, batch_size=options['batch_size'])
+        if path == '-':
+            report = importer.run(iter_rows(sys.stdin.buffer, fmt))
+        else:
+            with open(path, 'rb') as stream:
+                report = importer.run(iter_rows(stream, fmt))
+
+        for error in report['errors']:
+            self.stderr.write(f"row {error['row']}: {error['errors']}")
+        self.stdout.write(self.style.SUCCESS(f"Imported {report['created']} products, {report['failed']} rows failed."))
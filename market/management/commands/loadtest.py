@@ -0,0 +1,62 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from harvestplace.datagen import SEED
+from harvestplace.loadtest import DEFAULT_MIX, HTTPTransport, LoadTest, WSGITransport, parse_mix
+
+
+class Command(BaseCommand):
+    help = (
+        "Drive the API with concurrent weighted user journeys (browse, checkout, cancel, deposit, wallet), "
+        "report throughput and p50/p95/p99 per step, then check stock and wallet invariants. "
+        "Acts as users from generate_marketplace."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', help="Base URL of a running server (e.g. http://127.0.0.1:8000). "
+                                          "Default: call the WSGI app in-process.")
+        parser.add_argument('--workers', type=int, default=8, help="Concurrent workers (threads).")
+        parser.add_argument('--duration', type=float, default=30.0, help="Seconds to run (0 = until --iterations).")
+        parser.add_argument('--iterations', type=int, help="Journeys per worker.")
+        parser.add_argument('--mix', default=','.join(f'{k}={v}' for k, v in DEFAULT_MIX.items()),
+                            help="Journey weights, e.g. browse=60,checkout=30,wallet=10.")
+        parser.add_argument('--prefix', default='gen', help="Username prefix used by generate_marketplace.")
+        parser.add_argument('--users', type=int, default=50, help="Distinct retailers to act as.")
+        parser.add_argument('--catalog', type=int, default=500, help="Products that orders pick from (Zipf-skewed).")
+        parser.add_argument('--think-ms', type=float, default=0, help="Mean pause between journeys.")
+        parser.add_argument('--seed', type=int, default=SEED)
+        parser.add_argument('--json', dest='json_path', help="Also write the report to this file.")
+
+    def handle(self, *args, **options):
+        if options['workers'] < 1:
+            raise CommandError("--workers must be at least 1.")
+        if not options['duration'] and not options['iterations']:
+            raise CommandError("Pass a --duration, --iterations or both.")
+        try:
+            transport = HTTPTransport(options['url']) if options['url'] else WSGITransport()
+            loadtest = LoadTest(
+                transport, prefix=options['prefix'], users=options['users'], catalog_size=options['catalog'],
+                mix=parse_mix(options['mix']), workers=options['workers'], duration=options['duration'],
+                iterations=options['iterations'], seed=options['seed'], think_ms=options['think_ms'],
+            )
+        except ValueError as exc:
+            raise CommandError(str(exc))
+
+        self.stdout.write(f"Running against {options['url'] or 'the in-process WSGI app'}...")
+        report = loadtest.run()
+
+        for line in report.table():
+            self.stdout.write(line)
+        for sample in report.error_samples:
+            self.stdout.write(self.style.WARNING(f"  {sample}"))
+        if options['json_path']:
+            with open(options['json_path'], 'w') as stream:
+                json.dump(report.as_dict(), stream, indent=2)
+                stream.write('\n')
+
+        if report.violations:
+            for violation in report.violations:
+                self.stdout.write(self.style.ERROR(violation))
+            raise CommandError(f"{len(report.violations)} invariant violations under load.")
+        self.stdout.write(self.style.SUCCESS("Invariants hold: no negative stock or balances, ledgers match."))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+from market import search
+from market.models import Product
+
+
+class Command(BaseCommand):
+    help = "Rebuild the product full-text search index from market_product."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        using = options['database']
+        if not search.is_supported(using):
+            self.stdout.write(self.style.WARNING("Full-text search is not supported on this database; nothing to do."))
+            return
+        search.rebuild_index(using=using)
+        count = Product.objects.using(using).count()
+        self.stdout.write(self.style.SUCCESS(f"Indexed {count} products."))
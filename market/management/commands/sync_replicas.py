@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from harvestplace.db.router import copy_database, routing_setting
+
+
+class Command(BaseCommand):
+    help = (
+        "Copy the primary SQLite database onto every replica in DATABASE_ROUTING['REPLICAS']. "
+        "With --loop, keeps them at most --interval seconds behind (keep DB_STICKY_SECONDS above that)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help="Keep syncing.")
+        parser.add_argument('--interval', type=float, default=2.0, help="Seconds between syncs (with --loop).")
+
+    def handle(self, *args, **options):
+        replicas = routing_setting('REPLICAS')
+        if not replicas:
+            raise CommandError("No replicas configured; set DB_REPLICAS.")
+        if connections[DEFAULT_DB_ALIAS].vendor != 'sqlite':
+            raise CommandError("sync_replicas copies SQLite files; use the database's own replication instead.")
+
+        while True:
+            started = time.monotonic()
+            for alias in replicas:
+                copy_database(connections[alias].settings_dict['NAME'])
+            self.stdout.write(f"Synced {len(replicas)} replicas in {time.monotonic() - started:.2f}s.")
+            if not options['loop']:
+                break
+            connections[DEFAULT_DB_ALIAS].close()  # don't hold a read snapshot between syncs
+            time.sleep(options['interval'])
+        self.stdout.write(self.style.SUCCESS("Replicas are up to date."))
@@ -0,0 +1,24 @@
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    from market import search
+    alias = schema_editor.connection.alias
+    search.create_index(using=alias)
+    search.rebuild_index(using=alias)
+
+
+def drop_search_index(apps, schema_editor):
+    from market import search
+    search.drop_index(using=schema_editor.connection.alias)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('market', '0006_alter_product_harvest_date'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,80 @@
+# Generated by Django 5.2.5 on 2026-10-18 14:47
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.utils.text import slugify
+
+BATCH_SIZE = 1000
+
+
+def backfill_tags(apps, schema_editor):
+    """
+    Split existing comma-separated Product.tags into Tag/ProductTag rows.
+    """
+    Product = apps.get_model('market', 'Product')
+    Tag = apps.get_model('market', 'Tag')
+    ProductTag = apps.get_model('market', 'ProductTag')
+
+    def flush(pairs, names):
+        Tag.objects.bulk_create(
+            [Tag(slug=slug, name=name) for slug, name in names.items()], ignore_conflicts=True
+        )
+        tag_ids = dict(Tag.objects.filter(slug__in=names).values_list('slug', 'id'))
+        ProductTag.objects.bulk_create(
+            [ProductTag(product_id=product_id, tag_id=tag_ids[slug]) for product_id, slug in pairs],
+            ignore_conflicts=True,
+        )
+
+    pairs, names = [], {}
+    rows = Product.objects.exclude(tags='').values_list('id', 'tags').iterator(chunk_size=BATCH_SIZE)
+    for product_id, raw in rows:
+        for name in raw.split(','):
+            slug = slugify(name.strip())[:60]
+            if slug:
+                names.setdefault(slug, name.strip()[:50])
+                pairs.append((product_id, slug))
+        if len(pairs) >= BATCH_SIZE:
+            flush(pairs, names)
+            pairs, names = [], {}
+    if pairs:
+        flush(pairs, names)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('market', '0009_category_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50)),
+                ('slug', models.SlugField(max_length=60, unique=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ProductTag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='market.product')),
+                ('tag', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='market.tag')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='tag_set',
+            field=models.ManyToManyField(blank=True, related_name='products', through='market.ProductTag', to='market.tag'),
+        ),
+        migrations.AddIndex(
+            model_name='producttag',
+            index=models.Index(fields=['tag', 'product'], name='producttag_tag_product_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='producttag',
+            unique_together={('product', 'tag')},
+        ),
+        migrations.RunPython(backfill_tags, migrations.RunPython.noop),
+    ]
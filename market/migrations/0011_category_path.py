@@ -0,0 +1,50 @@
+# Generated by Django 5.2.5 on 2026-10-18 14:49
+
+from django.db import migrations, models
+
+PATH_SEGMENT_WIDTH = 8
+
+
+def backfill_paths(apps, schema_editor):
+    Category = apps.get_model('market', 'Category')
+    parents = dict(Category.objects.values_list('id', 'parent_id'))
+    paths = {}  # id -> (path, depth)
+
+    def path_of(pk, seen=()):
+        if pk not in paths:
+            parent = parents.get(pk)
+            segment = f"{pk:0{PATH_SEGMENT_WIDTH}d}/"
+            if parent not in parents or parent in seen:
+                paths[pk] = (segment, 0)
+            else:
+                parent_path, parent_depth = path_of(parent, seen + (pk,))
+                paths[pk] = (parent_path + segment, parent_depth + 1)
+        return paths[pk]
+
+    for pk in parents:
+        path_of(pk)
+    Category.objects.bulk_update(
+        [Category(pk=pk, path=path, depth=depth) for pk, (path, depth) in paths.items()],
+        ['path', 'depth'], batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('market', '0010_tags'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='depth',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='path',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=255),
+        ),
+        migrations.RunPython(backfill_paths, migrations.RunPython.noop),
+    ]
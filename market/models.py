@@ -3,6 +3,9 @@ from django.db import models
 # Create your models here.
 from django.db import models
 from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import F, Value
+from django.db.models.functions import Concat, Substr
 from django.utils.text import slugify
 from datetime import date
 
@@ -16,12 +19,67 @@ class Category(models.Model):
         blank=True,
         related_name='subcategories'
     )
+    updated_at = models.DateTimeField(auto_now=True)  # validators for product/category ETags
+
+    # Materialized path of zero-padded ids from the root, e.g. "00000001/00000004/".
+    # A subtree is every category whose path starts with its root's path.
+    path = models.CharField(max_length=255, db_index=True, editable=False, blank=True)
+    depth = models.PositiveSmallIntegerField(default=0, editable=False)
+
+    PATH_SEGMENT_WIDTH = 8
+
+    def is_descendant_of(self, other):
+        return bool(other.path) and self.path.startswith(other.path)
 
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify(self.name)
+
+        parent = self.parent if self.parent_id else None
+        if parent and self.pk and (parent.pk == self.pk or parent.is_descendant_of(self)):
+            raise ValidationError("A category cannot be moved under itself or one of its subcategories.")
+
+        old_path = self.path
         super().save(*args, **kwargs)
 
+        new_path = f"{parent.path if parent else ''}{self.pk:0{self.PATH_SEGMENT_WIDTH}d}/"
+        if new_path == old_path:
+            return
+        new_depth = parent.depth + 1 if parent else 0
+        Category.objects.filter(pk=self.pk).update(path=new_path, depth=new_depth)
+        if old_path:
+            # Re-root the whole subtree in one statement
+            Category.objects.filter(path__startswith=old_path).exclude(pk=self.pk).update(
+                path=Concat(Value(new_path), Substr('path', len(old_path) + 1)),
+                depth=F('depth') + (new_depth - self.depth),
+            )
+        self.path, self.depth = new_path, new_depth
+
+    def get_descendants(self, include_self=True):
+        queryset = Category.objects.filter(path__startswith=self.path)
+        return queryset if include_self else queryset.exclude(pk=self.pk)
+
+    def __str__(self):
+        return self.name
+
+
+def parse_tags(raw):
+    """
+    Split a comma-separated tag string into unique (slug, name) pairs, in order.
+    """
+    tags = {}
+    for name in (raw or '').split(','):
+        name = name.strip()
+        slug = slugify(name)[:60]
+        if slug and slug not in tags:
+            tags[slug] = name[:50]
+    return list(tags.items())
+
+
+class Tag(models.Model):
+    name = models.CharField(max_length=50)
+    slug = models.SlugField(max_length=60, unique=True)
+
     def __str__(self):
         return self.name
 
@@ -45,19 +103,37 @@ class Product(models.Model):
     
 
     image = models.ImageField(upload_to='products/', blank=True, null=True)
-    tags = models.CharField(max_length=255, blank=True)  # comma-separated tags for filtering
+    tags = models.CharField(max_length=255, blank=True)  # comma-separated, as entered; normalized into tag_set
+    tag_set = models.ManyToManyField(Tag, through='ProductTag', related_name='products', blank=True)
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         unique_together = ('farmer', 'slug', 'harvest_date')  # Unique per farmer
+        indexes = [
+            # Keyset pagination: (ordering field, id) for each ordering_fields entry
+            models.Index(fields=['is_active', 'created_at', 'id'], name='product_active_created_idx'),
+            models.Index(fields=['is_active', 'price', 'id'], name='product_active_price_idx'),
+        ]
 
     @property
     def in_stock(self):
         return self.stock > 0
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_tags = instance.__dict__.get('tags')  # None when deferred
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        super().refresh_from_db(using=using, fields=fields, from_queryset=from_queryset)
+        if fields is None or 'tags' in fields:
+            self._loaded_tags = self.tags
+
     def save(self, *args, **kwargs):
+        adding = self._state.adding
         if not self.slug:
             base_slug = slugify(self.name)
             slug = base_slug
@@ -69,6 +145,49 @@ class Product(models.Model):
             self.slug = slug
         super().save(*args, **kwargs)
 
+        update_fields = kwargs.get('update_fields')
+        if (update_fields is None or 'tags' in update_fields) and self.tags_changed(adding):
+            self.sync_tags()
+        self._loaded_tags = self.tags
+
+    def tags_changed(self, adding=False):
+        """
+        Whether tag_set may be out of step with `tags`. Stock/price-only edits
+        skip the resync; an unknown loaded value (deferred `tags`, or an
+        instance built by hand for an existing row) always resyncs.
+        """
+        if adding:
+            return bool(parse_tags(self.tags))
+        loaded = getattr(self, '_loaded_tags', None)
+        if loaded is None:
+            return True
+        return {slug for slug, _ in parse_tags(loaded)} != {slug for slug, _ in parse_tags(self.tags)}
+
+    def sync_tags(self):
+        """
+        Mirror the comma-separated `tags` string into the normalized tag_set.
+        """
+        parsed = parse_tags(self.tags)
+        if not parsed:
+            ProductTag.objects.filter(product=self).delete()
+            return
+        Tag.objects.bulk_create(
+            [Tag(slug=slug, name=name) for slug, name in parsed], ignore_conflicts=True
+        )
+        self.tag_set.set(Tag.objects.filter(slug__in=[slug for slug, _ in parsed]))
+
     def __str__(self):
         return f"{self.name} ({self.harvest_date})"
 
+
+class ProductTag(models.Model):
+    product = models.ForeignKey(Product, on_delete=models.CASCADE)
+    tag = models.ForeignKey(Tag, on_delete=models.CASCADE)
+
+    class Meta:
+        unique_together = ('product', 'tag')
+        indexes = [
+            # Tag filters go tag → products; this covers them without touching the product rows
+            models.Index(fields=['tag', 'product'], name='producttag_tag_product_idx'),
+        ]
+
@@ -0,0 +1,217 @@
+"""
+Full-text search index for the product catalog.
+
+- SQLite  → FTS5 virtual table ``market_product_fts`` (rowid == product id)
+- Postgres → ``search_vector`` tsvector column on ``market_product`` (GIN indexed)
+
+The index covers name, description, tags, category name and location. It is
+kept current by the Product/Category signal handlers in ``market.signals``;
+anything that bypasses ``save()`` (bulk_create, queryset.update) must call
+``index_products`` itself or run ``manage.py rebuild_search_index``.
+"""
+import re
+
+from django.db import connections, DEFAULT_DB_ALIAS
+from django.db.models.expressions import RawSQL
+
+FTS_TABLE = 'market_product_fts'
+PRODUCT_TABLE = 'market_product'
+CATEGORY_TABLE = 'market_category'
+
+MAX_TERMS = 8
+CHUNK_SIZE = 500  # stay well under SQLite's bound-parameter limit
+
+# bm25() column weights, in FTS column order: name, description, tags, category, location
+SQLITE_WEIGHTS = (10.0, 1.0, 5.0, 4.0, 2.0)
+
+TERM_RE = re.compile(r'\w+', re.UNICODE)
+
+POSTGRES_VECTOR = (
+    "setweight(to_tsvector('simple', coalesce(p.name, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(p.tags, '')), 'B') || "
+    "setweight(to_tsvector('simple', coalesce(c.name, '')), 'B') || "
+    "setweight(to_tsvector('simple', coalesce(p.location, '')), 'C') || "
+    "setweight(to_tsvector('simple', coalesce(p.description, '')), 'D')"
+)
+
+
+def _connection(using=None):
+    return connections[using or DEFAULT_DB_ALIAS]
+
+
+def is_supported(using=None):
+    return _connection(using).vendor in ('sqlite', 'postgresql')
+
+
+def tokenize(text):
+    """
+    Split free text into index terms. Only word characters survive, so the
+    result is safe to splice into FTS5 / tsquery syntax.
+    """
+    return TERM_RE.findall((text or '').lower())[:MAX_TERMS]
+
+
+def _chunks(ids):
+    ids = list(ids)
+    for start in range(0, len(ids), CHUNK_SIZE):
+        yield ids[start:start + CHUNK_SIZE]
+
+
+# ---------------------------------------------------------------- schema
+
+def create_index(using=None):
+    """
+    Create the index structures for the current backend (used by migrations).
+    """
+    conn = _connection(using)
+    with conn.cursor() as cursor:
+        if conn.vendor == 'sqlite':
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} "
+                f"USING fts5(name, description, tags, category, location, "
+                f"tokenize = 'unicode61 remove_diacritics 2')"
+            )
+        elif conn.vendor == 'postgresql':
+            cursor.execute(f"ALTER TABLE {PRODUCT_TABLE} ADD COLUMN IF NOT EXISTS search_vector tsvector")
+            cursor.execute(
+                f"CREATE INDEX IF NOT EXISTS market_product_search_idx "
+                f"ON {PRODUCT_TABLE} USING GIN (search_vector)"
+            )
+
+
+def drop_index(using=None):
+    conn = _connection(using)
+    with conn.cursor() as cursor:
+        if conn.vendor == 'sqlite':
+            cursor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+        elif conn.vendor == 'postgresql':
+            cursor.execute("DROP INDEX IF EXISTS market_product_search_idx")
+            cursor.execute(f"ALTER TABLE {PRODUCT_TABLE} DROP COLUMN IF EXISTS search_vector")
+
+
+# ---------------------------------------------------------------- writes
+
+def _reindex(where, params, using=None):
+    conn = _connection(using)
+    with conn.cursor() as cursor:
+        if conn.vendor == 'sqlite':
+            cursor.execute(
+                f"DELETE FROM {FTS_TABLE} WHERE rowid IN "
+                f"(SELECT p.id FROM {PRODUCT_TABLE} p WHERE {where})",
+                params,
+            )
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE} (rowid, name, description, tags, category, location) "
+                f"SELECT p.id, p.name, p.description, p.tags, c.name, p.location "
+                f"FROM {PRODUCT_TABLE} p JOIN {CATEGORY_TABLE} c ON c.id = p.category_id "
+                f"WHERE {where}",
+                params,
+            )
+        elif conn.vendor == 'postgresql':
+            cursor.execute(
+                f"UPDATE {PRODUCT_TABLE} p SET search_vector = {POSTGRES_VECTOR} "
+                f"FROM {CATEGORY_TABLE} c WHERE c.id = p.category_id AND {where}",
+                params,
+            )
+
+
+def index_products(product_ids, using=None):
+    """
+    (Re)index the given products. Safe to call for ids that are already indexed.
+    """
+    if not is_supported(using):
+        return
+    for chunk in _chunks(product_ids):
+        placeholders = ', '.join(['%s'] * len(chunk))
+        _reindex(f"p.id IN ({placeholders})", chunk, using)
+
+
+def index_category(category_id, using=None):
+    """
+    Reindex every product of a category (its name is part of the document).
+    """
+    if not is_supported(using):
+        return
+    _reindex("p.category_id = %s", [category_id], using)
+
+
+def remove_products(product_ids, using=None):
+    conn = _connection(using)
+    # Postgres keeps the vector on the product row itself, so it goes with it
+    if conn.vendor != 'sqlite':
+        return
+    with conn.cursor() as cursor:
+        for chunk in _chunks(product_ids):
+            placeholders = ', '.join(['%s'] * len(chunk))
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})", chunk)
+
+
+def rebuild_index(using=None):
+    """
+    Rebuild the whole index from market_product. Returns nothing; O(catalog).
+    """
+    if not is_supported(using):
+        return
+    conn = _connection(using)
+    if conn.vendor == 'sqlite':
+        with conn.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE}")
+    _reindex("1 = 1", [], using)
+
+
+# ---------------------------------------------------------------- reads
+
+def _match(vendor, terms):
+    """
+    FTS5 MATCH / tsquery string: every term a prefix, all terms required.
+    """
+    if vendor == 'sqlite':
+        return ' '.join(f'"{term}"*' for term in terms)
+    return ' & '.join(f'{term}:*' for term in terms)
+
+
+def matching(query, using=None):
+    """
+    Subquery of every product id matching ``query``, for
+    ``queryset.filter(pk__in=...)``, so counts and later pages see all hits.
+
+    Returns None without a full-text index (fall back to LIKE) and an empty
+    list when the query has no searchable terms.
+    """
+    conn = _connection(using)
+    if conn.vendor not in ('sqlite', 'postgresql'):
+        return None
+    terms = tokenize(query)
+    if not terms:
+        return []
+    if conn.vendor == 'sqlite':
+        sql = f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s"
+    else:
+        sql = f"SELECT id FROM {PRODUCT_TABLE} WHERE search_vector @@ to_tsquery('simple', %s)"
+    return RawSQL(sql, [_match(conn.vendor, terms)])
+
+
+def ranked(queryset, query):
+    """
+    ``queryset`` restricted to products matching ``query``, best match first.
+    The index is joined in (one pass, every hit), so the result must stay
+    the outermost query: don't use it as a subquery.
+    """
+    vendor = _connection(queryset.db).vendor
+    match = _match(vendor, tokenize(query))
+    if vendor == 'sqlite':
+        weights = ', '.join(str(w) for w in SQLITE_WEIGHTS)
+        queryset = queryset.extra(
+            tables=[FTS_TABLE],
+            where=[f'{FTS_TABLE}.rowid = {PRODUCT_TABLE}.id', f'{FTS_TABLE} MATCH %s'],
+            params=[match],
+            select={'search_rank': f'bm25({FTS_TABLE}, {weights})'},
+        )
+    else:
+        queryset = queryset.extra(
+            where=[f"{PRODUCT_TABLE}.search_vector @@ to_tsquery('simple', %s)"],
+            params=[match],
+            select={'search_rank': f"-ts_rank({PRODUCT_TABLE}.search_vector, to_tsquery('simple', %s))"},
+            select_params=[match],
+        )
+    return queryset.order_by('search_rank', '-pk')
@@ -11,7 +11,26 @@ from datetime import date
 class CategorySerializer(serializers.ModelSerializer):
     class Meta:
         model = Category
-        fields = ['id', 'name', 'slug']
+        fields = ['id', 'name', 'slug', 'parent']
+
+    def validate_parent(self, value):
+        if value and self.instance and (value.pk == self.instance.pk or value.is_descendant_of(self.instance)):
+            raise serializers.ValidationError("A category cannot be moved under itself or one of its subcategories.")
+        return value
+
+
+def build_category_tree(rows):
+    """
+    Nest category rows (dicts with id/name/slug/parent_id) into a tree.
+    Rows must be ordered by path so parents come before their children.
+    """
+    nodes, roots = {}, []
+    for row in rows:
+        node = {'id': row['id'], 'name': row['name'], 'slug': row['slug'], 'subcategories': []}
+        nodes[row['id']] = node
+        parent = nodes.get(row['parent_id'])
+        (parent['subcategories'] if parent else roots).append(node)
+    return roots
 
 
 
@@ -39,7 +58,7 @@ class ProductSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Product
-        fields = ['id', 'name', 'slug', 'harvest_date', 'price', 'description', 'category', 'stock']
+        fields = ['id', 'name', 'slug', 'harvest_date', 'price', 'description', 'category', 'stock', 'tags']
         read_only_fields = ['slug']
 
     def validate_category(self, value):
@@ -95,4 +114,24 @@ class ProductSerializer(serializers.ModelSerializer):
             'name': instance.category.name,
             'slug': instance.category.slug
         }
-        return rep
\ No newline at end of file
+        return rep
+
+
+class ProductListSerializer(serializers.ModelSerializer):
+    """
+    Read-only product representation for list responses.
+    Same output as ProductSerializer, without the write-side fields and
+    validators. Expects `category` to be select_related by the caller.
+    """
+    category = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Product
+        fields = ['id', 'name', 'slug', 'harvest_date', 'price', 'description', 'category', 'stock', 'tags']
+        read_only_fields = fields
+
+    def get_category(self, instance):
+        return {
+            'name': instance.category.name,
+            'slug': instance.category.slug
+        }
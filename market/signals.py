@@ -0,0 +1,55 @@
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from .models import Product, Category
+from . import search, cache
+
+
+@receiver(pre_save, sender=Product)
+def remember_product_scopes(sender, instance, raw=False, **kwargs):
+    # A product moving category must also invalidate its old category's lists
+    instance._previous_scopes = None
+    if instance.pk and not raw:
+        instance._previous_scopes = (
+            Product.objects.filter(pk=instance.pk).values_list('pk', 'category_id', 'farmer_id').first()
+        )
+
+
+@receiver(post_save, sender=Product)
+def index_product(sender, instance, raw=False, using=None, **kwargs):
+    if raw:  # loaddata: rebuild_search_index afterwards
+        return
+    search.index_products([instance.pk], using=using)
+
+
+@receiver(post_save, sender=Product)
+def invalidate_product_cache(sender, instance, using=None, **kwargs):
+    # After commit: a reader refilling the new version earlier could cache
+    # uncommitted (or rolled back) rows under it
+    rows = [(instance.pk, instance.category_id, instance.farmer_id)]
+    previous = getattr(instance, '_previous_scopes', None)
+    if previous:
+        rows.append(previous)
+    transaction.on_commit(lambda: cache.invalidate_products(rows), using=using)
+
+
+@receiver(post_delete, sender=Product)
+def unindex_product(sender, instance, using=None, **kwargs):
+    search.remove_products([instance.pk], using=using)
+    rows = [(instance.pk, instance.category_id, instance.farmer_id)]
+    transaction.on_commit(lambda: cache.invalidate_products(rows), using=using)
+
+
+@receiver(post_save, sender=Category)
+def reindex_category_products(sender, instance, created, raw=False, using=None, **kwargs):
+    # A new category has no products yet; a renamed one changes their documents
+    if created or raw:
+        return
+    search.index_category(instance.pk, using=using)
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_category_cache(sender, instance, using=None, **kwargs):
+    category_id = instance.pk  # cleared on the instance by delete()
+    transaction.on_commit(lambda: cache.invalidate_categories(category_id), using=using)
@@ -0,0 +1,99 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from market.models import Category, Product
+
+User = get_user_model()
+
+
+class ProductResponseCacheTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.farmer = User.objects.create_user(username="farmer1", password="pass1234", role="farmer")
+        self.category = Category.objects.create(name="Tubers")
+        self.other_category = Category.objects.create(name="Legumes")
+        self.product = Product.objects.create(
+            farmer=self.farmer, name="Yam", price=800, stock=10, location="Benue", category=self.category
+        )
+        self.list_url = reverse('product-list')
+        self.detail_url = reverse('product-detail', kwargs={'pk': self.product.pk})
+
+    def test_repeat_anonymous_reads_are_hits(self):
+        self.assertEqual(self.client.get(self.list_url)['X-Cache'], 'MISS')
+        with self.assertNumQueries(0):  # the ETag comes from the cached entry too
+            response = self.client.get(self.list_url)
+        self.assertEqual(response['X-Cache'], 'HIT')
+        self.assertEqual(response.data['results'][0]['name'], 'Yam')
+
+        self.assertEqual(self.client.get(self.detail_url)['X-Cache'], 'MISS')
+        self.assertEqual(self.client.get(self.detail_url)['X-Cache'], 'HIT')
+
+    def test_param_order_does_not_matter(self):
+        self.client.get(self.list_url + '?location=Benue&ordering=price')
+        response = self.client.get(self.list_url + '?ordering=price&location=Benue')
+        self.assertEqual(response['X-Cache'], 'HIT')
+
+    def test_product_save_bumps_versions(self):
+        self.client.get(self.list_url)
+        self.client.get(self.detail_url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.price = 900
+            self.product.save()
+
+        response = self.client.get(self.list_url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['results'][0]['price'], '900.00')
+        self.assertEqual(self.client.get(self.detail_url)['X-Cache'], 'MISS')
+
+    def test_versions_bump_only_on_commit(self):
+        self.client.get(self.list_url)
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(ZeroDivisionError), transaction.atomic():
+                self.product.price = 900
+                self.product.save()
+                # a reader during the transaction must not refill under a new version
+                self.assertEqual(self.client.get(self.list_url)['X-Cache'], 'HIT')
+                1 / 0
+        self.assertEqual(self.client.get(self.list_url)['X-Cache'], 'HIT')
+
+    def test_category_scoped_lists(self):
+        other_url = self.list_url + f'?category={self.other_category.pk}'
+        self.client.get(other_url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.price = 900
+            self.product.save()
+        # An unrelated category's list is untouched by this write
+        self.assertEqual(self.client.get(other_url)['X-Cache'], 'HIT')
+
+        # ...until the product moves into it
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.category = self.other_category
+            self.product.save()
+        self.assertEqual(self.client.get(other_url)['X-Cache'], 'MISS')
+
+    def test_category_rename_invalidates_embedded_names(self):
+        self.client.get(self.detail_url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.category.name = "Roots"
+            self.category.save()
+        response = self.client.get(self.detail_url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['category']['name'], 'Roots')
+
+    def test_category_rename_invalidates_owner_lists(self):
+        owner_url = self.list_url + f'?owner={self.farmer.pk}'
+        self.client.get(owner_url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.category.name = "Roots"
+            self.category.save()
+        response = self.client.get(owner_url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['results'][0]['category']['name'], 'Roots')
+
+    def test_authenticated_reads_bypass_cache(self):
+        self.client.force_authenticate(user=self.farmer)
+        self.client.get(self.list_url)
+        self.assertNotIn('X-Cache', self.client.get(self.list_url))
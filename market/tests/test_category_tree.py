@@ -0,0 +1,71 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from market.models import Category, Product
+
+User = get_user_model()
+
+
+class CategoryTreeTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.vegetables = Category.objects.create(name="Vegetables")
+        self.leafy = Category.objects.create(name="Leafy", parent=self.vegetables)
+        self.spinach = Category.objects.create(name="Spinach", parent=self.leafy)
+        self.fruits = Category.objects.create(name="Fruits")
+
+        farmer = User.objects.create_user(username="farmer1", password="pass1234", role="farmer")
+        self.products = {
+            category.slug: Product.objects.create(
+                farmer=farmer, name=f"{category.name} bundle", price=100, stock=5, location="Oyo", category=category
+            )
+            for category in (self.vegetables, self.leafy, self.spinach, self.fruits)
+        }
+
+    def subtree_ids(self, slug):
+        response = self.client.get(reverse('product-list'), {'category_tree': slug})
+        self.assertEqual(response.status_code, 200)
+        return {row['id'] for row in response.data['results']}
+
+    def test_paths_follow_parents(self):
+        self.spinach.refresh_from_db()
+        self.assertEqual(self.spinach.depth, 2)
+        self.assertTrue(self.spinach.path.startswith(self.leafy.path))
+        self.assertEqual(set(self.vegetables.get_descendants()), {self.vegetables, self.leafy, self.spinach})
+
+    def test_category_tree_filter(self):
+        p = self.products
+        self.assertEqual(self.subtree_ids('vegetables'), {p['vegetables'].id, p['leafy'].id, p['spinach'].id})
+        self.assertEqual(self.subtree_ids('leafy'), {p['leafy'].id, p['spinach'].id})
+        self.assertEqual(self.subtree_ids('unknown'), set())
+
+    def test_moving_a_category_moves_its_subtree(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.leafy.parent = self.fruits
+            self.leafy.save()
+        self.spinach.refresh_from_db()
+        self.assertTrue(self.spinach.path.startswith(self.fruits.path))
+        self.assertEqual(self.spinach.depth, 2)
+        self.assertIn(self.products['spinach'].id, self.subtree_ids('fruits'))
+        self.assertEqual(self.subtree_ids('vegetables'), {self.products['vegetables'].id})
+
+    def test_cycles_are_rejected(self):
+        self.vegetables.parent = self.spinach
+        with self.assertRaises(ValidationError):
+            self.vegetables.save()
+
+    def test_tree_endpoint(self):
+        url = reverse('category-tree')
+        tree = self.client.get(url).data
+        self.assertEqual([node['slug'] for node in tree], ['vegetables', 'fruits'])
+        self.assertEqual(tree[0]['subcategories'][0]['subcategories'][0]['slug'], 'spinach')
+
+        with self.assertNumQueries(0):
+            self.client.get(url)
+        with self.captureOnCommitCallbacks(execute=True):
+            Category.objects.create(name="Herbs", parent=self.leafy)
+        tree = self.client.get(url).data
+        self.assertEqual(len(tree[0]['subcategories'][0]['subcategories']), 2)
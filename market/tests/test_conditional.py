@@ -0,0 +1,70 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from market.models import Category, Product
+
+User = get_user_model()
+
+
+class ConditionalGetTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.farmer = User.objects.create_user(username="farmer1", password="pass1234", role="farmer")
+        self.category = Category.objects.create(name="Spices")
+        self.product = Product.objects.create(
+            farmer=self.farmer, name="Ginger", price=400, stock=10, location="Kaduna", category=self.category
+        )
+        self.list_url = reverse('product-list')
+        self.detail_url = reverse('product-detail', kwargs={'pk': self.product.pk})
+
+    def test_matching_etag_returns_304_after_one_query(self):
+        self.client.force_authenticate(user=self.farmer)  # past the anonymous response cache
+        response = self.client.get(self.detail_url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Last-Modified', response)
+
+        with self.assertNumQueries(1):
+            response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+    def test_cached_reads_validate_without_queries(self):
+        etag = self.client.get(self.list_url)['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(self.list_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_etag_changes_with_product_or_category(self):
+        etag = self.client.get(self.list_url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.stock = 4
+            self.product.save()
+        response = self.client.get(self.list_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+        etag = response['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.category.name = "Herbs"
+            self.category.save()
+        self.assertEqual(self.client.get(self.list_url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_etag_differs_per_query(self):
+        etag = self.client.get(self.list_url)['ETag']
+        response = self.client.get(self.list_url, {'ordering': 'price'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_if_modified_since(self):
+        last_modified = self.client.get(self.list_url)['Last-Modified']
+        response = self.client.get(self.list_url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 304)
+
+    def test_category_list(self):
+        etag = self.client.get(reverse('category-list'))['ETag']
+        response = self.client.get(reverse('category-list'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_missing_product_still_404s(self):
+        url = reverse('product-detail', kwargs={'pk': 9999})
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH='*').status_code, 404)
@@ -0,0 +1,50 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from market.models import Category, Product
+
+User = get_user_model()
+
+
+class ProductFacetsTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        farmer = User.objects.create_user(username="farmer1", password="pass1234", role="farmer")
+        fruits = Category.objects.create(name="Fruits")
+        grains = Category.objects.create(name="Grains")
+        for name, price, location, category in [
+            ("Mango", 300, "Benue", fruits),
+            ("Orange", 700, "Benue", fruits),
+            ("Rice", 700, "Kebbi", grains),
+            ("Millet", 12000, "Kano", grains),
+        ]:
+            Product.objects.create(
+                farmer=farmer, name=name, price=price, stock=5, location=location, category=category
+            )
+        self.url = reverse('product-facets')
+
+    def test_counts_in_one_query(self):
+        with self.assertNumQueries(1):
+            data = self.client.get(self.url).data
+        self.assertEqual(data['total'], 4)
+        self.assertEqual({c['slug']: c['count'] for c in data['categories']}, {'fruits': 2, 'grains': 2})
+        self.assertEqual(data['locations'][0], {'location': 'Benue', 'count': 2})
+        self.assertEqual([b['count'] for b in data['price']], [1, 2, 0, 0, 1])
+        self.assertIsNone(data['price'][-1]['max'])
+
+    def test_respects_search_and_filters(self):
+        data = self.client.get(self.url, {'search': 'rice'}).data
+        self.assertEqual(data['total'], 1)
+        data = self.client.get(self.url, {'location': 'Benue'}).data
+        self.assertEqual([c['slug'] for c in data['categories']], ['fruits'])
+
+    def test_cached_until_product_write(self):
+        self.client.get(self.url)
+        with self.assertNumQueries(0):
+            self.client.get(self.url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Product.objects.get(name="Millet").delete()
+        self.assertEqual(self.client.get(self.url).data['total'], 3)
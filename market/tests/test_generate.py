@@ -0,0 +1,73 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.db.models import Sum
+from django.test import TestCase
+
+from accounts.models import Profile
+from market import search
+from market.models import Product
+from orders.models import Order, OrderStatusTransition
+from wallet.models import PendingSettlement, Transaction, Wallet
+
+User = get_user_model()
+
+SMALL = {'farmers': 5, 'retailers': 12, 'products': 60, 'orders': 80, 'transactions': 400, 'days': 30, 'end': '2025-06-30'}
+
+
+class GenerateMarketplaceTest(TestCase):
+    def generate(self, **options):
+        out = StringIO()
+        call_command('generate_marketplace', **{**SMALL, **options}, stdout=out)
+        return out.getvalue()
+
+    def test_rows_are_complete_without_signals(self):
+        output = self.generate()
+        self.assertIn('Created', output)
+        self.assertEqual(User.objects.count(), 17)
+        self.assertEqual(Profile.objects.count(), 17)
+        self.assertEqual(Wallet.objects.count(), 17)
+        self.assertEqual(Product.objects.count(), 60)
+        self.assertEqual(Order.objects.count(), 80)
+        self.assertGreaterEqual(Transaction.objects.count(), 400)
+        self.assertTrue(Product.objects.filter(pk__in=search.matching(Product.objects.first().name)).exists())
+
+    def test_money_is_consistent(self):
+        self.generate()
+        for wallet in Wallet.objects.all():
+            ok, stored, ledger = wallet.reconcile()
+            self.assertTrue(ok, f"{wallet}: stored {stored}, ledger {ledger}")
+        self.assertFalse(Transaction.objects.filter(balance_after__lt=0).exists())
+        # Every purchase is paid for; every cancellation refunded
+        purchases = Transaction.objects.filter(description__startswith='Purchase Order')
+        self.assertEqual(purchases.count(), Order.objects.count())
+        self.assertEqual(
+            Transaction.objects.filter(description__startswith='Refund for').count(),
+            Order.objects.filter(status='canceled').count(),
+        )
+        # Settled proceeds add up to the settlement credits they are linked to
+        settled = PendingSettlement.objects.filter(settled_at__isnull=False).aggregate(total=Sum('amount'))['total']
+        credited = Transaction.objects.filter(settlements__isnull=False).distinct().aggregate(total=Sum('amount'))['total']
+        self.assertEqual(settled, credited)
+
+    def test_order_history_follows_transitions(self):
+        self.generate()
+        for transition in OrderStatusTransition.objects.select_related('order'):
+            self.assertIn(transition.to_status, Order.TRANSITIONS[transition.from_status])
+        for order in Order.objects.exclude(status='pending'):
+            self.assertIsNotNone(getattr(order, Order.timestamp_field(order.status)))
+
+    def test_same_seed_same_data(self):
+        self.generate(prefix='a')
+        self.generate(prefix='b')
+        prices = [
+            list(Product.objects.filter(farmer__username__startswith=f'{prefix}_').order_by('pk').values_list('name', 'price'))
+            for prefix in 'ab'
+        ]
+        self.assertEqual(prices[0], prices[1])
+
+    def test_refuses_existing_prefix(self):
+        self.generate()
+        with self.assertRaises(CommandError):
+            self.generate()
@@ -0,0 +1,116 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from market import search
+from market.models import Category, Product
+
+User = get_user_model()
+
+CSV = """name,category,price,stock,location,tags
+Tomatoes,vegetables,500,10,Kano,"organic,fresh"
+Tomatoes,Vegetables,450,4,Kano,
+Okra,unknown-category,100,3,Oyo,
+Pepper,vegetables,-5,3,Oyo,
+Onions,vegetables,300,8,Sokoto,dried
+"""
+
+
+class ProductImportTest(APITestCase):
+    def setUp(self):
+        self.farmer = User.objects.create_user(username="farmer1", password="pass1234", role="farmer")
+        self.retailer = User.objects.create_user(username="retailer1", password="pass1234", role="retailer")
+        self.category = Category.objects.create(name="Vegetables")
+        Product.objects.create(
+            farmer=self.farmer, name="Tomatoes", price=500, stock=1, location="Kano", category=self.category
+        )
+        self.url = reverse('product-bulk-import')
+
+    def upload(self, content, name='products.csv'):
+        self.client.force_authenticate(user=self.farmer)
+        return self.client.post(self.url, {'file': SimpleUploadedFile(name, content.encode())}, format='multipart')
+
+    def test_csv_upload_reports_bad_rows_and_imports_the_rest(self):
+        response = self.upload(CSV)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['created'], 3)
+        self.assertEqual([e['row'] for e in response.data['errors']], [3, 4])
+        self.assertIn('category', response.data['errors'][0]['errors'])
+        self.assertIn('price', response.data['errors'][1]['errors'])
+
+        slugs = set(Product.objects.filter(name="Tomatoes").values_list('slug', flat=True))
+        self.assertEqual(slugs, {'tomatoes', 'tomatoes-2', 'tomatoes-3'})
+
+    def test_imported_rows_are_searchable_and_tagged(self):
+        self.upload(CSV)
+        onion = Product.objects.get(name="Onions")
+        self.assertEqual(list(Product.objects.filter(pk__in=search.matching('sokoto'))), [onion])
+        self.assertEqual(list(onion.tag_set.values_list('slug', flat=True)), ['dried'])
+
+    def test_ndjson_raw_body(self):
+        self.client.force_authenticate(user=self.farmer)
+        body = "\n".join([
+            json.dumps({"name": "Yam", "category": "vegetables", "price": 800, "stock": 5, "location": "Benue"}),
+            "not json",
+        ])
+        response = self.client.post(self.url, body, content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['created'], 1)
+        self.assertEqual(response.data['errors'][0]['row'], 2)
+
+    def test_text_that_is_not_utf8_is_reported(self):
+        self.client.force_authenticate(user=self.farmer)
+        latin1 = "name,category,price,stock,location,tags\nGarden Eggs,vegetables,100,5,Kano,\nPoivrons Doux,vegetables,90,2,Jos,\xe9t\xe9\n"
+        response = self.client.post(
+            self.url, {'file': SimpleUploadedFile('products.csv', latin1.encode('latin-1'))}, format='multipart'
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['created'], 1)
+        self.assertEqual(response.data['errors'][0]['row'], 2)
+        self.assertIn('UTF-8', response.data['errors'][0]['errors']['non_field_errors'][0])
+
+        binary = SimpleUploadedFile('products.csv', b'\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR\xff')
+        response = self.client.post(self.url, {'file': binary}, format='multipart')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['failed'], 1)
+
+        body = json.dumps({"name": "Yam", "category": "vegetables", "price": 800, "stock": 5, "location": "Benue"})
+        response = self.client.post(self.url, b'\xff\xfe\n' + body.encode(), content_type='application/x-ndjson')
+        self.assertEqual(response.data['created'], 1)
+        self.assertEqual(response.data['errors'][0]['row'], 1)
+
+    def test_batches_use_constant_queries(self):
+        rows = "".join(f"Maize {i},vegetables,100,5,Kaduna,\n" for i in range(40))
+        content = "name,category,price,stock,location,tags\n" + rows
+        self.client.force_authenticate(user=self.farmer)
+        # categories + slug prefixes + insert + FTS delete/insert, inside a savepoint
+        with self.assertNumQueries(7):
+            response = self.client.post(
+                self.url, {'file': SimpleUploadedFile('p.csv', content.encode())}, format='multipart'
+            )
+        self.assertEqual(response.data['created'], 40)
+
+    def test_retailers_cannot_import(self):
+        self.client.force_authenticate(user=self.retailer)
+        response = self.client.post(self.url, {'file': SimpleUploadedFile('p.csv', CSV.encode())}, format='multipart')
+        self.assertEqual(response.status_code, 403)
+
+    def test_management_command(self):
+        path = self.tmp_csv()
+        out = StringIO()
+        call_command('import_products', path, farmer='farmer1', stdout=out, stderr=StringIO())
+        self.assertIn("Imported 3 products, 2 rows failed.", out.getvalue())
+
+    def tmp_csv(self):
+        handle = tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False)
+        handle.write(CSV)
+        handle.close()
+        self.addCleanup(os.remove, handle.name)
+        return handle.name
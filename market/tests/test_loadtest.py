@@ -0,0 +1,74 @@
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+
+from harvestplace.loadtest import LoadTest, WSGITransport, check_invariants, parse_mix
+from harvestplace.metrics import percentile
+from market.models import Product
+from orders.models import Order
+from wallet.models import Wallet
+
+SMALL = {'farmers': 3, 'retailers': 6, 'products': 30, 'orders': 20, 'transactions': 80, 'days': 10, 'end': '2025-06-30'}
+
+
+@override_settings(ALLOWED_HOSTS=['localhost'])
+class LoadTestTest(TransactionTestCase):
+    # Workers are threads with their own connections: the data has to be committed
+    def setUp(self):
+        call_command('generate_marketplace', **SMALL, stdout=StringIO())
+
+    def test_journeys_run_and_invariants_hold(self):
+        loadtest = LoadTest(WSGITransport(), workers=1, duration=0, iterations=25, seed=1)
+        orders = Order.objects.count()
+        report = loadtest.run()
+
+        self.assertEqual(sum(report.journeys.values()), 25)
+        self.assertEqual(report.errors, 0, report.error_samples)
+        self.assertEqual(report.violations, [])
+        self.assertEqual(report.steps['products.search'].rejected, 0)
+        self.assertGreater(Order.objects.count(), orders)
+        step = report.as_dict()['steps']['products.list']
+        self.assertLessEqual(step['p50_ms'], step['p95_ms'])
+        self.assertLessEqual(step['p95_ms'], step['p99_ms'])
+
+    def test_command_reports_steps(self):
+        out = StringIO()
+        call_command('loadtest', workers=2, duration=0, iterations=5, mix='browse=1,wallet=1', stdout=out)
+        output = out.getvalue()
+        self.assertIn('p99', output)
+        self.assertIn('wallet.view', output)
+        self.assertIn('Invariants hold', output)
+
+    def test_violations_are_detected(self):
+        loadtest = LoadTest(WSGITransport(), workers=1, duration=0, iterations=1)
+        marks = loadtest.marks()
+        product = Product.objects.get(pk=loadtest.catalog[0][0])
+        Product.objects.filter(pk=product.pk).update(stock=-1)
+        wallet = Wallet.objects.filter(transactions__isnull=False).first()
+        wallet.credit(5)  # a ledger entry after the marks ...
+        Wallet.objects.filter(pk=wallet.pk).update(balance=wallet.balance + 1)  # ... and a balance that disagrees
+
+        violations = check_invariants(marks, loadtest.stock_before)
+        self.assertTrue(any(v.startswith('Negative stock') for v in violations))
+        self.assertTrue(any(v.startswith('Stock drift') for v in violations))
+        self.assertTrue(any(v.startswith('Ledger mismatch') for v in violations))
+
+    def test_unknown_users(self):
+        with self.assertRaises(CommandError):
+            call_command('loadtest', prefix='nobody', iterations=1, stdout=StringIO())
+
+
+class HelpersTest(SimpleTestCase):
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile([7], 95), 7)
+        self.assertEqual(percentile([], 50), 0.0)
+
+    def test_parse_mix(self):
+        self.assertEqual(parse_mix('browse=3, wallet=1'), {'browse': 3.0, 'wallet': 1.0})
+        for bad in ('teleport=1', 'browse=x', 'browse=0'):
+            with self.assertRaises(ValueError):
+                parse_mix(bad)
@@ -0,0 +1,57 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from harvestplace.metrics import registry
+from market.models import Category, Product
+
+User = get_user_model()
+
+METRICS = {'ENABLED': True, 'SERVER_TIMING': True, 'SLOW_QUERY_MS': 100, 'SLOW_QUERY_SAMPLE_RATE': 1.0, 'TOKEN': 'scrape-me'}
+
+
+@override_settings(METRICS=METRICS)
+class RequestMetricsTests(APITestCase):
+    def setUp(self):
+        registry.reset()
+        cache.clear()
+        self.farmer = User.objects.create_user(username='farmer1', password='pass1234', role='farmer')
+        category = Category.objects.create(name='Vegetables')
+        Product.objects.create(farmer=self.farmer, name='Tomato', price=100, stock=5, location='Lagos', category=category)
+
+    def scrape(self):
+        response = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer scrape-me')
+        self.assertEqual(response.status_code, 200)
+        return response.content.decode()
+
+    def test_records_view_action_and_sql(self):
+        self.client.force_authenticate(user=self.farmer)  # anonymous repeats are served from the cache
+        self.client.get(reverse('product-list'))
+        self.client.get(reverse('product-list'))
+        body = self.scrape()
+        self.assertIn('harvestplace_requests_total{view="ProductViewSet.list",method="GET",status="200"} 2', body)
+        self.assertIn('harvestplace_request_duration_seconds_count{view="ProductViewSet.list",method="GET"} 2', body)
+        # Queries were counted: neither request falls in the zero-query bucket
+        self.assertIn('harvestplace_request_sql_queries_bucket{view="ProductViewSet.list",method="GET",le="0"} 0', body)
+
+    def test_unresolved_paths_share_one_label(self):
+        self.client.get('/no/such/path/1')
+        self.client.get('/no/such/path/2')
+        self.assertIn('harvestplace_requests_total{view="unmatched",method="GET",status="404"} 2', self.scrape())
+
+    def test_server_timing_header(self):
+        response = self.client.get(reverse('product-list'))
+        self.assertRegex(response['Server-Timing'], r'^app;dur=[\d.]+, db;dur=[\d.]+;desc="\d+ queries"$')
+
+    def test_slow_queries_are_logged_with_call_site(self):
+        with override_settings(METRICS={**METRICS, 'SLOW_QUERY_MS': 0.0001}):
+            with self.assertLogs('harvestplace.metrics', level='WARNING') as logs:
+                self.client.get(reverse('product-list'))
+        self.assertIn('Slow query', logs.output[0])
+        self.assertRegex(logs.output[0], r' at [\w/]+\.py:\d+ in \w+')
+        self.assertIn('harvestplace_slow_queries_total{view="ProductViewSet.list"}', self.scrape())
+
+    def test_endpoint_requires_token(self):
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
@@ -0,0 +1,70 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from market.models import Category, Product
+
+User = get_user_model()
+
+
+class KeysetPaginationTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        farmer = User.objects.create_user(username="farmer1", password="pass1234", role="farmer")
+        category = Category.objects.create(name="Grains")
+        now = timezone.now()
+        self.products = []
+        for i in range(7):
+            product = Product.objects.create(
+                farmer=farmer, name=f"Maize {i}", price=100 + (i % 3) * 10,
+                stock=5, location="Kaduna", category=category
+            )
+            # Pairs share a timestamp so the id tiebreaker is exercised
+            Product.objects.filter(pk=product.pk).update(created_at=now - timedelta(minutes=i // 2))
+            self.products.append(product)
+        self.url = reverse('product-list')
+
+    def walk(self, **params):
+        ids, url, params = [], self.url, {'pagination': 'cursor', 'page_size': 3, **params}
+        while url:
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn('count', response.data)
+            ids += [row['id'] for row in response.data['results']]
+            url, params = response.data['next'], None
+        return ids
+
+    def test_walks_newest_first_without_gaps(self):
+        expected = list(Product.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+        self.assertEqual(self.walk(), expected)
+
+    def test_walks_by_price(self):
+        expected = list(Product.objects.order_by('price', 'id').values_list('id', flat=True))
+        self.assertEqual(self.walk(ordering='price'), expected)
+
+    def test_previous_link_returns_prior_page(self):
+        first = self.client.get(self.url, {'pagination': 'cursor', 'page_size': 3}).data
+        self.assertIsNone(first['previous'])
+        second = self.client.get(first['next']).data
+        back = self.client.get(second['previous']).data
+        self.assertEqual([r['id'] for r in back['results']], [r['id'] for r in first['results']])
+
+    def test_page_number_mode_is_default(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.data['count'], 7)
+
+    def test_ranked_search_needs_an_ordering(self):
+        response = self.client.get(self.url, {'search': 'maize', 'pagination': 'cursor'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('pagination', response.data)
+        # Page numbers keep the ranking; an explicit ordering is keyset-safe
+        self.assertEqual(self.client.get(self.url, {'search': 'maize'}).status_code, 200)
+        self.assertEqual(len(self.walk(search='maize', ordering='price')), 7)
+
+    def test_invalid_cursor(self):
+        response = self.client.get(self.url, {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 404)
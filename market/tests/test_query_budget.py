@@ -0,0 +1,68 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from market.models import Category, Product
+
+User = get_user_model()
+
+# Max SQL queries per endpoint, independent of how many products are returned.
+# Raise a budget only together with the change that justifies it.
+# The ETag aggregate (harvestplace/conditional.py) is one of the queries on
+# list/detail endpoints; a matching If-None-Match stops after it.
+QUERY_BUDGETS = {
+    'product-list': 2,           # ETag aggregate (its COUNT feeds the paginator) + page
+    'product-list-cursor': 2,    # ETag aggregate + keyset page, no COUNT
+    'product-detail': 2,         # ETag aggregate + row
+    'product-my-products': 1,
+    'product-by-slug': 1,
+    'category-list': 3,          # ETag aggregate + COUNT + page
+}
+
+
+class ProductQueryBudgetTest(APITestCase):
+    def setUp(self):
+        self.farmer = User.objects.create_user(username="farmer1", password="pass1234", role="farmer")
+        others = [
+            User.objects.create_user(username=f"farmer{i}", password="pass1234", role="farmer") for i in (2, 3)
+        ]
+        categories = [Category.objects.create(name=name) for name in ("Fruits", "Grains", "Tubers")]
+        for i in range(9):
+            Product.objects.create(
+                farmer=[self.farmer, *others][i // 3], name="Fresh Produce", price=100 + i, stock=5,
+                location="Oyo", category=categories[i % 3]
+            )
+        self.product = Product.objects.first()
+        # Skip authentication and response-cache lookups so only view queries count
+        self.client.force_authenticate(user=self.farmer)
+        cache.clear()
+
+    def assertWithinBudget(self, name, url, params=None):
+        with self.assertNumQueries(QUERY_BUDGETS[name]):
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_product_list(self):
+        response = self.assertWithinBudget('product-list', reverse('product-list'))
+        self.assertEqual(len(response.data['results']), 9)
+        self.assertEqual(set(response.data['results'][0]['category']), {'name', 'slug'})
+
+    def test_product_list_cursor(self):
+        self.assertWithinBudget('product-list-cursor', reverse('product-list'), {'pagination': 'cursor'})
+
+    def test_product_detail(self):
+        self.assertWithinBudget('product-detail', reverse('product-detail', kwargs={'pk': self.product.pk}))
+
+    def test_my_products(self):
+        response = self.assertWithinBudget('product-my-products', reverse('my-products'))
+        self.assertEqual(len(response.data), 3)
+
+    def test_by_slug(self):
+        url = reverse('product-by-slug', kwargs={'slug': 'fresh-produce'})
+        response = self.assertWithinBudget('product-by-slug', url)
+        self.assertEqual(len(response.data), 3)
+
+    def test_category_list(self):
+        self.assertWithinBudget('category-list', reverse('category-list'))
@@ -0,0 +1,130 @@
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connections, transaction
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+
+from harvestplace.db.router import (
+    PIN_COOKIE, PrimaryReplicaRouter, ReplicaRoutingMiddleware, copy_database, use_primary,
+)
+from market import cache as market_cache
+from market.models import Category, Product
+from market.views import CategoryViewSet
+from orders.models import Order
+
+ROUTING = {'REPLICAS': ['replica1', 'replica2'], 'STICKY_SECONDS': 60}
+
+
+@override_settings(DATABASE_ROUTING=ROUTING)
+class ReplicaRoutingTest(TransactionTestCase):
+    # Not TestCase: its per-test transaction would keep every read on the primary
+    def setUp(self):
+        cache.clear()
+        self.router = PrimaryReplicaRouter()
+        self.factory = RequestFactory()
+        self.seen = []
+
+    def request(self, method='get', status=200, token='abc', cookies=None, view=None):
+        def get_response(request):
+            (view or self.record)()
+            return HttpResponse(status=status)
+        request = getattr(self.factory, method)('/api/market/products/', HTTP_AUTHORIZATION=f'Token {token}')
+        request.COOKIES.update(cookies or {})
+        return ReplicaRoutingMiddleware(get_response)(request)
+
+    def record(self):
+        self.seen.append(self.router.db_for_read(Product))
+
+    def test_safe_requests_read_from_a_replica(self):
+        self.request()
+        self.assertIn(self.seen[0], ROUTING['REPLICAS'])
+        # outside a request: commands and workers use the primary
+        self.assertEqual(self.router.db_for_read(Product), 'default')
+        self.assertEqual(self.router.db_for_write(Product), 'default')
+
+    def test_primary_for_transactions_and_primary_apps(self):
+        def view():
+            self.seen.append(self.router.db_for_read(Token))
+            with transaction.atomic():
+                self.seen.append(self.router.db_for_read(Order))
+            with use_primary():
+                self.seen.append(self.router.db_for_read(Product))
+            self.seen.append(self.router.db_for_read(Order))
+        self.request(view=view)
+        self.assertEqual(self.seen[:3], ['default'] * 3)
+        self.assertIn(self.seen[3], ROUTING['REPLICAS'])
+
+    def test_read_your_writes(self):
+        response = self.request('post', status=201)
+        self.assertEqual(self.seen, ['default'])
+        self.assertIn(PIN_COOKIE, response.cookies)
+
+        self.request()  # same client, inside the window
+        self.request(token='someone-else')
+        self.request(token=None, cookies={PIN_COOKIE: '1'})
+        self.assertEqual(self.seen[1], 'default')
+        self.assertIn(self.seen[2], ROUTING['REPLICAS'])
+        self.assertEqual(self.seen[3], 'default')
+
+    def test_window_expires_and_failed_writes_do_not_pin(self):
+        with self.settings(DATABASE_ROUTING={**ROUTING, 'STICKY_SECONDS': 0.05}):
+            self.request('post', status=201)
+            time.sleep(0.1)
+            self.request()
+        response = self.request('post', status=400, token='rejected')
+        self.request(token='rejected')
+        self.assertIn(self.seen[1], ROUTING['REPLICAS'])
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+        self.assertIn(self.seen[3], ROUTING['REPLICAS'])
+
+    def test_streamed_responses_keep_their_replica(self):
+        def stream():
+            yield self.router.db_for_read(Order)
+
+        request = self.factory.get('/api/orders//export/')
+        response = ReplicaRoutingMiddleware(lambda request: StreamingHttpResponse(stream()))(request)
+        self.assertIn(b''.join(response.streaming_content).decode(), ROUTING['REPLICAS'])
+
+    def test_cache_fills_after_a_catalog_write_use_the_primary(self):
+        def view():
+            with market_cache.fill_source():
+                self.seen.append(self.router.db_for_read(Product))
+            market_cache.bump('all')
+            with market_cache.fill_source():
+                self.seen.append(self.router.db_for_read(Product))
+        self.request(view=view)
+        self.assertIn(self.seen[0], ROUTING['REPLICAS'])
+        self.assertEqual(self.seen[1], 'default')
+
+    def test_category_fills_after_a_category_write_use_the_primary(self):
+        def view():
+            market_cache.invalidate_categories()
+            with CaptureQueriesContext(connections['default']) as primary:
+                market_cache.resolve_category('tubers')
+                CategoryViewSet.as_view({'get': 'tree'})(self.factory.get('/api/market/categories/tree/'))
+            self.seen.append(len(primary))
+        self.request(view=view)
+        self.assertEqual(self.seen, [2])
+
+
+class SyncReplicasTest(TransactionTestCase):
+    def test_copy_database(self):
+        Category.objects.create(name='Tubers')
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / 'replica.sqlite3'
+            copy_database(str(path))
+            with sqlite3.connect(path) as replica:
+                names = replica.execute('SELECT name FROM market_category').fetchall()
+        self.assertEqual(names, [('Tubers',)])
+
+    @override_settings(DATABASE_ROUTING={'REPLICAS': []})
+    def test_requires_replicas(self):
+        with self.assertRaises(CommandError):
+            call_command('sync_replicas')
@@ -0,0 +1,82 @@
+from rest_framework.test import APITestCase
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from market.models import Category, Product
+from market import search
+
+User = get_user_model()
+
+
+class ProductSearchTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.farmer = User.objects.create_user(username="farmer1", password="pass1234", role="farmer")
+        self.vegetables = Category.objects.create(name="Vegetables")
+        self.fruits = Category.objects.create(name="Fruits")
+        self.tomato = Product.objects.create(
+            farmer=self.farmer, name="Roma Tomatoes", description="Firm and red",
+            price=500, stock=10, location="Kano", category=self.vegetables, tags="organic,fresh"
+        )
+        self.mango = Product.objects.create(
+            farmer=self.farmer, name="Mango", description="Sweet mangoes, goes well with tomatoes",
+            price=300, stock=5, location="Benue", category=self.fruits
+        )
+        self.url = reverse('product-list')
+
+    def matched(self, term):
+        return list(Product.objects.filter(pk__in=search.matching(term)).values_list('pk', flat=True))
+
+    def search(self, term, **params):
+        response = self.client.get(self.url, {'search': term, **params})
+        self.assertEqual(response.status_code, 200)
+        return [row['id'] for row in response.data['results']]
+
+    def test_ranks_name_matches_first(self):
+        self.assertEqual(self.search('tomato'), [self.tomato.id, self.mango.id])
+
+    def test_matches_category_tags_and_location(self):
+        self.assertEqual(self.search('fruits'), [self.mango.id])
+        self.assertEqual(self.search('organic'), [self.tomato.id])
+        self.assertEqual(self.search('benue'), [self.mango.id])
+
+    def test_all_terms_must_match(self):
+        self.assertEqual(self.search('tomato kano'), [self.tomato.id])
+        self.assertEqual(self.search('tomato lagos'), [])
+
+    def test_explicit_ordering_overrides_rank(self):
+        self.assertEqual(self.search('tomato', ordering='price'), [self.mango.id, self.tomato.id])
+
+    def test_every_hit_is_counted_and_paged(self):
+        for i in range(3):
+            Product.objects.create(
+                farmer=self.farmer, name=f"Cherry Tomatoes {i}", price=200, stock=5,
+                location="Jos", category=self.vegetables
+            )
+        self.assertEqual(self.client.get(self.url, {'search': 'tomato'}).data['count'], 5)
+        ids, url, params = [], self.url, {'search': 'tomato', 'pagination': 'cursor', 'ordering': 'price', 'page_size': 2}
+        while url:
+            response = self.client.get(url, params)
+            ids += [row['id'] for row in response.data['results']]
+            url, params = response.data['next'], None
+        self.assertEqual(len(set(ids)), 5)
+        facets = self.client.get(reverse('product-facets'), {'search': 'tomato'})
+        self.assertEqual(facets.data['total'], 5)
+
+    def test_index_follows_updates_and_deletes(self):
+        self.tomato.name = "Plum Tomatoes"
+        self.tomato.save()
+        self.assertEqual(self.matched('plum'), [self.tomato.id])
+
+        self.vegetables.name = "Greens"
+        self.vegetables.save()
+        self.assertEqual(self.matched('greens'), [self.tomato.id])
+
+        self.tomato.delete()
+        self.assertEqual(self.matched('plum'), [])
+
+    def test_query_syntax_is_not_interpreted(self):
+        self.assertEqual(self.search('"tomato" OR NEAR(*'), [])
+
+    def test_query_without_terms_is_ignored(self):
+        self.assertEqual(set(self.search('%%%')), {self.tomato.id, self.mango.id})
@@ -0,0 +1,84 @@
+import sqlite3
+import tempfile
+import threading
+from io import StringIO
+from pathlib import Path
+
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.db import OperationalError, connection, connections
+from django.db.utils import load_backend
+from django.test import SimpleTestCase, TestCase
+
+
+class TunedBackendTest(TestCase):
+    def test_pragmas_and_transaction_mode(self):
+        self.assertEqual(connection.vendor, 'sqlite')
+        with connection.cursor() as cursor:
+            for pragma, expected in [('synchronous', 1), ('temp_store', 2), ('cache_size', -64000)]:
+                cursor.execute(f'PRAGMA {pragma}')
+                self.assertEqual(cursor.fetchone()[0], expected, pragma)
+        self.assertEqual(connection.transaction_mode, 'IMMEDIATE')
+
+
+class BeginRetryTest(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = Path(directory.name) / 'retry.sqlite3'
+        self.holder = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+        self.addCleanup(self.holder.close)
+        self.holder.execute('CREATE TABLE item (id INTEGER PRIMARY KEY)')
+
+    def wrapper(self, **options):
+        settings = connections.configure_settings({
+            'default': connections.settings['default'],
+            'retry': {'ENGINE': 'harvestplace.db', 'NAME': str(self.path), 'OPTIONS': {'timeout': 0.05, **options}},
+        })['retry']
+        wrapper = load_backend('harvestplace.db').DatabaseWrapper(settings, 'retry')
+        self.addCleanup(wrapper.close)
+        return wrapper
+
+    def insert(self, wrapper):
+        wrapper.set_autocommit(False, force_begin_transaction_with_broken_autocommit=True)
+        with wrapper.cursor() as cursor:
+            cursor.execute('INSERT INTO item DEFAULT VALUES')
+        wrapper.commit()
+        wrapper.set_autocommit(True)
+
+    def test_journal_mode_is_wal(self):
+        with self.wrapper().cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode')
+            self.assertEqual(cursor.fetchone()[0], 'wal')
+
+    def test_gives_up_after_bounded_retries(self):
+        wrapper = self.wrapper(begin_retries=1, begin_backoff=0.01)
+        wrapper.ensure_connection()
+        self.holder.execute('BEGIN IMMEDIATE')
+        self.addCleanup(self.holder.execute, 'ROLLBACK')
+        with self.assertRaisesMessage(OperationalError, 'locked'):
+            self.insert(wrapper)
+
+    def test_retries_until_the_lock_is_released(self):
+        wrapper = self.wrapper(begin_retries=5, begin_backoff=0.05)
+        wrapper.ensure_connection()
+        self.holder.execute('BEGIN IMMEDIATE')
+        release = threading.Timer(0.15, self.holder.execute, ['COMMIT'])
+        release.start()
+        self.addCleanup(release.join)
+        self.insert(wrapper)
+        self.assertEqual(self.holder.execute('SELECT COUNT(*) FROM item').fetchone()[0], 1)
+
+    def test_rejects_unsafe_pragmas(self):
+        with self.assertRaises(ImproperlyConfigured):
+            self.wrapper(pragmas={'journal_mode': 'WAL; DROP TABLE item'}).ensure_connection()
+
+
+class BenchmarkCommandTest(SimpleTestCase):
+    def test_runs_both_configs(self):
+        out = StringIO()
+        call_command('benchmark_sqlite', writers=1, readers=1, duration=0.5, stdout=out)
+        output = out.getvalue()
+        for line in ('stock   write', 'tuned   write', 'tuned   read'):
+            self.assertIn(line, output)
+        self.assertIn('the stock throughput', output)
@@ -0,0 +1,69 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from market.models import Category, Product, Tag
+
+User = get_user_model()
+
+
+class ProductTagFilterTest(APITestCase):
+    def setUp(self):
+        farmer = User.objects.create_user(username="farmer1", password="pass1234", role="farmer")
+        category = Category.objects.create(name="Vegetables")
+
+        def make(name, tags):
+            return Product.objects.create(
+                farmer=farmer, name=name, price=100, stock=5, location="Ogun", category=category, tags=tags
+            )
+
+        self.okra = make("Okra", "Organic, Fresh")
+        self.pepper = make("Pepper", "organic,dried")
+        self.onion = make("Onion", "")
+        self.url = reverse('product-list')
+
+    def filtered(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return {row['id'] for row in response.data['results']}
+
+    def test_tags_are_normalized(self):
+        self.assertEqual(Tag.objects.count(), 3)
+        self.assertEqual(set(self.okra.tag_set.values_list('slug', flat=True)), {'organic', 'fresh'})
+
+    def test_any_semantics_by_default(self):
+        self.assertEqual(self.filtered(tags='fresh,dried'), {self.okra.id, self.pepper.id})
+        self.assertEqual(self.filtered(tags='Organic'), {self.okra.id, self.pepper.id})
+
+    def test_all_semantics(self):
+        self.assertEqual(self.filtered(tags='organic,fresh', tags_match='all'), {self.okra.id})
+        self.assertEqual(self.filtered(tags='fresh,dried', tags_match='all'), set())
+
+    def test_retagging_replaces_links(self):
+        self.okra.tags = "dried"
+        self.okra.save()
+        self.assertEqual(self.filtered(tags='fresh'), set())
+        self.assertEqual(self.filtered(tags='dried'), {self.okra.id, self.pepper.id})
+
+        self.okra.tags = ""
+        self.okra.save()
+        self.assertFalse(self.okra.tag_set.exists())
+
+    def tag_queries(self, product):
+        with CaptureQueriesContext(connection) as queries:
+            product.save()
+        return [q['sql'] for q in queries if 'market_tag' in q['sql'] or 'market_producttag' in q['sql']]
+
+    def test_saves_that_keep_the_tags_skip_the_resync(self):
+        okra = Product.objects.get(pk=self.okra.pk)
+        okra.stock = 9
+        self.assertEqual(self.tag_queries(okra), [])
+
+        okra.tags = "fresh, organic "
+        self.assertEqual(self.tag_queries(okra), [])
+
+        okra.tags = "organic"
+        self.assertTrue(self.tag_queries(okra))
+        self.assertEqual(set(okra.tag_set.values_list('slug', flat=True)), {'organic'})
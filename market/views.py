@@ -3,15 +3,25 @@ from django.shortcuts import render
 # Create your views here.
 from rest_framework import viewsets, permissions, filters, status, generics
 from django_filters.rest_framework import DjangoFilterBackend
+from django.db.models import Q
 from .models import Product, Category
-from .serializers import ProductSerializer, CategorySerializer
+from .serializers import ProductSerializer, ProductListSerializer, CategorySerializer, build_category_tree
 from rest_framework.exceptions import PermissionDenied
 from .permissions import IsFarmerOwner, IsFarmerOrReadOnly, IsFarmerOwner, IsFarmerUser
+from .filters import ProductSearchFilter, ProductFilter
+from harvestplace.pagination import PageOrCursorPagination
+from .cache import CachedReadMixin, fill_source, get_versions
+from .facets import facet_counts
+from django.core.cache import cache
+from harvestplace.conditional import ConditionalGetMixin
+from django.db.models import Max
 from rest_framework.response import Response
 from rest_framework.decorators import action
+from rest_framework.parsers import MultiPartParser
+from .importers import ProductImporter, detect_format, iter_rows
 
 
-class CategoryViewSet(viewsets.ModelViewSet):
+class CategoryViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     """
     Handles CRUD for Categories.
     - Anyone can list/retrieve categories
@@ -21,62 +31,141 @@ class CategoryViewSet(viewsets.ModelViewSet):
     serializer_class = CategorySerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
 
+    @action(detail=False, methods=['get'], url_path='tree')
+    def tree(self, request):
+        """
+        The whole category hierarchy as nested nodes, built from one query
+        ordered by materialized path and cached until any category changes.
+        URL: /api/market/categories/tree/
+        """
+        key = f"market:category-tree:{get_versions('categories')[0]}"
+        data = cache.get(key)
+        if data is None:
+            with fill_source():
+                data = build_category_tree(Category.objects.order_by('path').values('id', 'name', 'slug', 'parent_id'))
+            cache.set(key, data, timeout=None)
+        return Response(data)
+
 
-class ProductViewSet(viewsets.ModelViewSet):
+class ProductViewSet(CachedReadMixin, ConditionalGetMixin, viewsets.ModelViewSet):
     serializer_class = ProductSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly, IsFarmerOrReadOnly]
+    pagination_class = PageOrCursorPagination  # ?pagination=cursor for keyset pages
 
     # 🔍 Add search, filtering, ordering
-    filter_backends = [filters.SearchFilter, DjangoFilterBackend, filters.OrderingFilter]
+    filter_backends = [ProductSearchFilter, DjangoFilterBackend, filters.OrderingFilter]
 
-    # Fields allowed for search (partial match)
-    search_fields = ["name", "category", "location"]
+    # Full-text search (ranked) — these fields are only used as the LIKE fallback
+    # on databases without a full-text index, see market/search.py
+    search_fields = ["name", "description", "tags", "category__name", "location"]
 
-    # Fields allowed for exact filtering
-    filterset_fields = ["category", "location"]
+    # Exact filtering: location, tags (?tags=a,b&tags_match=any|all);
+    # category/owner are handled in get_queryset
+    filterset_class = ProductFilter
 
     # Allow ordering
     ordering_fields = ["price", "created_at"]
 
+    # Actions rendered with the lightweight ProductListSerializer
+    list_actions = ['list', 'my_products', 'by_slug']
+
     def get_permissions(self):
         """
         - List/Retrieve → Anyone
         - Create → Authenticated farmers
         - Update/Delete → Owner farmer
-        - my-products → Authenticated farmers only
+        - my-products, import → Authenticated farmers only
         """
         if self.action in ['create']:
             return [permissions.IsAuthenticated(), IsFarmerUser()]
         elif self.action in ['update', 'partial_update', 'destroy']:
             return [permissions.IsAuthenticated(), IsFarmerOwner()]
-        elif self.action == 'my_products':
+        elif self.action in ['my_products', 'bulk_import']:
             return [permissions.IsAuthenticated(), IsFarmerUser()]
         return [permissions.AllowAny()]
 
     def get_queryset(self):
         """
         Default: Return all active products for list and retrieve.
+        Category is joined up front — every representation embeds it.
         """
-        queryset = Product.objects.filter(is_active=True)
+        queryset = Product.objects.filter(is_active=True).select_related('category')
 
-        # Optional filtering
+        # Optional filtering — category by id, slug or name (as CategoryField accepts)
         category = self.request.query_params.get('category')
         if category:
-            queryset = queryset.filter(category__iexact=category)
+            lookup = Q(category__slug=category) | Q(category__name__iexact=category)
+            if category.isdigit():
+                lookup |= Q(category_id=category)
+            queryset = queryset.filter(lookup)
 
         owner = self.request.query_params.get('owner')
-        if owner:
-            queryset = queryset.filter(owner__id=owner)
+        if owner and owner.isdigit():
+            queryset = queryset.filter(farmer_id=owner)
 
         return queryset
 
+    def get_conditional_aggregates(self):
+        # Category name/slug are embedded in every product representation
+        aggregates = super().get_conditional_aggregates()
+        aggregates['last_modified_category'] = Max('category__updated_at')
+        return aggregates
+
+    def get_serializer_class(self):
+        # Read-only list payloads skip ProductSerializer's write-side machinery
+        if self.action in self.list_actions:
+            return ProductListSerializer
+        return ProductSerializer
+
+    @action(detail=False, methods=['get'], url_path='facets')
+    def facets(self, request):
+        """
+        Category, location and price-bucket counts for the current
+        search/filter, e.g. /api/market/products/facets/?search=tomato
+        Cached by filter signature; product writes bump the cache version.
+        """
+        key = self.get_response_cache_key(request)
+        data = cache.get(key)
+        if data is None:
+            with fill_source():
+                data = facet_counts(self.filter_queryset(self.get_queryset()))
+            cache.set(key, data, timeout=self.response_cache_timeout)
+        return Response(data)
+
+    @action(detail=False, methods=['post'], url_path='import', parser_classes=[MultiPartParser])
+    def bulk_import(self, request):
+        """
+        Bulk-create the farmer's products from a CSV or NDJSON upload.
+        - multipart `file` field, or the raw body with Content-Type text/csv / application/x-ndjson
+        - CSV header / JSON keys: name, category, price, stock, location, and optionally
+          description, harvest_date, unit, tags
+        Returns a per-row error report; invalid rows never abort the import.
+        URL: /api/market/products/import/
+        """
+        upload = None
+        if request.content_type.startswith('multipart/'):
+            upload = request.FILES.get('file')
+            if upload is None:
+                return Response({"detail": "Upload a CSV or NDJSON file in the 'file' field."}, status=status.HTTP_400_BAD_REQUEST)
+            fmt = detect_format(upload.content_type, upload.name)
+            lines = upload
+        else:
+            fmt = detect_format(request.content_type)
+            lines = request.stream or []
+
+        if fmt is None:
+            return Response({"detail": "Unsupported format; send CSV or NDJSON."}, status=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE)
+
+        report = ProductImporter(request.user).run(iter_rows(lines, fmt))
+        return Response(report, status=status.HTTP_201_CREATED if report['created'] else status.HTTP_400_BAD_REQUEST)
+
     @action(detail=False, methods=['get'], url_path='my-products')
     def my_products(self, request):
         """
         Custom endpoint for farmers to view only their products.
         URL: /api/market/my-products/
         """
-        products = Product.objects.filter(farmer=request.user, is_active=True)
+        products = Product.objects.filter(farmer=request.user, is_active=True).select_related('category')
         serializer = self.get_serializer(products, many=True)
         return Response(serializer.data)
 
@@ -85,8 +174,8 @@ class ProductViewSet(viewsets.ModelViewSet):
         """
         Return all products that share the same slug (case-insensitive).
         """
-        products = Product.objects.filter(slug__iexact=slug, is_active=True)
-        if not products.exists():
+        products = list(Product.objects.filter(slug__iexact=slug, is_active=True).select_related('category'))
+        if not products:
             return Response({"detail": "No products found with this slug."}, status=status.HTTP_404_NOT_FOUND)
         serializer = self.get_serializer(products, many=True)
         return Response(serializer.data)
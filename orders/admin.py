@@ -2,19 +2,28 @@ from django.contrib import admin
 
 # Register your models here.
 from django.contrib import admin
-from .models import Order, OrderItem
+from .models import Order, OrderItem, OrderStatusTransition
 
 class OrderItemInline(admin.TabularInline):
     model = OrderItem
     extra = 0
 
+class OrderStatusTransitionInline(admin.TabularInline):
+    model = OrderStatusTransition
+    extra = 0
+    can_delete = False
+    readonly_fields = ('from_status', 'to_status', 'actor', 'created_at')
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
 @admin.register(Order)
 class OrderAdmin(admin.ModelAdmin):
     list_display = ('id', 'buyer', 'status', 'created_at', 'updated_at')
     list_filter = ('status', 'created_at')
     search_fields = ('buyer__username',)
-    readonly_fields = ('created_at', 'updated_at')
-    inlines = [OrderItemInline]
+    readonly_fields = ('created_at', 'updated_at', 'processing_at', 'shipped_at', 'delivered_at', 'canceled_at')
+    inlines = [OrderItemInline, OrderStatusTransitionInline]
 
 @admin.register(OrderItem)
 class OrderItemAdmin(admin.ModelAdmin):
@@ -0,0 +1,20 @@
+import django_filters
+
+from harvestplace.exports import MonthFilter
+from .models import Order
+
+
+class OrderFilter(django_filters.FilterSet):
+    """
+    Filters for order exports.
+    - `?since=` / `?until=` — created_at range (ISO 8601, inclusive)
+    - `?month=2025-01` — one calendar month
+    - `?status=delivered`
+    """
+    since = django_filters.IsoDateTimeFilter(field_name='created_at', lookup_expr='gte')
+    until = django_filters.IsoDateTimeFilter(field_name='created_at', lookup_expr='lte')
+    month = MonthFilter(field_name='created_at')
+
+    class Meta:
+        model = Order
+        fields = ['since', 'until', 'month', 'status']
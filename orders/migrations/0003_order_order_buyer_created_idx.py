@@ -0,0 +1,19 @@
+# Generated by Django 5.2.5 on 2026-10-18 14:41
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0002_order_total_amount_alter_order_status'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['buyer', 'created_at', 'id'], name='order_buyer_created_idx'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.5 on 2026-10-18 16:05
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_farmers(apps, schema_editor):
+    OrderItem = apps.get_model('orders', 'OrderItem')
+    Product = apps.get_model('market', 'Product')
+    OrderItem.objects.filter(farmer__isnull=True).update(
+        farmer_id=Subquery(Product.objects.filter(pk=OuterRef('product_id')).values('farmer_id')[:1])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('market', '0011_category_path'),
+        ('orders', '0003_order_order_buyer_created_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='orderitem',
+            name='farmer',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='sold_items', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.RunPython(backfill_farmers, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='orderitem',
+            name='farmer',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sold_items', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='orderitem',
+            index=models.Index(fields=['farmer', 'order'], name='orderitem_farmer_order_idx'),
+        ),
+    ]
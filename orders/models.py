@@ -3,6 +3,7 @@ from django.db import models
 # Create your models here.
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
 from market.models import Product
 
 class Order(models.Model):
@@ -13,22 +14,81 @@ class Order(models.Model):
         ('delivered', 'Delivered'),
         ('canceled', 'Canceled'),
     ]
+    # Allowed moves; delivered and canceled are final
+    TRANSITIONS = {
+        'pending': ('processing', 'canceled'),
+        'processing': ('shipped', 'canceled'),
+        'shipped': ('delivered',),
+        'delivered': (),
+        'canceled': (),
+    }
 
     buyer = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="orders")
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="pending")
     total_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Set when the order enters the state (see TRANSITIONS)
+    processing_at = models.DateTimeField(null=True, blank=True)
+    shipped_at = models.DateTimeField(null=True, blank=True)
+    delivered_at = models.DateTimeField(null=True, blank=True)
+    canceled_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Keyset pagination of a buyer's orders
+            models.Index(fields=['buyer', 'created_at', 'id'], name='order_buyer_created_idx'),
+        ]
+
+    def can_transition(self, status):
+        return status in self.TRANSITIONS.get(self.status, ())
+
+    @staticmethod
+    def timestamp_field(status):
+        return f"{status}_at" if status != 'pending' else None
 
     def __str__(self):
         return f"Order {self.id} by {self.buyer}"
 
 
+class OrderStatusTransition(models.Model):
+    """
+    History of status changes; written only by orders.services.transition_orders.
+    """
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name="transitions")
+    from_status = models.CharField(max_length=20, choices=Order.STATUS_CHOICES)
+    to_status = models.CharField(max_length=20, choices=Order.STATUS_CHOICES)
+    actor = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name="+")
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ['created_at', 'id']
+        indexes = [
+            models.Index(fields=['order', 'created_at'], name='order_transition_order_idx'),
+        ]
+
+    def __str__(self):
+        return f"Order {self.order_id}: {self.from_status} -> {self.to_status}"
+
+
 class OrderItem(models.Model):
     order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name="items")
     product = models.ForeignKey(Product, on_delete=models.CASCADE)
+    # Copy of product.farmer, so a farmer's lines are found without joining products
+    farmer = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="sold_items")
     quantity = models.PositiveIntegerField()
     price = models.DecimalField(max_digits=10, decimal_places=2)
 
+    class Meta:
+        indexes = [
+            # Farmer inbox: a farmer's lines, by order
+            models.Index(fields=['farmer', 'order'], name='orderitem_farmer_order_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        if self.farmer_id is None:
+            self.farmer_id = self.product.farmer_id
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return f"{self.product.name} x {self.quantity}"
\ No newline at end of file
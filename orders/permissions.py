@@ -4,13 +4,20 @@ class IsBuyerOrFarmerForOrder(BasePermission):
     """
     Allow buyer to update/cancel their order.
     Allow farmer to update the status if they own any product in the order.
+    Costs no query when the order carries the `is_seller` annotation
+    (OrderViewSet.get_queryset) or has its items prefetched.
     """
 
     def has_object_permission(self, request, view, obj):
         user = request.user
-        if user == obj.buyer:
+        if obj.buyer_id == user.pk or user.is_staff or user.is_superuser:
             return True
-        # If farmer owns any product in the order items
-        if user.role == "farmer" and obj.items.filter(product__farmer=user).exists():
-            return True
-        return False
+        if user.role != "farmer":
+            return False
+        is_seller = getattr(obj, "is_seller", None)
+        if is_seller is not None:
+            return is_seller
+        prefetched = getattr(obj, "_prefetched_objects_cache", {}).get("items")
+        if prefetched is not None:
+            return any(item.farmer_id == user.pk for item in prefetched)
+        return obj.items.filter(farmer=user).exists()
@@ -1,16 +1,32 @@
+from decimal import Decimal
 from rest_framework import serializers
 from .models import Order, OrderItem
-from wallet.models import Wallet
-from django.db import transaction
+from .services import place_order, transition_orders
+from market.models import Product
+
+class ProductIdField(serializers.PrimaryKeyRelatedField):
+    """
+    Accepts a product id without looking it up; OrderSerializer.validate
+    loads every product of the order in one query.
+    """
+    def to_internal_value(self, data):
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            return int(data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+
 
 class OrderItemSerializer(serializers.ModelSerializer):
+    product = ProductIdField(queryset=Product.objects.all())
     product_name = serializers.ReadOnlyField(source="product.name")
     farmer_name = serializers.ReadOnlyField(source="product.farmer.username")
 
     class Meta:
         model = OrderItem
         fields = ["id", "product", "product_name", "farmer_name", "quantity", "price"]
-        extra_kwargs = {"price": {"read_only": True}}
+        extra_kwargs = {"price": {"read_only": True}, "quantity": {"min_value": 1}}
 
 
 class OrderSerializer(serializers.ModelSerializer):
@@ -21,73 +37,73 @@ class OrderSerializer(serializers.ModelSerializer):
         model = Order
         fields = [
             "id", "buyer", "buyer_name", "status", "total_amount",
-            "created_at", "updated_at", "items"
+            "created_at", "updated_at", "processing_at", "shipped_at", "delivered_at", "canceled_at", "items"
+        ]
+        read_only_fields = [
+            "buyer", "total_amount", "status", "created_at", "updated_at",
+            "processing_at", "shipped_at", "delivered_at", "canceled_at",
         ]
-        read_only_fields = ["buyer", "total_amount", "status", "created_at", "updated_at"]
 
     def validate(self, data):
         user = self.context["request"].user
+        if not data["items"]:
+            raise serializers.ValidationError("An order needs at least one item.")
+
+        product_ids = {item["product"] for item in data["items"]}
+        products = Product.objects.filter(is_active=True).in_bulk(product_ids)
+        missing = sorted(product_ids - products.keys())
+        if missing:
+            raise serializers.ValidationError(f"Invalid product(s): {', '.join(map(str, missing))}.")
+
         for item in data["items"]:
-            if item["product"].farmer == user:
+            item["product"] = products[item["product"]]
+            if item["product"].farmer_id == user.pk:
                 raise serializers.ValidationError("You cannot order your own product.")
+            # Early, unlocked check for a friendly error; place_order re-checks atomically
             if item["quantity"] > item["product"].stock:
                 raise serializers.ValidationError(f"Not enough stock for {item['product'].name}.")
         return data
 
-    @transaction.atomic
     def create(self, validated_data):
-        items_data = validated_data.pop("items")
-        user = self.context["request"].user
-        order = Order.objects.create(buyer=user, **validated_data)
+        return place_order(self.context["request"].user, validated_data["items"])
 
-        total = 0
-        for item_data in items_data:
-            product = item_data["product"]
-            quantity = item_data["quantity"]
-            price = product.price
 
-            # Reduce stock
-            product.stock -= quantity
-            product.save()
-
-            OrderItem.objects.create(order=order, product=product, quantity=quantity, price=price)
-            total += price * quantity
-
-        # Wallet logic
-        buyer_wallet, created = Wallet.objects.get_or_create(user=user)
-        if buyer_wallet.balance < total:
-            raise serializers.ValidationError("Insufficient wallet balance.")
-
-        buyer_wallet.debit(total, description=f"Purchase Order #{order.id}")
+class FarmerOrderSerializer(serializers.ModelSerializer):
+    """
+    An order as seen from a farmer's inbox: only that farmer's lines
+    (prefetched into `farmer_items`) and their subtotal.
+    """
+    items = OrderItemSerializer(source="farmer_items", many=True, read_only=True)
+    buyer_name = serializers.ReadOnlyField(source="buyer.username")
+    subtotal = serializers.SerializerMethodField()
 
-        # Credit sellers
-        for item_data in items_data:
-            product = item_data["product"]
-            seller_wallet = Wallet.objects.get(user=product.farmer)
-            seller_wallet.credit(item_data["quantity"] * product.price, description=f"Sale Order #{order.id}")
+    class Meta:
+        model = Order
+        fields = [
+            "id", "buyer", "buyer_name", "status", "subtotal", "created_at", "updated_at",
+            "processing_at", "shipped_at", "delivered_at", "canceled_at", "items",
+        ]
+        read_only_fields = fields
 
-        order.total_amount = total
-        order.save()
-        return order
+    def get_subtotal(self, obj):
+        return str(sum((item.price * item.quantity for item in obj.farmer_items), Decimal("0.00")))
 
 
 class OrderStatusUpdateSerializer(serializers.ModelSerializer):
+    """
+    Moves one order along Order.TRANSITIONS (see services.transition_orders).
+    """
+    status = serializers.ChoiceField(choices=Order.STATUS_CHOICES)
+
     class Meta:
         model = Order
         fields = ['status']
 
-    def validate_status(self, value):
-        allowed_statuses = ['pending', 'processing', 'shipped', 'delivered', 'canceled']
-        if value not in allowed_statuses:
-            raise serializers.ValidationError("Invalid status.")
-        return value
-
     def update(self, instance, validated_data):
-        new_status = validated_data.get('status', instance.status)
-        if instance.status != 'canceled' and new_status == 'canceled':
-            for item in instance.items.all():
-                item.product.stock += item.quantity
-                item.product.save()
-        instance.status = new_status
-        instance.save()
-        return instance
+        user = self.context['request'].user
+        return transition_orders(user, [instance.pk], validated_data['status'])[0]
+
+
+class BulkOrderStatusSerializer(serializers.Serializer):
+    orders = serializers.ListField(child=serializers.IntegerField(min_value=1), min_length=1, max_length=500)
+    status = serializers.ChoiceField(choices=Order.STATUS_CHOICES)
@@ -0,0 +1,284 @@
+"""
+Order placement and status transitions.
+
+Runs inside one transaction and takes locks in a fixed order — products by
+id, then the buyer's wallet — so concurrent checkouts queue instead of
+deadlocking. Stock is decremented with conditional UPDATEs (stock >= qty), so
+two checkouts can never oversell the same units even where row locks are not
+available (SQLite serializes writers instead).
+
+Farmers' wallets are not touched: their proceeds are appended as
+PendingSettlement rows and credited in batches by wallet.settlement.
+
+Cancellation (transition_orders → compensate_cancellation) takes the same
+lock order — products by id, then wallets by user id — and undoes stock and
+money with set-wise, relative updates.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Case, DecimalField, Exists, F, IntegerField, OuterRef, Prefetch, Sum, Value, When
+from django.db.models import prefetch_related_objects
+from django.utils import timezone
+from rest_framework import serializers, status
+from rest_framework.exceptions import APIException
+
+from market import cache as market_cache
+from market.models import Product
+from wallet.models import PendingSettlement, Wallet
+from .models import Order, OrderItem, OrderStatusTransition
+
+
+def merge_lines(lines):
+    """
+    Collapse repeated products into one line: {product_id: quantity}.
+    """
+    quantities = defaultdict(int)
+    for line in lines:
+        quantities[line['product'].pk] += line['quantity']
+    return dict(sorted(quantities.items()))
+
+
+def lock_wallets(user_ids):
+    """
+    Lock (creating if missing) the wallets of `user_ids`, in user id order.
+    """
+    user_ids = sorted(set(user_ids))
+    wallets = {w.user_id: w for w in Wallet.objects.select_for_update().filter(user_id__in=user_ids).order_by('user_id')}
+    for user_id in user_ids:
+        if user_id not in wallets:
+            wallets[user_id], _ = Wallet.objects.get_or_create(user_id=user_id)
+    return wallets
+
+
+@transaction.atomic
+def place_order(buyer, lines):
+    """
+    Create an order for `lines` (dicts with `product` and `quantity`).
+    Raises serializers.ValidationError — rolling everything back — when
+    stock or the buyer's balance is insufficient.
+    """
+    quantities = merge_lines(lines)
+    products = {
+        p.pk: p
+        for p in Product.objects.select_for_update(of=('self',))
+        .select_related('farmer')
+        .filter(pk__in=quantities)
+        .order_by('pk')
+    }
+    missing = quantities.keys() - products.keys()
+    if missing:
+        # Deleted between validation and the lock
+        raise serializers.ValidationError(
+            f"Product {', '.join(str(pk) for pk in sorted(missing))} is no longer available."
+        )
+
+    # Prices are read under the lock, not from the (possibly stale) validated data
+    proceeds = defaultdict(Decimal)
+    total = Decimal('0.00')
+    for product_id, quantity in quantities.items():
+        amount = products[product_id].price * quantity
+        proceeds[products[product_id].farmer_id] += amount
+        total += amount
+
+    buyer_wallet = lock_wallets([buyer.pk])[buyer.pk]
+    if buyer_wallet.balance < total:
+        raise serializers.ValidationError("Insufficient wallet balance.")
+
+    now = timezone.now()
+    for product_id, quantity in quantities.items():
+        updated = Product.objects.filter(pk=product_id, is_active=True, stock__gte=quantity).update(
+            stock=F('stock') - quantity, updated_at=now
+        )
+        if not updated:
+            raise serializers.ValidationError(f"Not enough stock for {products[product_id].name}.")
+
+    order = Order.objects.create(buyer=buyer, total_amount=total)
+    OrderItem.objects.bulk_create([
+        OrderItem(
+            order=order, product=products[product_id], farmer_id=products[product_id].farmer_id,
+            quantity=quantity, price=products[product_id].price,
+        )
+        for product_id, quantity in quantities.items()
+    ])
+
+    buyer_wallet.debit(total, description=f"Purchase Order #{order.id}")
+    # Insert-only: no farmer wallet row is locked during checkout
+    PendingSettlement.objects.bulk_create([
+        PendingSettlement(farmer_id=farmer_id, order=order, amount=amount, description=f"Sale Order #{order.id}")
+        for farmer_id, amount in proceeds.items()
+    ])
+
+    # Stock moved through update(), which skips Product signals
+    rows = [(p.pk, p.category_id, p.farmer_id) for p in products.values()]
+    transaction.on_commit(lambda: market_cache.invalidate_products(rows))
+
+    prefetch_related_objects([order], Prefetch('items', queryset=OrderItem.objects.select_related('product__farmer')))
+    return order
+
+
+# ---------------------------------------------------------------- transitions
+
+class OrderConflict(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "Orders changed while being updated; retry."
+
+
+def transition_error(user, order, to_status):
+    """
+    Why `user` may not move `order` to `to_status`, or None if allowed.
+    Expects the `is_seller` annotation from transition_orders.
+    - Buyers may cancel their pending orders
+    - Farmers selling in the order may make any allowed move
+    - Staff may make any allowed move
+    """
+    if order.status == to_status:
+        return f"Order is already {to_status}."
+    if not order.can_transition(to_status):
+        return f"Cannot move an order from {order.status} to {to_status}."
+    if user.is_staff or user.is_superuser or order.is_seller:
+        return None
+    if order.buyer_id == user.pk:
+        if to_status == "canceled" and order.status == "pending":
+            return None
+        return "Buyers can only cancel pending orders."
+    return "Order not found."
+
+
+def restore_stock(order_ids, now):
+    """
+    Put the stock of `order_ids` back in a single UPDATE. Increments are
+    relative (stock = stock + n), so concurrent checkouts are not overwritten.
+    Products are locked in id order first, as place_order does.
+    """
+    rows = list(
+        OrderItem.objects.filter(order_id__in=order_ids)
+        .values("product_id", "product__category_id", "product__farmer_id")
+        .annotate(quantity=Sum("quantity"))
+        .order_by("product_id")
+    )
+    if not rows:
+        return
+    product_ids = [row["product_id"] for row in rows]
+    list(Product.objects.select_for_update().filter(pk__in=product_ids).order_by("pk").values_list("pk", flat=True))
+    increment = Case(
+        *[When(pk=row["product_id"], then=Value(row["quantity"])) for row in rows],
+        default=Value(0),
+        output_field=IntegerField(),
+    )
+    Product.objects.filter(pk__in=product_ids).update(stock=F("stock") + increment, updated_at=now)
+    cache_rows = [(row["product_id"], row["product__category_id"], row["product__farmer_id"]) for row in rows]
+    transaction.on_commit(lambda: market_cache.invalidate_products(cache_rows))
+
+
+def void_proceeds(order_ids):
+    """
+    Take back what farmers were owed for `order_ids`: unsettled
+    PendingSettlement rows are deleted; whatever was already settled (or
+    credited directly, for orders placed before settlement existed) is
+    returned as {farmer_id: (amount, [order ids])} to debit.
+    """
+    owed = defaultdict(Decimal)
+    farmer_orders = defaultdict(list)
+    lines = (
+        OrderItem.objects.filter(order_id__in=order_ids)
+        .values("farmer_id", "order_id")
+        .annotate(total=Sum(F("price") * F("quantity"), output_field=DecimalField(max_digits=12, decimal_places=2)))
+        .order_by("farmer_id", "order_id")
+    )
+    for row in lines:
+        owed[row["farmer_id"]] += row["total"]
+        farmer_orders[row["farmer_id"]].append(row["order_id"])
+
+    # Locked so the settlement job cannot credit them while we void them
+    pending = list(
+        PendingSettlement.objects.select_for_update()
+        .filter(order_id__in=order_ids, settled_at__isnull=True)
+        .values_list("pk", "farmer_id", "amount")
+    )
+    if pending:
+        PendingSettlement.objects.filter(pk__in=[pk for pk, _, _ in pending]).delete()
+    for _, farmer_id, amount in pending:
+        owed[farmer_id] -= amount
+    return {farmer_id: (amount, farmer_orders[farmer_id]) for farmer_id, amount in owed.items() if amount > 0}
+
+
+def describe_orders(prefix, order_ids):
+    label = "Order" if len(order_ids) == 1 else "Orders"
+    return f"{prefix} {label} {', '.join(f'#{order_id}' for order_id in order_ids)}"[:255]
+
+
+def compensate_cancellation(orders, now):
+    """
+    Undo the money and stock movements of `orders`, set-wise:
+    - one relative stock UPDATE for every line
+    - one refund credit per buyer
+    - per farmer, one reversal debit of proceeds already settled
+    Wallets are locked once, in user id order, like place_order.
+    """
+    order_ids = [order.pk for order in orders]
+    restore_stock(order_ids, now)
+    reversals = void_proceeds(order_ids)
+
+    refunds = defaultdict(list)
+    for order in orders:
+        refunds[order.buyer_id].append(order)
+    wallets = lock_wallets([*refunds, *reversals])
+    for buyer_id, buyer_orders in refunds.items():
+        wallets[buyer_id].credit(
+            sum(order.total_amount for order in buyer_orders),
+            description=describe_orders("Refund for", [order.pk for order in buyer_orders]),
+        )
+    for farmer_id, (amount, farmer_order_ids) in reversals.items():
+        # The buyer's refund must not depend on whether the farmer has spent the money
+        wallets[farmer_id].debit(amount, description=describe_orders("Reversal for", farmer_order_ids), overdraft=True)
+
+
+@transaction.atomic
+def transition_orders(user, order_ids, to_status):
+    """
+    Move every order in `order_ids` to `to_status`, all or nothing.
+    Raises serializers.ValidationError with a per-order message when any
+    move is not allowed, and OrderConflict when an order changed
+    concurrently. Cancellations restore stock and refund buyers set-wise.
+    Returns the updated orders.
+    """
+    order_ids = sorted(set(order_ids))
+    orders = list(
+        Order.objects.select_for_update(of=("self",))
+        .annotate(is_seller=Exists(OrderItem.objects.filter(order=OuterRef("pk"), farmer_id=user.pk)))
+        .filter(pk__in=order_ids)
+        .order_by("pk")
+    )
+    found = {order.pk: order for order in orders}
+    errors = {}
+    for order_id in order_ids:
+        order = found.get(order_id)
+        error = transition_error(user, order, to_status) if order else "Order not found."
+        if error:
+            errors[str(order_id)] = error
+    if errors:
+        raise serializers.ValidationError({"orders": errors})
+
+    now = timezone.now()
+    by_status = defaultdict(list)
+    for order in orders:
+        by_status[order.status].append(order.pk)
+    changes = {"status": to_status, "updated_at": now, Order.timestamp_field(to_status): now}
+    for from_status, ids in by_status.items():
+        # Conditional on the status we validated against
+        if Order.objects.filter(pk__in=ids, status=from_status).update(**changes) != len(ids):
+            raise OrderConflict()
+
+    OrderStatusTransition.objects.bulk_create([
+        OrderStatusTransition(order=order, from_status=order.status, to_status=to_status, actor=user, created_at=now)
+        for order in orders
+    ])
+    if to_status == "canceled":
+        compensate_cancellation(orders, now)
+
+    for order in orders:
+        for field, value in changes.items():
+            setattr(order, field, value)
+    return orders
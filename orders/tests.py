@@ -1,12 +1,22 @@
-from django.test import TestCase
+import csv
+import json
+from io import StringIO
+
+from django.test import TestCase, override_settings
 
 # Create your tests here.
 from rest_framework.test import APITestCase
 from django.urls import reverse
 from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import ValidationError
 from market.models import Product, Category
-from .models import Order
+from wallet.models import PendingSettlement
+from wallet.settlement import settle
+from .models import Order, OrderItem
+from .services import place_order
 
 User = get_user_model()
 
@@ -29,3 +39,407 @@ class OrderTestCase(APITestCase):
         response = self.client.post(url, data, format='json')
         self.assertEqual(response.status_code, 201)
         self.assertEqual(Order.objects.count(), 1)
+
+
+class OrderKeysetPaginationTestCase(APITestCase):
+    def setUp(self):
+        self.retailer = User.objects.create_user(username='retailer1', password='pass1234', role='retailer')
+        other = User.objects.create_user(username='retailer2', password='pass1234', role='retailer')
+        self.orders = [Order.objects.create(buyer=self.retailer) for _ in range(5)]
+        Order.objects.create(buyer=other)
+        self.client.force_authenticate(user=self.retailer)
+
+    def test_cursor_pages_cover_only_own_orders(self):
+        url, params, ids = reverse('order-list'), {'pagination': 'cursor', 'page_size': 2}, []
+        while url:
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, 200)
+            ids += [row['id'] for row in response.data['results']]
+            url, params = response.data['next'], None
+        self.assertEqual(ids, sorted((o.id for o in self.orders), reverse=True))
+
+
+class OrderConditionalGetTestCase(APITestCase):
+    def setUp(self):
+        self.retailer = User.objects.create_user(username='retailer1', password='pass1234', role='retailer')
+        self.order = Order.objects.create(buyer=self.retailer)
+        self.client.force_authenticate(user=self.retailer)
+        self.url = reverse('order-detail', kwargs={'pk': self.order.pk})
+
+    def test_order_detail_revalidates(self):
+        etag = self.client.get(self.url)['ETag']
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        self.order.status = 'processing'
+        self.order.save()
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class OrderPlacementTestCase(APITestCase):
+    def setUp(self):
+        self.retailer = User.objects.create_user(username='retailer1', password='pass1234', role='retailer')
+        self.farmers = [
+            User.objects.create_user(username=f'farmer{i}', password='pass1234', role='farmer') for i in range(2)
+        ]
+        category = Category.objects.create(name='Fruits')
+        self.products = [
+            Product.objects.create(
+                farmer=self.farmers[i % 2], name=f'Fruit {i}', price=10, stock=5, location='Oyo', category=category
+            )
+            for i in range(6)
+        ]
+        self.retailer.wallet.credit(1000)
+        self.client.force_authenticate(user=self.retailer)
+
+    def place(self, lines):
+        payload = {"items": [{"product": p.id, "quantity": q} for p, q in lines]}
+        return self.client.post(reverse('order-list'), payload, format='json')
+
+    def test_multi_line_order_settles_stock_and_wallets(self):
+        p = self.products
+        response = self.place([(p[0], 2), (p[1], 1), (p[0], 1), (p[2], 4)])
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['total_amount'], '80.00')
+        self.assertEqual(len(response.data['items']), 3)  # repeated product lines are merged
+
+        p[0].refresh_from_db()
+        self.assertEqual(p[0].stock, 2)
+        self.retailer.wallet.refresh_from_db()
+        self.assertEqual(self.retailer.wallet.balance, 920)
+
+        farmer_wallet = self.farmers[0].wallet
+        farmer_wallet.refresh_from_db()
+        self.assertEqual(farmer_wallet.balance, 0)  # proceeds wait for settlement
+        self.assertEqual(farmer_wallet.pending_amount, 70)
+
+        settle()
+        farmer_wallet.refresh_from_db()
+        self.assertEqual(farmer_wallet.balance, 70)
+        self.assertEqual(farmer_wallet.pending_amount, 0)
+        self.assertEqual(farmer_wallet.transactions.count(), 1)  # one credit per farmer
+
+    def test_query_count_does_not_grow_with_lines(self):
+        def queries_for(lines):
+            with CaptureQueriesContext(connection) as ctx:
+                self.assertEqual(self.place(lines).status_code, 201)
+            return len(ctx.captured_queries)
+
+        two = queries_for([(self.products[0], 1), (self.products[1], 1)])
+        six = queries_for([(p, 1) for p in self.products])
+        # Only the per-product conditional stock UPDATE scales with distinct products
+        self.assertEqual(six - two, 4)
+
+    def test_insufficient_stock_rolls_back(self):
+        response = self.place([(self.products[0], 1), (self.products[1], 6)])
+        self.assertEqual(response.status_code, 400)
+        self.products[0].refresh_from_db()
+        self.assertEqual(self.products[0].stock, 5)
+        self.assertEqual(Order.objects.count(), 0)
+
+    def test_insufficient_balance_rolls_back(self):
+        for product in self.products:
+            Product.objects.filter(pk=product.pk).update(price=500)
+        response = self.place([(self.products[0], 3)])
+        self.assertEqual(response.status_code, 400)
+        self.products[0].refresh_from_db()
+        self.assertEqual(self.products[0].stock, 5)
+
+    def test_unknown_product(self):
+        response = self.client.post(reverse('order-list'), {"items": [{"product": 9999, "quantity": 1}]}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_product_deleted_after_validation(self):
+        product = self.products[1]
+        Product.objects.filter(pk=product.pk).delete()  # validated instance is now stale
+        with self.assertRaisesMessage(ValidationError, f"Product {product.pk} is no longer available."):
+            place_order(self.retailer, [{'product': self.products[0], 'quantity': 1}, {'product': product, 'quantity': 1}])
+        self.assertEqual(Order.objects.count(), 0)
+
+
+@override_settings(EXPORT_CHUNK_SIZE=2)
+class OrderExportTestCase(APITestCase):
+    def setUp(self):
+        self.retailer = User.objects.create_user(username='retailer1', password='pass1234', role='retailer')
+        self.farmers = [
+            User.objects.create_user(username=f'farmer{i}', password='pass1234', role='farmer') for i in range(2)
+        ]
+        category = Category.objects.create(name='Fruits')
+        products = [
+            Product.objects.create(farmer=farmer, name=f'Fruit {i}', price=10, stock=50, location='Oyo', category=category)
+            for i, farmer in enumerate(self.farmers)
+        ]
+        self.retailer.wallet.credit(1000)
+        for _ in range(5):
+            place_order(self.retailer, [{'product': p, 'quantity': 1} for p in products])
+        self.url = reverse('order-export')
+
+    def rows(self, response):
+        self.assertEqual(response.status_code, 200)
+        return list(csv.DictReader(StringIO(b''.join(response.streaming_content).decode())))
+
+    def test_buyer_export_prefetches_per_chunk(self):
+        self.client.force_authenticate(user=self.retailer)
+        response = self.client.get(self.url)
+        with self.assertNumQueries(6):  # 3 chunks of orders (+ buyer), each with one items query
+            rows = self.rows(response)
+        self.assertEqual(len(rows), 10)
+        self.assertEqual(rows[0]['line_total'], '10.00')
+        self.assertEqual(rows[0]['order_total'], '20.00')
+
+    def test_farmer_export_has_only_their_lines(self):
+        self.client.force_authenticate(user=self.farmers[0])
+        rows = self.rows(self.client.get(self.url, {'role': 'farmer', 'status': 'pending'}))
+        self.assertEqual(len(rows), 5)
+        self.assertEqual({row['farmer'] for row in rows}, {'farmer0'})
+        self.assertEqual(self.client.get(self.url, {'role': 'admin'}).status_code, 400)
+
+    def test_ndjson(self):
+        self.client.force_authenticate(user=self.retailer)
+        response = self.client.get(self.url, {'output': 'ndjson'}, HTTP_ACCEPT='application/x-ndjson')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 10)
+        self.assertEqual(json.loads(lines[0])['buyer'], 'retailer1')
+
+
+class FarmerInboxTestCase(APITestCase):
+    def setUp(self):
+        self.retailer = User.objects.create_user(username='retailer1', password='pass1234', role='retailer')
+        self.farmers = [
+            User.objects.create_user(username=f'farmer{i}', password='pass1234', role='farmer') for i in range(3)
+        ]
+        category = Category.objects.create(name='Fruits')
+        self.products = [
+            Product.objects.create(farmer=farmer, name=f'Fruit {i}', price=10, stock=50, location='Oyo', category=category)
+            for i, farmer in enumerate(self.farmers)
+        ]
+        self.retailer.wallet.credit(1000)
+        # Five orders with lines from farmer0 and farmer1; one with farmer2 only
+        self.orders = [
+            place_order(self.retailer, [{'product': self.products[0], 'quantity': 2}, {'product': self.products[1], 'quantity': 1}])
+            for _ in range(5)
+        ]
+        self.other = place_order(self.retailer, [{'product': self.products[2], 'quantity': 1}])
+        Order.objects.filter(pk=self.orders[0].pk).update(status='shipped')
+        self.url = reverse('order-inbox')
+
+    def test_inbox_lists_only_the_farmers_lines(self):
+        self.client.force_authenticate(user=self.farmers[0])
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 5)
+        first = response.data['results'][0]
+        self.assertEqual(first['id'], self.orders[-1].id)  # newest first
+        self.assertEqual([item['product'] for item in first['items']], [self.products[0].id])
+        self.assertEqual(first['subtotal'], '20.00')
+
+    def test_inbox_status_filter_and_pagination(self):
+        self.client.force_authenticate(user=self.farmers[0])
+        response = self.client.get(self.url, {'status': 'shipped'})
+        self.assertEqual([order['id'] for order in response.data['results']], [self.orders[0].id])
+
+        with self.assertNumQueries(2):  # one page of orders + their lines
+            response = self.client.get(self.url, {'pagination': 'cursor', 'page_size': 2})
+        self.assertEqual(len(response.data['results']), 2)
+        self.assertIsNotNone(response.data['next'])
+
+    def test_inbox_is_for_farmers(self):
+        self.client.force_authenticate(user=self.retailer)
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+    def test_farmer_can_open_orders_with_their_products(self):
+        url = reverse('order-detail', args=[self.orders[1].id])
+        self.client.force_authenticate(user=self.retailer)
+        with CaptureQueriesContext(connection) as buyer_queries:
+            self.assertEqual(self.client.get(url).status_code, 200)
+
+        self.client.force_authenticate(user=self.farmers[1])
+        with CaptureQueriesContext(connection) as seller_queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        # The seller check rides on the order query (no extra query per object)
+        self.assertEqual(len(seller_queries), len(buyer_queries))
+        # ...and the seller sees only their own lines, not the buyer's total
+        self.assertEqual([item['product'] for item in response.data['items']], [self.products[1].id])
+        self.assertEqual(response.data['subtotal'], '10.00')
+        self.assertNotIn('total_amount', response.data)
+
+        self.client.force_authenticate(user=self.farmers[2])
+        self.assertEqual(self.client.get(url).status_code, 404)
+        self.assertEqual(self.client.delete(reverse('order-detail', args=[self.other.id])).status_code, 404)
+
+    def test_farmer_column_is_copied_from_product(self):
+        self.assertEqual(
+            set(OrderItem.objects.values_list('farmer_id', flat=True)),
+            {farmer.pk for farmer in self.farmers},
+        )
+
+
+class OrderStatusTransitionTestCase(APITestCase):
+    def setUp(self):
+        self.retailer = User.objects.create_user(username='retailer1', password='pass1234', role='retailer')
+        self.farmers = [
+            User.objects.create_user(username=f'farmer{i}', password='pass1234', role='farmer') for i in range(2)
+        ]
+        category = Category.objects.create(name='Fruits')
+        self.products = [
+            Product.objects.create(farmer=farmer, name=f'Fruit {i}', price=10, stock=50, location='Oyo', category=category)
+            for i, farmer in enumerate(self.farmers)
+        ]
+        self.retailer.wallet.credit(1000)
+        self.orders = [
+            place_order(self.retailer, [{'product': self.products[0], 'quantity': 2}, {'product': self.products[1], 'quantity': 1}])
+            for _ in range(6)
+        ]
+        self.bulk_url = reverse('order-status-bulk')
+
+    def move(self, order, status):
+        return self.client.patch(reverse('order-status-update', args=[order.id]), {'status': status}, format='json')
+
+    def test_farmer_walks_the_happy_path(self):
+        self.client.force_authenticate(user=self.farmers[0])
+        order = self.orders[0]
+        for status in ('processing', 'shipped', 'delivered'):
+            response = self.move(order, status)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.data['status'], status)
+            self.assertIsNotNone(response.data[f'{status}_at'])
+        self.assertEqual(
+            list(order.transitions.values_list('from_status', 'to_status')),
+            [('pending', 'processing'), ('processing', 'shipped'), ('shipped', 'delivered')],
+        )
+        self.assertEqual(self.move(order, 'canceled').status_code, 400)  # delivered is final
+
+    def test_disallowed_moves(self):
+        self.client.force_authenticate(user=self.farmers[0])
+        self.assertEqual(self.move(self.orders[0], 'delivered').status_code, 400)
+        self.assertEqual(self.move(self.orders[0], 'bogus').status_code, 400)
+
+        self.client.force_authenticate(user=self.retailer)
+        self.assertEqual(self.move(self.orders[0], 'processing').status_code, 400)
+
+        stranger = User.objects.create_user(username='farmer9', password='pass1234', role='farmer')
+        self.client.force_authenticate(user=stranger)
+        self.assertEqual(self.move(self.orders[0], 'processing').status_code, 404)
+
+    def test_buyer_cancel_restores_stock_and_refunds(self):
+        self.client.force_authenticate(user=self.retailer)
+        self.assertEqual(self.move(self.orders[0], 'canceled').status_code, 200)
+        self.products[0].refresh_from_db()
+        self.assertEqual(self.products[0].stock, 50 - 2 * 5)
+        self.retailer.wallet.refresh_from_db()
+        self.assertEqual(self.retailer.wallet.balance, 1000 - 30 * 5)
+
+    def test_bulk_transition_is_one_transaction_with_constant_queries(self):
+        self.client.force_authenticate(user=self.farmers[0])
+
+        def queries_for(orders):
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.post(self.bulk_url, {'orders': [o.id for o in orders], 'status': 'processing'}, format='json')
+            self.assertEqual(response.status_code, 200, response.data)
+            return len(ctx.captured_queries)
+
+        self.assertEqual(queries_for(self.orders[:2]), queries_for(self.orders[2:]))
+        self.assertEqual(Order.objects.filter(status='processing').count(), 6)
+
+    def test_bulk_transition_is_all_or_nothing(self):
+        self.client.force_authenticate(user=self.farmers[0])
+        self.move(self.orders[0], 'processing')
+        self.move(self.orders[0], 'shipped')
+        response = self.client.post(self.bulk_url, {'orders': [o.id for o in self.orders[:3]], 'status': 'processing'}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(list(response.data['orders']), [str(self.orders[0].id)])
+        self.assertEqual(Order.objects.filter(status='processing').count(), 0)
+
+    def test_bulk_cancel_compensates_set_wise(self):
+        self.client.force_authenticate(user=self.farmers[1])
+        response = self.client.post(self.bulk_url, {'orders': [o.id for o in self.orders[:4]], 'status': 'canceled'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        for product, per_order in zip(self.products, (2, 1)):
+            product.refresh_from_db()
+            self.assertEqual(product.stock, 50 - per_order * 2)
+        refunds = self.retailer.wallet.transactions.filter(description__startswith='Refund')
+        self.assertEqual(refunds.count(), 1)  # one credit per buyer
+        self.assertEqual(refunds.get().amount, 120)
+
+
+class OrderCancellationTestCase(APITestCase):
+    def setUp(self):
+        self.retailer = User.objects.create_user(username='retailer1', password='pass1234', role='retailer')
+        self.other_buyer = User.objects.create_user(username='retailer2', password='pass1234', role='retailer')
+        self.farmers = [
+            User.objects.create_user(username=f'farmer{i}', password='pass1234', role='farmer') for i in range(2)
+        ]
+        category = Category.objects.create(name='Fruits')
+        self.products = [
+            Product.objects.create(farmer=self.farmers[i % 2], name=f'Fruit {i}', price=10, stock=20, location='Oyo', category=category)
+            for i in range(4)
+        ]
+        for buyer in (self.retailer, self.other_buyer):
+            buyer.wallet.credit(1000)
+        self.order = place_order(self.retailer, [{'product': p, 'quantity': 2} for p in self.products])
+        self.client.force_authenticate(user=self.retailer)
+
+    def cancel(self, order=None):
+        return self.client.post(reverse('order-cancel', args=[(order or self.order).id]))
+
+    def balance(self, user):
+        user.wallet.refresh_from_db()
+        return user.wallet.balance
+
+    def test_cancel_keeps_concurrent_stock_changes(self):
+        # Another checkout on the same products after ours
+        place_order(self.other_buyer, [{'product': self.products[0], 'quantity': 5}])
+        self.assertEqual(self.cancel().status_code, 200)
+        self.products[0].refresh_from_db()
+        self.assertEqual(self.products[0].stock, 20 - 5)
+        self.assertEqual(self.balance(self.retailer), 1000)
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, 'canceled')
+        self.assertIsNotNone(self.order.canceled_at)
+
+    def test_cancel_voids_unsettled_proceeds(self):
+        self.assertEqual(self.cancel().status_code, 200)
+        self.assertFalse(PendingSettlement.objects.filter(order=self.order).exists())
+        settle()
+        self.assertEqual(self.balance(self.farmers[0]), 0)
+
+    def test_cancel_reverses_settled_proceeds_per_farmer(self):
+        settle()
+        self.assertEqual(self.balance(self.farmers[0]), 40)
+        self.farmers[0].wallet.debit(30)  # spent most of it
+        self.assertEqual(self.cancel().status_code, 200)
+
+        self.assertEqual(self.balance(self.farmers[0]), -30)
+        self.assertEqual(self.balance(self.farmers[1]), 0)
+        reversals = self.farmers[1].wallet.transactions.filter(description__startswith='Reversal')
+        self.assertEqual(list(reversals.values_list('amount', 'description')), [(40, f'Reversal for Order #{self.order.id}')])
+
+    def test_cancel_cost_does_not_grow_with_lines(self):
+        small = place_order(self.retailer, [{'product': self.products[0], 'quantity': 1}])
+
+        def queries_for(order):
+            with CaptureQueriesContext(connection) as ctx:
+                self.assertEqual(self.cancel(order).status_code, 200)
+            return len(ctx.captured_queries)
+
+        # 1 line / 1 farmer vs 4 lines / 2 farmers
+        self.assertEqual(queries_for(small), queries_for(self.order))
+
+    def test_delete_cancels_instead_of_deleting(self):
+        url = reverse('order-detail', args=[self.order.id])
+        self.assertEqual(self.client.delete(url).status_code, 204)
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, 'canceled')
+        self.assertEqual(list(self.order.transitions.values_list('to_status', flat=True)), ['canceled'])
+        self.assertEqual(self.balance(self.retailer), 1000)
+        self.products[0].refresh_from_db()
+        self.assertEqual(self.products[0].stock, 20)
+        self.assertFalse(PendingSettlement.objects.filter(order=self.order).exists())
+        self.assertEqual(self.client.delete(url).status_code, 400)
+
+    def test_only_pending_orders_once(self):
+        self.assertEqual(self.cancel().status_code, 200)
+        self.assertEqual(self.cancel().status_code, 400)
+        self.assertEqual(self.balance(self.retailer), 1000)
+        self.client.force_authenticate(user=self.other_buyer)
+        self.assertEqual(self.cancel().status_code, 404)
@@ -1,5 +1,6 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
+from harvestplace.exports import ExportRenderer
 from .views import OrderViewSet
 
 # router = DefaultRouter()
@@ -13,9 +14,13 @@ from .views import OrderViewSet
 # POST /orders/ → create
 # GET /orders/{id}/ → retrieve
 # PUT/PATCH /orders/{id}/ → update
-# DELETE /orders/{id}/ → destroy
+# DELETE /orders/{id}/ → destroy (cancels, like /cancel/)
 # GET /orders/my-orders/ → custom action
+# GET /orders/inbox/ → custom action (farmers)
+# GET /orders/export/ → custom action (CSV / NDJSON stream)
 # POST /orders/{id}/cancel/ → custom action
+# PATCH /orders/{id}/status/ → custom action (state machine)
+# POST /orders/status/bulk/ → custom action (many orders, one transaction)
 
 order_list = OrderViewSet.as_view({'get': 'list', 'post': 'create'})
 order_detail = OrderViewSet.as_view({'get': 'retrieve', 'put': 'update', 'delete': 'destroy'})
@@ -24,5 +29,9 @@ urlpatterns = [
     path('/', order_list, name='order-list'),
     path('/<int:pk>/', order_detail, name='order-detail'),
     path('/my-orders/', OrderViewSet.as_view({'get': 'my_orders'}), name='my-orders'),
+    path('/inbox/', OrderViewSet.as_view({'get': 'inbox'}), name='order-inbox'),
+    path('/export/', OrderViewSet.as_view({'get': 'export'}, renderer_classes=[ExportRenderer]), name='order-export'),
     path('/<int:pk>/cancel/', OrderViewSet.as_view({'post': 'cancel_order'}), name='order-cancel'),
+    path('/<int:pk>/status/', OrderViewSet.as_view({'patch': 'update_status'}), name='order-status-update'),
+    path('/status/bulk/', OrderViewSet.as_view({'post': 'bulk_status'}), name='order-status-bulk'),
 ]
\ No newline at end of file
@@ -1,52 +1,205 @@
 from rest_framework import viewsets, status, permissions
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
-from django.db import transaction
-from .models import Order
-from .serializers import OrderSerializer, OrderStatusUpdateSerializer
-from wallet.models import Wallet
+from django.db.models import Exists, OuterRef, Prefetch, Q, prefetch_related_objects
+from .filters import OrderFilter
+from .models import Order, OrderItem
+from .permissions import IsBuyerOrFarmerForOrder
+from .serializers import BulkOrderStatusSerializer, FarmerOrderSerializer, OrderSerializer, OrderStatusUpdateSerializer
+from .services import transition_orders
+from market.permissions import IsFarmerUser
+from harvestplace.pagination import PageOrCursorPagination
+from harvestplace.conditional import ConditionalGetMixin
+from harvestplace.exports import ExportRenderer, export_response, get_output_format, iter_chunks
+from idempotency.decorators import idempotent
 
-class OrderViewSet(viewsets.ModelViewSet):
+EXPORT_FIELDS = [
+    'order_id', 'created_at', 'status', 'buyer', 'product_id', 'product', 'farmer',
+    'quantity', 'price', 'line_total', 'order_total',
+]
+
+
+def export_rows(orders):
+    """
+    One row per order line; `orders` have `items` prefetched.
+    """
+    return [
+        {
+            'order_id': order.id,
+            'created_at': order.created_at,
+            'status': order.status,
+            'buyer': order.buyer.username,
+            'product_id': item.product_id,
+            'product': item.product.name,
+            'farmer': item.product.farmer.username,
+            'quantity': item.quantity,
+            'price': item.price,
+            'line_total': item.price * item.quantity,
+            'order_total': order.total_amount,
+        }
+        for order in orders for item in order.items.all()
+    ]
+
+
+class OrderViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Order.objects.all()
     serializer_class = OrderSerializer
-    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = PageOrCursorPagination  # ?pagination=cursor for keyset pages
+    ordering_fields = ["created_at"]
+    conditional_actions = ("retrieve",)  # ETag / Last-Modified on order detail
+    seller_actions = ("retrieve", "update_status")  # farmers may also open/advance orders containing their products
+
+    def get_permissions(self):
+        """
+        - inbox → Authenticated farmers only
+        - Everything else → Authenticated; object access via IsBuyerOrFarmerForOrder
+        """
+        if self.action == "inbox":
+            return [permissions.IsAuthenticated(), IsFarmerUser()]
+        return [permissions.IsAuthenticated(), IsBuyerOrFarmerForOrder()]
 
     def get_queryset(self):
         user = self.request.user
+        queryset = Order.objects.select_related('buyer').prefetch_related(
+            Prefetch('items', queryset=OrderItem.objects.select_related('product__farmer'))
+        )
+        seller = self.action in self.seller_actions and getattr(user, "role", None) == "farmer"
+        if seller:
+            # Answers IsBuyerOrFarmerForOrder without a query per object
+            queryset = queryset.annotate(is_seller=Exists(OrderItem.objects.filter(order=OuterRef("pk"), farmer=user)))
         if user.is_staff or user.is_superuser:
-            return Order.objects.all()
-        return Order.objects.filter(buyer=user)
+            return queryset
+        if seller:
+            return queryset.filter(Q(buyer=user) | Q(is_seller=True))
+        return queryset.filter(buyer=user)
+
+    def get_order_serializer(self, order):
+        """
+        Buyers and staff see the whole order; a farmer who only sells in it
+        sees their own lines and subtotal, as in the inbox.
+        """
+        user = self.request.user
+        context = self.get_serializer_context()
+        if getattr(order, "is_seller", False) and order.buyer_id != user.pk and not (user.is_staff or user.is_superuser):
+            # From the prefetched lines: no extra query
+            order.farmer_items = [item for item in order.items.all() if item.farmer_id == user.pk]
+            return FarmerOrderSerializer(order, context=context)
+        return OrderSerializer(order, context=context)
+
+    def retrieve(self, request, *args, **kwargs):
+        return Response(self.get_order_serializer(self.get_object()).data)
+
+    def destroy(self, request, *args, **kwargs):
+        """
+        DELETE /orders/{id}/ cancels the order like POST /orders/{id}/cancel/:
+        orders are never hard-deleted, so the refund, stock restore, proceeds
+        reversal and transition audit always run.
+        """
+        order = self.get_object()
+        transition_orders(request.user, [order.pk], "canceled")
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    @idempotent
+    def create(self, request, *args, **kwargs):
+        # Retries carrying the same Idempotency-Key replay the first response
+        return super().create(request, *args, **kwargs)
 
     def perform_create(self, serializer):
         serializer.save()
 
     @action(detail=False, methods=["get"], url_path="my-orders")
     def my_orders(self, request):
-        orders = Order.objects.filter(buyer=request.user)
+        orders = self.get_queryset().filter(buyer=request.user)
         serializer = self.get_serializer(orders, many=True)
         return Response(serializer.data)
 
+    @action(detail=False, methods=["get"], url_path="inbox")
+    def inbox(self, request):
+        """
+        GET /orders/inbox/?status=pending
+        Orders containing the farmer's products, newest first, each with only
+        the farmer's own lines. Paginated like the order list; also takes
+        `?since=`, `?until=`, `?month=`.
+        """
+        lines = OrderItem.objects.filter(farmer=request.user)
+        orders = Order.objects.filter(pk__in=lines.values("order_id")).select_related("buyer").order_by("-created_at", "-id")
+        filterset = OrderFilter(request.query_params, queryset=orders)
+        if not filterset.is_valid():
+            raise ValidationError(filterset.errors)
+
+        page = self.paginate_queryset(filterset.qs)
+        prefetch_related_objects(
+            page, Prefetch("items", queryset=lines.select_related("product__farmer"), to_attr="farmer_items")
+        )
+        serializer = FarmerOrderSerializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    @action(detail=False, methods=["get"], url_path="export", renderer_classes=[ExportRenderer])
+    def export(self, request):
+        """
+        GET /orders/export/?output=csv|ndjson&month=2025-01
+        Streams order lines oldest first: the user's purchases, or with
+        `?role=farmer` the lines of their products that others bought.
+        """
+        fmt = get_output_format(request)
+        role = request.query_params.get("role", "buyer")
+        items = OrderItem.objects.select_related("product__farmer")
+        if role == "buyer":
+            orders = Order.objects.filter(buyer=request.user)
+        elif role == "farmer":
+            items = items.filter(farmer=request.user)
+            orders = Order.objects.filter(pk__in=items.values("order_id"))
+        else:
+            raise ValidationError({"role": "Must be 'buyer' or 'farmer'."})
+
+        filterset = OrderFilter(request.query_params, queryset=orders.select_related("buyer"))
+        if not filterset.is_valid():
+            raise ValidationError(filterset.errors)
+        # Line items are fetched once per chunk of orders, not per order
+        chunks = iter_chunks(filterset.qs, prefetch=[Prefetch("items", queryset=items)])
+        month = request.query_params.get("month")
+        filename = f"orders-{role}-{month}" if month else f"orders-{role}"
+        return export_response((export_rows(chunk) for chunk in chunks), EXPORT_FIELDS, fmt, filename)
+
+    @action(detail=True, methods=["patch"], url_path="status")
+    def update_status(self, request, pk=None):
+        """
+        PATCH /orders/{id}/status/  body: {"status": "shipped"}
+        Follows Order.TRANSITIONS; cancelling restores stock and refunds the buyer.
+        """
+        order = self.get_object()
+        serializer = OrderStatusUpdateSerializer(order, data=request.data, context={"request": request})
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        return Response(self.get_order_serializer(self.get_queryset().get(pk=order.pk)).data)
+
+    @action(detail=False, methods=["post"], url_path="status/bulk")
+    @idempotent
+    def bulk_status(self, request):
+        """
+        POST /orders/status/bulk/  body: {"orders": [1, 2, 3], "status": "shipped"}
+        Moves every listed order in one transaction, or none of them (400 with
+        a message per rejected order).
+        """
+        serializer = BulkOrderStatusSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        orders = transition_orders(request.user, serializer.validated_data["orders"], serializer.validated_data["status"])
+        return Response({"status": serializer.validated_data["status"], "orders": [order.pk for order in orders]})
+
     @action(detail=True, methods=["post"], url_path="cancel")
-    @transaction.atomic
     def cancel_order(self, request, pk=None):
-        try:
-            order = Order.objects.get(pk=pk, buyer=request.user)
-        except Order.DoesNotExist:
+        """
+        POST /orders/{id}/cancel/ (buyer, pending orders only)
+        Restores stock, refunds the buyer and takes back the farmers' proceeds
+        in one transaction (services.compensate_cancellation).
+        """
+        order = Order.objects.filter(pk=pk, buyer=request.user).only("status").first()
+        if order is None:
             return Response({"detail": "Order not found."}, status=status.HTTP_404_NOT_FOUND)
-
         if order.status != "pending":
             return Response({"detail": "Only pending orders can be canceled."}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Restore stock
-        for item in order.items.all():
-            product = item.product
-            product.stock += item.quantity
-            product.save()
-
-        # Refund buyer
-        buyer_wallet = Wallet.objects.get(user=request.user)
-        buyer_wallet.credit(order.total_amount, description=f"Refund for Order #{order.id}")
-
-        order.status = "canceled"
-        order.save()
+        # Re-checked under lock: a concurrent cancel or status change wins cleanly
+        transition_orders(request.user, [order.pk], "canceled")
         return Response({"detail": "Order canceled and stock restored."})
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Wallet, Transaction
+from .models import Wallet, Transaction, BalanceCheckpoint
 
 @admin.register(Wallet)
 class WalletAdmin(admin.ModelAdmin):
@@ -8,7 +8,22 @@ class WalletAdmin(admin.ModelAdmin):
 
 @admin.register(Transaction)
 class TransactionAdmin(admin.ModelAdmin):
-    list_display = ('wallet', 'transaction_type', 'amount', 'created_at')
+    list_display = ('wallet', 'transaction_type', 'amount', 'balance_after', 'created_at')
     list_filter = ('transaction_type',)
     search_fields = ('wallet__user__username', 'description')
-    readonly_fields = ('created_at',)
\ No newline at end of file
+    readonly_fields = ('created_at',)
+
+    # The ledger is append-only
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+@admin.register(BalanceCheckpoint)
+class BalanceCheckpointAdmin(admin.ModelAdmin):
+    list_display = ('wallet', 'balance', 'last_transaction_id', 'as_of', 'created_at')
+    search_fields = ('wallet__user__username',)
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,21 @@
+import django_filters
+
+from harvestplace.exports import MonthFilter
+from .models import Transaction
+
+
+class TransactionFilter(django_filters.FilterSet):
+    """
+    Filters for the wallet transaction history.
+    - `?since=2025-01-01&until=2025-01-31T23:59:59` — created_at range (inclusive)
+    - `?month=2025-01` — one calendar month (statements)
+    - `?type=CREDIT` or `?type=DEBIT`
+    """
+    since = django_filters.IsoDateTimeFilter(field_name='created_at', lookup_expr='gte')
+    until = django_filters.IsoDateTimeFilter(field_name='created_at', lookup_expr='lte')
+    month = MonthFilter(field_name='created_at')
+    type = django_filters.ChoiceFilter(field_name='transaction_type', choices=Transaction.TRANSACTION_CHOICES)
+
+    class Meta:
+        model = Transaction
+        fields = ['since', 'until', 'month', 'type']
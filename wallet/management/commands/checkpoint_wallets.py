@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+from wallet.models import BalanceCheckpoint, Wallet
+
+
+class Command(BaseCommand):
+    help = "Write balance checkpoints for wallets with enough new ledger entries. Run periodically."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--min-transactions', type=int, default=100,
+                            help="Only checkpoint wallets with at least this many entries since their last checkpoint.")
+
+    def handle(self, *args, **options):
+        covered = BalanceCheckpoint.objects.filter(wallet=OuterRef('pk')).order_by('-last_transaction_id')
+        wallets = (
+            Wallet.objects.annotate(covered=Coalesce(Subquery(covered.values('last_transaction_id')[:1]), 0))
+            .annotate(pending=Count('transactions', filter=Q(transactions__id__gt=F('covered'))))
+            .filter(pending__gte=max(options['min_transactions'], 1))
+        )
+        written = sum(1 for wallet in wallets.iterator() if wallet.checkpoint())
+        self.stdout.write(self.style.SUCCESS(f"Wrote {written} checkpoints."))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from wallet.models import Wallet
+
+
+class Command(BaseCommand):
+    help = "Check every wallet balance against its ledger (latest checkpoint + later entries)."
+
+    def handle(self, *args, **options):
+        mismatched = 0
+        for wallet in Wallet.objects.select_related('user').iterator():
+            ok, stored, ledger = wallet.reconcile()
+            if not ok:
+                mismatched += 1
+                self.stdout.write(self.style.ERROR(f"{wallet.user}: balance {stored}, ledger {ledger}"))
+        if mismatched:
+            raise CommandError(f"{mismatched} wallets do not match their ledger.")
+        self.stdout.write(self.style.SUCCESS("All wallets match their ledger."))
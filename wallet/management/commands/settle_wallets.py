@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from wallet import settlement
+
+
+class Command(BaseCommand):
+    help = "Credit farmers' wallets with their pending sale proceeds, one ledger entry per farmer per batch."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=settlement.BATCH_SIZE)
+        parser.add_argument('--loop', action='store_true', help="Keep running as a settlement worker.")
+        parser.add_argument('--interval', type=float, default=5.0, help="Seconds to sleep when idle (with --loop).")
+
+    def report(self, report):
+        if report['settlements']:
+            self.stdout.write(
+                f"Settled {report['settlements']} sales ({report['amount']}) for {report['farmers']} farmers."
+            )
+
+    def handle(self, *args, **options):
+        if options['loop']:
+            settlement.run_forever(options['interval'], options['batch_size'], on_batch=self.report)
+            return
+        # Drain everything that is open now
+        while True:
+            report = settlement.settle(options['batch_size'])
+            self.report(report)
+            if report['settlements'] < options['batch_size']:
+                break
+        self.stdout.write(self.style.SUCCESS("Settlement complete."))
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.5 on 2026-10-18 15:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wallet', '0003_pending_settlements'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['wallet', 'created_at', 'id'], name='transaction_wallet_created_idx'),
+        ),
+    ]
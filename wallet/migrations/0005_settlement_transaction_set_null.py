@@ -0,0 +1,19 @@
+# Generated by Django 5.2.5 on 2026-10-18 17:18
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wallet', '0004_transaction_wallet_created_idx'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='pendingsettlement',
+            name='transaction',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='settlements', to='wallet.transaction'),
+        ),
+    ]
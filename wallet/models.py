@@ -1,51 +1,144 @@
 from decimal import Decimal
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Case, F, Max, Sum, When
 from django.conf import settings
 from django.utils import timezone
 
 User = settings.AUTH_USER_MODEL
 
+ZERO = Decimal('0.00')
+
+
 class Wallet(models.Model):
+    """
+    `balance` is a running total kept in step with the append-only
+    Transaction ledger. It is only ever changed by credit()/debit(), as a
+    single atomic UPDATE in the database (never read-modify-write in Python),
+    so concurrent writers cannot lose each other's updates.
+    """
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='wallet')
     balance = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'))
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    @transaction.atomic
+    def _post(self, amount, transaction_type, description, balance_filter=None):
+        delta = amount if transaction_type == Transaction.CREDIT else -amount
+        updated = Wallet.objects.filter(pk=self.pk, **(balance_filter or {})).update(
+            balance=F('balance') + delta, updated_at=timezone.now()
+        )
+        if not updated:
+            return None
+        # Our UPDATE holds the row until commit, so this is exactly our result
+        self.refresh_from_db(fields=['balance', 'updated_at'])
+        return Transaction.objects.create(
+            wallet=self,
+            amount=amount,
+            transaction_type=transaction_type,
+            description=description,
+            balance_after=self.balance,
+        )
+
     def credit(self, amount, description: str | None = None):
         """
         Credit the wallet and log a transaction.
         amount may be Decimal, str or number.
         """
         amount = Decimal(str(amount))
-        self.balance = (self.balance or Decimal('0.00')) + amount
-        self.save(update_fields=['balance', 'updated_at'])
-        Transaction.objects.create(
-            wallet=self,
-            amount=amount,
-            transaction_type=Transaction.CREDIT,
-            description=description or "Credit"
-        )
+        if amount <= 0:
+            raise ValueError("Credit amount must be positive")
+        return self._post(amount, Transaction.CREDIT, description or "Credit")
 
-    def debit(self, amount, description: str | None = None):
+    def debit(self, amount, description: str | None = None, overdraft: bool = False):
         """
         Debit the wallet and log a transaction. Raises ValueError if insufficient funds.
+        overdraft=True lets the balance go negative (reversals the user cannot refuse).
         """
         amount = Decimal(str(amount))
-        if (self.balance or Decimal('0.00')) < amount:
+        if amount <= 0:
+            raise ValueError("Debit amount must be positive")
+        # The balance check is part of the UPDATE, not a prior read
+        balance_filter = None if overdraft else {'balance__gte': amount}
+        entry = self._post(amount, Transaction.DEBIT, description or "Debit", balance_filter=balance_filter)
+        if entry is None:
             raise ValueError("Insufficient wallet balance")
-        self.balance = (self.balance or Decimal('0.00')) - amount
-        self.save(update_fields=['balance', 'updated_at'])
-        Transaction.objects.create(
+        return entry
+
+    @property
+    def pending_amount(self):
+        """
+        Sale proceeds not yet settled into this wallet.
+        """
+        total = PendingSettlement.objects.filter(farmer_id=self.user_id, settled_at__isnull=True).aggregate(
+            total=Sum('amount')
+        )['total']
+        return total or ZERO
+
+    # ------------------------------------------------------------ ledger
+
+    def latest_checkpoint(self, as_of=None):
+        checkpoints = self.checkpoints.all()
+        if as_of is not None:
+            checkpoints = checkpoints.filter(as_of__lte=as_of)
+        return checkpoints.order_by('-last_transaction_id').first()
+
+    def balance_as_of(self, as_of=None):
+        """
+        Balance according to the ledger, optionally as of a point in time.
+        Costs O(transactions since the nearest checkpoint), not O(history).
+        """
+        checkpoint = self.latest_checkpoint(as_of)
+        entries = self.transactions.all()
+        balance = ZERO
+        if checkpoint:
+            balance = checkpoint.balance
+            entries = entries.filter(id__gt=checkpoint.last_transaction_id)
+        if as_of is not None:
+            entries = entries.filter(created_at__lte=as_of)
+        return balance + Transaction.signed_total(entries)
+
+    def reconcile(self):
+        """
+        Compare the stored balance with the ledger: (ok, stored, ledger).
+        """
+        self.refresh_from_db(fields=['balance'])
+        ledger = self.balance_as_of()
+        return ledger == self.balance, self.balance, ledger
+
+    @transaction.atomic
+    def checkpoint(self):
+        """
+        Record the ledger balance up to the newest transaction so later
+        balance_as_of()/reconcile() calls start from here. Returns None when there
+        is nothing new to cover.
+        """
+        previous = self.latest_checkpoint()
+        entries = self.transactions.all()
+        if previous:
+            entries = entries.filter(id__gt=previous.last_transaction_id)
+        covered = entries.aggregate(last_id=Max('id'), as_of=Max('created_at'))
+        if covered['last_id'] is None:
+            return None
+        entries = entries.filter(id__lte=covered['last_id'])
+        return BalanceCheckpoint.objects.create(
             wallet=self,
-            amount=amount,
-            transaction_type=Transaction.DEBIT,
-            description=description or "Debit"
+            balance=(previous.balance if previous else ZERO) + Transaction.signed_total(entries),
+            last_transaction_id=covered['last_id'],
+            as_of=max(covered['as_of'], previous.as_of) if previous else covered['as_of'],
         )
 
     def __str__(self):
         return f"{self.user} wallet: {self.balance}"
 
 
+class TransactionQuerySet(models.QuerySet):
+    def update(self, **kwargs):
+        raise TypeError("Wallet transactions are append-only.")
+
+    def delete(self):
+        raise TypeError("Wallet transactions are append-only.")
+
+
 class Transaction(models.Model):
     CREDIT = 'CREDIT'
     DEBIT = 'DEBIT'
@@ -58,10 +151,81 @@ class Transaction(models.Model):
     amount = models.DecimalField(max_digits=12, decimal_places=2)
     transaction_type = models.CharField(max_length=6, choices=TRANSACTION_CHOICES)
     description = models.CharField(max_length=255, blank=True, null=True)
+    balance_after = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)  # null for pre-ledger rows
     created_at = models.DateTimeField(default=timezone.now)
 
+    objects = TransactionQuerySet.as_manager()
+
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # "entries since checkpoint": wallet + id range
+            models.Index(fields=['wallet', 'id'], name='transaction_wallet_id_idx'),
+            # History pages and date ranges: seek on (created_at, id) within a wallet
+            models.Index(fields=['wallet', 'created_at', 'id'], name='transaction_wallet_created_idx'),
+        ]
+
+    @staticmethod
+    def signed_total(queryset):
+        total = queryset.order_by().aggregate(
+            total=Sum(Case(When(transaction_type=Transaction.CREDIT, then=F('amount')), default=-F('amount')))
+        )['total']
+        return total or ZERO
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise TypeError("Wallet transactions are append-only.")
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise TypeError("Wallet transactions are append-only.")
 
     def __str__(self):
         return f"{self.transaction_type} {self.amount} ({self.wallet.user})"
+
+
+class BalanceCheckpoint(models.Model):
+    """
+    Ledger balance of a wallet covering every transaction with
+    id <= last_transaction_id; `as_of` is the newest created_at among them.
+    """
+    wallet = models.ForeignKey(Wallet, on_delete=models.CASCADE, related_name='checkpoints')
+    balance = models.DecimalField(max_digits=12, decimal_places=2)
+    last_transaction_id = models.BigIntegerField()
+    as_of = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['wallet', 'last_transaction_id'], name='checkpoint_wallet_last_idx'),
+            models.Index(fields=['wallet', 'as_of'], name='checkpoint_wallet_as_of_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.wallet.user} @ {self.as_of}: {self.balance}"
+
+
+class PendingSettlement(models.Model):
+    """
+    Sale proceeds owed to a farmer, written at checkout instead of crediting
+    the farmer's wallet (a hot row for popular sellers). Inserts touch no
+    shared row; wallet/settlement.py nets open rows into one ledger credit
+    per farmer.
+    """
+    farmer = models.ForeignKey(User, on_delete=models.CASCADE, related_name='pending_settlements')
+    order = models.ForeignKey('orders.Order', on_delete=models.SET_NULL, null=True, blank=True, related_name='settlements')
+    amount = models.DecimalField(max_digits=12, decimal_places=2)
+    description = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    settled_at = models.DateTimeField(null=True, blank=True)
+    transaction = models.ForeignKey(Transaction, on_delete=models.SET_NULL, null=True, blank=True, related_name='settlements')
+
+    class Meta:
+        indexes = [
+            # Only open rows are scanned by the settlement job and pending totals
+            models.Index(fields=['farmer', 'id'], name='settlement_open_idx', condition=models.Q(settled_at__isnull=True)),
+        ]
+
+    def __str__(self):
+        state = 'settled' if self.settled_at else 'pending'
+        return f"{self.amount} to {self.farmer} ({state})"
@@ -1,20 +1,34 @@
 from rest_framework import serializers
 from decimal import Decimal
+from django.conf import settings
 from .models import Wallet, Transaction
 
 class TransactionSerializer(serializers.ModelSerializer):
     class Meta:
         model = Transaction
-        fields = ['id', 'amount', 'transaction_type', 'description', 'created_at']
+        fields = ['id', 'amount', 'transaction_type', 'description', 'balance_after', 'created_at']
         read_only_fields = fields
 
 class WalletSerializer(serializers.ModelSerializer):
-    transactions = TransactionSerializer(many=True, read_only=True)
+    """
+    Wallet summary: balance plus only the latest entries (`recent` in the
+    context, default WALLET_RECENT_TRANSACTIONS). The full history is served
+    paginated by /wallet/transactions/.
+    """
+    transactions = serializers.SerializerMethodField()
+    pending_amount = serializers.DecimalField(max_digits=12, decimal_places=2, read_only=True)
 
     class Meta:
         model = Wallet
-        fields = ['id', 'balance', 'transactions', 'created_at', 'updated_at']
-        read_only_fields = ['id', 'balance', 'transactions', 'created_at', 'updated_at']
+        fields = ['id', 'balance', 'pending_amount', 'transactions', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'balance', 'pending_amount', 'transactions', 'created_at', 'updated_at']
+
+    def get_transactions(self, obj):
+        limit = self.context.get('recent', settings.WALLET_RECENT_TRANSACTIONS)
+        if not limit:
+            return []
+        recent = obj.transactions.order_by('-created_at', '-id')[:limit]
+        return TransactionSerializer(recent, many=True).data
 
 class DepositSerializer(serializers.Serializer):
     amount = serializers.DecimalField(max_digits=12, decimal_places=2)
@@ -0,0 +1,79 @@
+"""
+Batched settlement of sale proceeds.
+
+Checkout appends PendingSettlement rows; settle() later nets each farmer's
+open rows into a single wallet credit, so a burst of sales for one farmer
+costs one hot-row UPDATE per batch instead of one per order.
+"""
+import time
+
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from .models import PendingSettlement, Wallet
+
+BATCH_SIZE = 1000
+
+
+def settle_farmer(farmer_id, up_to_id):
+    """
+    Settle the farmer's open rows with id <= up_to_id in one transaction.
+    Returns (rows, amount).
+    """
+    with transaction.atomic():
+        # skip_locked: rows another settler already claimed are left to it
+        rows = list(
+            PendingSettlement.objects.select_for_update(skip_locked=True)
+            .filter(farmer_id=farmer_id, settled_at__isnull=True, id__lte=up_to_id)
+            .values_list('id', 'amount')
+        )
+        if not rows:
+            return 0, 0
+        ids = [pk for pk, _ in rows]
+        amount = sum(amount for _, amount in rows)
+        wallet, _ = Wallet.objects.get_or_create(user_id=farmer_id)
+        entry = wallet.credit(amount, description=f"Settlement of {len(rows)} sales")
+        # settled_at__isnull guards against a concurrent settler where row locks are unavailable
+        claimed = PendingSettlement.objects.filter(id__in=ids, settled_at__isnull=True).update(
+            settled_at=timezone.now(), transaction=entry
+        )
+        if claimed != len(ids):
+            raise RuntimeError("Pending settlements changed while being settled.")
+    return len(rows), amount
+
+
+def settle(batch_size=BATCH_SIZE):
+    """
+    Settle up to `batch_size` of the oldest open rows, one credit per farmer.
+    Returns {'farmers', 'settlements', 'amount'}.
+    """
+    open_rows = PendingSettlement.objects.filter(settled_at__isnull=True)
+    cutoff = open_rows.order_by('id').values_list('id', flat=True)[batch_size - 1:batch_size].first()
+    if cutoff is None:
+        cutoff = open_rows.aggregate(last=Max('id'))['last']
+    if cutoff is None:
+        return {'farmers': 0, 'settlements': 0, 'amount': 0}
+
+    farmer_ids = open_rows.filter(id__lte=cutoff).order_by('farmer_id').values_list('farmer_id', flat=True).distinct()
+    report = {'farmers': 0, 'settlements': 0, 'amount': 0}
+    for farmer_id in list(farmer_ids):
+        rows, amount = settle_farmer(farmer_id, cutoff)
+        if rows:
+            report['farmers'] += 1
+            report['settlements'] += rows
+            report['amount'] += amount
+    return report
+
+
+def run_forever(interval, batch_size=BATCH_SIZE, on_batch=None):
+    """
+    Worker loop: settle, and sleep `interval` seconds when there was nothing
+    left to do.
+    """
+    while True:
+        report = settle(batch_size)
+        if on_batch:
+            on_batch(report)
+        if report['settlements'] < batch_size:
+            time.sleep(interval)
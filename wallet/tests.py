@@ -1,3 +1,240 @@
-from django.test import TestCase
+import csv
+import json
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+
+from django.test import TestCase, override_settings
 
 # Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.db import models
+from django.utils import timezone
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from .models import BalanceCheckpoint, PendingSettlement, Transaction, Wallet
+from .settlement import settle
+
+User = get_user_model()
+
+
+class WalletConditionalGetTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='retailer1', password='pass1234', role='retailer')
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('wallet-detail')
+
+    def test_wallet_summary_revalidates(self):
+        etag = self.client.get(self.url)['ETag']
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        self.user.wallet.credit(100)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['balance'], '100.00')
+
+
+class WalletLedgerTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='farmer1', password='pass1234', role='farmer')
+        self.wallet = self.user.wallet
+
+    def test_updates_do_not_use_stale_balance(self):
+        stale = Wallet.objects.get(pk=self.wallet.pk)
+        self.wallet.credit(100)
+        stale.credit(50)  # read before the first credit; must not overwrite it
+        self.assertEqual(stale.balance, Decimal('150.00'))
+        self.wallet.refresh_from_db()
+        self.assertEqual(self.wallet.balance, Decimal('150.00'))
+        self.assertEqual(list(self.wallet.transactions.order_by('id').values_list('balance_after', flat=True)),
+                         [Decimal('100.00'), Decimal('150.00')])
+
+    def test_debit_checks_balance_in_database(self):
+        self.wallet.credit(30)
+        stale = Wallet.objects.get(pk=self.wallet.pk)
+        self.wallet.debit(20)
+        with self.assertRaises(ValueError):
+            stale.debit(20)
+        self.wallet.refresh_from_db()
+        self.assertEqual(self.wallet.balance, Decimal('10.00'))
+        self.assertEqual(self.wallet.transactions.count(), 2)
+
+    def test_transactions_are_append_only(self):
+        entry = self.wallet.credit(10)
+        entry.amount = Decimal('1000.00')
+        with self.assertRaises(TypeError):
+            entry.save()
+        with self.assertRaises(TypeError):
+            entry.delete()
+        with self.assertRaises(TypeError):
+            Transaction.objects.filter(pk=entry.pk).update(amount=0)
+
+    def test_balance_as_of_uses_checkpoints(self):
+        self.wallet.credit(100)
+        self.wallet.debit(40)
+        checkpoint = self.wallet.checkpoint()
+        self.assertEqual(checkpoint.balance, Decimal('60.00'))
+        self.assertIsNone(self.wallet.checkpoint())  # nothing new
+
+        self.wallet.credit(15)
+        with self.assertNumQueries(2):  # nearest checkpoint + entries after it
+            self.assertEqual(self.wallet.balance_as_of(), Decimal('75.00'))
+        self.assertEqual(self.wallet.balance_as_of(checkpoint.as_of), Decimal('60.00'))
+        self.assertEqual(self.wallet.balance_as_of(checkpoint.as_of - timedelta(days=1)), Decimal('0.00'))
+        self.assertEqual(self.wallet.checkpoint().balance, Decimal('75.00'))
+
+    def test_reconcile(self):
+        self.wallet.credit(100)
+        self.wallet.checkpoint()
+        self.wallet.debit(25)
+        self.assertEqual(self.wallet.reconcile(), (True, Decimal('75.00'), Decimal('75.00')))
+
+        Wallet.objects.filter(pk=self.wallet.pk).update(balance=Decimal('500.00'))
+        ok, stored, ledger = self.wallet.reconcile()
+        self.assertFalse(ok)
+        with self.assertRaises(CommandError):
+            call_command('reconcile_wallets', stdout=StringIO())
+
+    def test_checkpoint_command(self):
+        for _ in range(3):
+            self.wallet.credit(10)
+        other = User.objects.create_user(username='retailer2', password='pass1234', role='retailer').wallet
+        other.credit(5)
+
+        call_command('checkpoint_wallets', min_transactions=2, stdout=StringIO())
+        self.assertEqual(BalanceCheckpoint.objects.get().wallet, self.wallet)
+        call_command('checkpoint_wallets', min_transactions=2, stdout=StringIO())
+        self.assertEqual(BalanceCheckpoint.objects.count(), 1)
+
+
+class SettlementTestCase(APITestCase):
+    def setUp(self):
+        self.farmers = [
+            User.objects.create_user(username=f'farmer{i}', password='pass1234', role='farmer') for i in range(2)
+        ]
+
+    def owe(self, farmer, amount):
+        return PendingSettlement.objects.create(farmer=farmer, amount=Decimal(amount), description="Sale")
+
+    def test_nets_pending_rows_into_one_credit_per_farmer(self):
+        for amount in ('10.00', '15.50', '4.50'):
+            self.owe(self.farmers[0], amount)
+        self.owe(self.farmers[1], '7.00')
+
+        report = settle()
+        self.assertEqual(report['farmers'], 2)
+        self.assertEqual(report['settlements'], 4)
+
+        wallet = self.farmers[0].wallet
+        wallet.refresh_from_db()
+        self.assertEqual(wallet.balance, Decimal('30.00'))
+        self.assertEqual(wallet.transactions.count(), 1)
+        self.assertFalse(PendingSettlement.objects.filter(settled_at__isnull=True).exists())
+        self.assertEqual(settle()['settlements'], 0)
+
+    def test_batch_size_limits_rows_settled(self):
+        for _ in range(3):
+            self.owe(self.farmers[0], '1.00')
+        self.assertEqual(settle(batch_size=2)['settlements'], 2)
+        self.assertEqual(self.farmers[0].wallet.pending_amount, Decimal('1.00'))
+
+        call_command('settle_wallets', batch_size=2, stdout=StringIO())
+        self.assertEqual(self.farmers[0].wallet.pending_amount, Decimal('0.00'))
+
+    def test_farmer_with_settled_sales_can_be_deleted(self):
+        farmer = self.farmers[0]
+        self.owe(farmer, '10.00')
+        call_command('settle_wallets', stdout=StringIO())
+        self.assertTrue(PendingSettlement.objects.filter(farmer=farmer, transaction__isnull=False).exists())
+
+        farmer.delete()
+        self.assertFalse(PendingSettlement.objects.filter(farmer_id=farmer.pk).exists())
+        self.assertFalse(Wallet.objects.filter(user_id=farmer.pk).exists())
+
+    def test_wallet_summary_shows_pending_amount(self):
+        self.client.force_authenticate(user=self.farmers[0])
+        url = reverse('wallet-detail')
+        etag = self.client.get(url)['ETag']
+        self.owe(self.farmers[0], '12.00')
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['pending_amount'], '12.00')
+        self.assertEqual(response.data['balance'], '0.00')
+
+
+class WalletHistoryTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='farmer1', password='pass1234', role='farmer')
+        self.client.force_authenticate(user=self.user)
+        wallet = self.user.wallet
+        self.start = start = timezone.now() - timedelta(days=30)
+        for day in range(30):
+            entry = wallet.credit(10) if day % 3 else wallet.debit(5) if day else wallet.credit(100)
+            # Backdate one entry per day (the ledger refuses updates, so go through the query layer)
+            models.QuerySet.update(Transaction.objects.filter(pk=entry.pk), created_at=start + timedelta(days=day))
+
+    def test_summary_embeds_only_recent_entries(self):
+        response = self.client.get(reverse('wallet-detail'))
+        self.assertEqual(len(response.data['transactions']), 10)
+        self.assertEqual(len(self.client.get(reverse('wallet-detail'), {'recent': 3}).data['transactions']), 3)
+        self.assertEqual(self.client.get(reverse('wallet-detail'), {'recent': 'x'}).status_code, 400)
+
+    def test_history_is_keyset_paginated(self):
+        url = reverse('wallet-transactions')
+        seen = []
+        response = self.client.get(url, {'page_size': 7})
+        while True:
+            self.assertNotIn('count', response.data)
+            seen += [row['id'] for row in response.data['results']]
+            if not response.data['next']:
+                break
+            response = self.client.get(response.data['next'])
+        self.assertEqual(seen, list(Transaction.objects.order_by('-created_at', '-id').values_list('id', flat=True)))
+
+    def test_history_filters(self):
+        url = reverse('wallet-transactions')
+        since, until = self.start + timedelta(days=20), self.start + timedelta(days=24)
+        response = self.client.get(url, {'since': since.isoformat(), 'until': until.isoformat(), 'page_size': 100})
+        self.assertEqual(len(response.data['results']), 5)
+
+        response = self.client.get(url, {'type': 'DEBIT', 'page_size': 100})
+        self.assertTrue(response.data['results'])
+        self.assertTrue(all(row['transaction_type'] == 'DEBIT' for row in response.data['results']))
+
+        self.assertEqual(self.client.get(url, {'since': 'yesterday'}).status_code, 400)
+
+
+@override_settings(EXPORT_CHUNK_SIZE=4)
+class WalletStatementExportTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='farmer1', password='pass1234', role='farmer')
+        self.client.force_authenticate(user=self.user)
+        for _ in range(10):
+            self.user.wallet.credit(5)
+        self.url = reverse('wallet-transactions-export')
+
+    def read(self, response):
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    def test_csv_statement(self):
+        with self.assertNumQueries(4):  # wallet lookup + 3 chunks of at most 4 rows
+            body = self.read(self.client.get(self.url, {'month': timezone.now().strftime('%Y-%m')}))
+        rows = list(csv.DictReader(StringIO(body)))
+        self.assertEqual(len(rows), 10)
+        self.assertEqual(rows[-1]['balance_after'], '50.00')
+        self.assertEqual([int(r['id']) for r in rows], sorted(int(r['id']) for r in rows))
+
+    def test_ndjson_statement_and_filters(self):
+        self.user.wallet.debit(1)
+        response = self.client.get(self.url, {'output': 'ndjson', 'type': 'DEBIT'}, HTTP_ACCEPT='application/x-ndjson')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lines = [json.loads(line) for line in self.read(response).splitlines()]
+        self.assertEqual([line['amount'] for line in lines], ['1.00'])
+
+        self.assertEqual(self.client.get(self.url, {'output': 'xml'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'month': '2025-13'}).status_code, 400)
@@ -1,12 +1,15 @@
 from django.urls import path
+from harvestplace.exports import ExportRenderer
 from .views import WalletViewSet
 
 wallet_list = WalletViewSet.as_view({'get': 'list'})
 wallet_deposit = WalletViewSet.as_view({'post': 'deposit'})
 wallet_transactions = WalletViewSet.as_view({'get': 'transactions'})
+wallet_export = WalletViewSet.as_view({'get': 'export_transactions'}, renderer_classes=[ExportRenderer])
 
 urlpatterns = [
     path('', wallet_list, name='wallet-detail'),
     path('deposit/', wallet_deposit, name='wallet-deposit'),
     path('transactions/', wallet_transactions, name='wallet-transactions'),
+    path('transactions/export/', wallet_export, name='wallet-transactions-export'),
 ]
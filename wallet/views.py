@@ -1,12 +1,43 @@
 from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from django.db import transaction
+from django.db.models import Count, Max, Q
 from .models import Wallet, Transaction
+from .filters import TransactionFilter
 from .serializers import WalletSerializer, TransactionSerializer, DepositSerializer
+from harvestplace.conditional import ConditionalGetMixin
+from harvestplace.exports import ExportRenderer, export_response, get_output_format, iter_chunks
+from harvestplace.pagination import KeysetPagination
+from idempotency.decorators import idempotent
 
-class WalletViewSet(viewsets.ViewSet):
+STATEMENT_FIELDS = ['id', 'created_at', 'transaction_type', 'amount', 'balance_after', 'description']
+
+class WalletViewSet(ConditionalGetMixin, viewsets.ViewSet):
     permission_classes = [permissions.IsAuthenticated]
+    conditional_actions = ('list',)  # ETag / Last-Modified on the wallet summary
+    history_pagination_class = KeysetPagination  # seeks on (created_at, id); no COUNT over long histories
+    max_recent = 100
+
+    def get_conditional_queryset(self):
+        # Every credit/debit touches wallet.updated_at
+        return Wallet.objects.filter(user=self.request.user)
+
+    def get_conditional_aggregates(self):
+        # New sale proceeds change pending_amount without touching the wallet row
+        pending = Q(user__pending_settlements__settled_at__isnull=True)
+        return {
+            **super().get_conditional_aggregates(),
+            'pending': Count('user__pending_settlements', filter=pending),
+            'last_modified_pending': Max('user__pending_settlements__created_at', filter=pending),
+        }
+
+    def filter_transactions(self, request, wallet):
+        filterset = TransactionFilter(request.query_params, queryset=wallet.transactions.all())
+        if not filterset.is_valid():
+            raise ValidationError(filterset.errors)
+        return filterset
 
     def get_wallet(self, user):
         wallet, _ = Wallet.objects.get_or_create(user=user)
@@ -15,16 +46,25 @@ class WalletViewSet(viewsets.ViewSet):
     def list(self, request):
         """
         GET /api/wallets/ -> returns wallet summary (balance + recent transactions)
+        `?recent=N` embeds the last N transactions (0-100, default 10).
         """
         wallet = self.get_wallet(request.user)
-        serializer = WalletSerializer(wallet, context={'request': request})
+        context = {'request': request}
+        if 'recent' in request.query_params:
+            try:
+                context['recent'] = max(0, min(int(request.query_params['recent']), self.max_recent))
+            except ValueError:
+                raise ValidationError({'recent': "Must be an integer."})
+        serializer = WalletSerializer(wallet, context=context)
         return Response(serializer.data)
 
     @action(detail=False, methods=['post'], url_path='deposit')
+    @idempotent
     def deposit(self, request):
         """
         POST /api/wallets/deposit/  body: { "amount": "100.00" }
         Credits the authenticated user's wallet.
+        Send an `Idempotency-Key` header to make retries safe.
         """
         serializer = DepositSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
@@ -39,9 +79,27 @@ class WalletViewSet(viewsets.ViewSet):
     @action(detail=False, methods=['get'], url_path='transactions')
     def transactions(self, request):
         """
-        GET /api/wallets/transactions/ -> list of transactions for the authenticated user
+        GET /api/wallets/transactions/ -> transactions for the authenticated user,
+        newest first, keyset-paginated (`next`/`previous` cursor links).
+        Filters: `?since=`, `?until=` (ISO 8601), `?type=CREDIT|DEBIT`.
         """
         wallet = self.get_wallet(request.user)
-        qs = wallet.transactions.all()
-        serializer = TransactionSerializer(qs, many=True)
-        return Response(serializer.data)
+        filterset = self.filter_transactions(request, wallet)
+        paginator = self.history_pagination_class()
+        page = paginator.paginate_queryset(filterset.qs, request, view=self)
+        serializer = TransactionSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
+
+
+    @action(detail=False, methods=['get'], url_path='transactions/export', renderer_classes=[ExportRenderer])
+    def export_transactions(self, request):
+        """
+        GET /api/wallets/transactions/export/?output=csv|ndjson&month=2025-01
+        Streams the statement oldest first; takes the same filters as /transactions/.
+        """
+        fmt = get_output_format(request)
+        wallet = self.get_wallet(request.user)
+        transactions = self.filter_transactions(request, wallet).qs.values(*STATEMENT_FIELDS)
+        month = request.query_params.get('month')
+        filename = f"wallet-statement-{month}" if month else "wallet-statement"
+        return export_response(iter_chunks(transactions), STATEMENT_FIELDS, fmt, filename)